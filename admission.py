@@ -0,0 +1,106 @@
+"""
+Deadline-based admission control for the LLM path.
+
+Under a burst, every LLM request used to join the queue, however long it
+was. On a small box the tail then took longer than the client would wait,
+and the user got nothing. A canned fallback reply right away is better than
+a generated one that arrives after Gradio has given up.
+
+Before a request is handed to the model, the controller predicts how long
+it would take. Admitted requests wait here for one of `capacity` generation
+slots, so the whole backlog is counted in `in_flight` rather than hidden in
+a queue in front of the app. They are served in rounds of `capacity` at a
+time, so the prediction is the number of rounds up to and including this
+request times the mean generation time of the last `window` requests (the
+wait for a slot is not part of it):
+
+    predicted = ceil((in_flight + 1) / capacity) * mean(recent latencies)
+
+When that is over the SLO, the request is shed, and the caller answers it
+from the fallback replies straight away. Recent latencies are measured
+under the current load, so the estimate follows it up and down. A request
+is always admitted when nothing is in flight. Otherwise one slow sample
+could shed everything forever, and no new sample would ever correct it.
+Until the first generation completes, requests are only limited by
+capacity. With slo_seconds 0 nothing is shed, but the counters still run.
+A request can bring its own SLO; without one the controller's applies.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+
+class AdmissionController:
+    """Admits LLM requests whose predicted latency fits the SLO and counts the ones it sheds"""
+
+    def __init__(self, slo_seconds=20.0, capacity=1, window=20):
+        self.slo_seconds = slo_seconds
+        self.capacity = max(1, capacity)
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.capacity)
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.completed = 0
+        self.abandoned = 0
+
+    def _estimate(self):
+        """Mean recent generation latency, or None before the first one; caller holds the lock"""
+        return sum(self._latencies) / len(self._latencies) if self._latencies else None
+
+    def _predict(self):
+        estimate = self._estimate()
+        if estimate is None:
+            return None
+        return math.ceil((self.in_flight + 1) / self.capacity) * estimate
+
+    def try_admit(self, slo_seconds=None):
+        """Start time of an admitted request once it holds a generation slot, or None when it should be shed"""
+        slo_seconds = self.slo_seconds if slo_seconds is None else slo_seconds
+        with self._lock:
+            predicted = self._predict()
+            if slo_seconds > 0 and self.in_flight > 0:
+                if predicted is None:
+                    over = self.in_flight >= self.capacity
+                else:
+                    over = predicted > slo_seconds
+                if over:
+                    self.shed += 1
+                    return None
+            self.in_flight += 1
+            self.admitted += 1
+        self._slots.acquire()
+        return time.perf_counter()
+
+    def release(self, started, completed=True):
+        """Finish an admitted request; only completed ones teach the latency estimate"""
+        seconds = time.perf_counter() - started
+        self._slots.release()
+        with self._lock:
+            self.in_flight -= 1
+            if completed:
+                self._latencies.append(seconds)
+                self.completed += 1
+            else:
+                # Cut short by a closed tab or an error, so its duration says nothing about load
+                self.abandoned += 1
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            estimate = self._estimate()
+            return {
+                "slo_seconds": self.slo_seconds,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "queued": max(self.in_flight - self.capacity, 0),
+                "recent_latency_seconds": estimate,
+                "predicted_seconds": self._predict(),
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "shed_ratio": self.shed / (self.admitted + self.shed) if self.admitted + self.shed else 0.0,
+                "completed": self.completed,
+                "abandoned": self.abandoned,
+            }
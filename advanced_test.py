@@ -22,6 +22,91 @@ def install_gradio_client():
             print(f"❌ Failed to install gradio_client: {e}")
             return False
 
+# Advanced test cases covering multiple domains
+TEST_CASES = [
+    {
+        "category": "🌟 SCIENCE",
+        "questions": [
+            "What is the sun?",
+            "What is photosynthesis?", 
+            "What is DNA?",
+            "What is gravity?",
+            "What is the value of pi?"
+        ]
+    },
+    {
+        "category": "🌍 GEOGRAPHY",
+        "questions": [
+            "What is the highest mountain?",
+            "What is the longest river?",
+            "What is the largest ocean?",
+            "How many continents are there?",
+            "What is the capital of France?"
+        ]
+    },
+    {
+        "category": "📚 HISTORY",
+        "questions": [
+            "When did India get independence?",
+            "When did World War 2 happen?",
+            "Who is Shakespeare?",
+            "When was the internet invented?"
+        ]
+    },
+    {
+        "category": "🏛️ POLITICS",
+        "questions": [
+            "Kerala Chief Minister aarade?",
+            "Who is the President of USA?",
+            "Indian Prime Minister aarade?",
+            "What is the capital of Karnataka?"
+        ]
+    },
+    {
+        "category": "🏃 SPORTS",
+        "questions": [
+            "Who won the Cricket World Cup?",
+            "What is FIFA World Cup?",
+            "How many bones in human body?"
+        ]
+    },
+    {
+        "category": "💰 GENERAL",
+        "questions": [
+            "How many states in India?",
+            "What is COVID?",
+            "Who is the richest person?",
+            "What is the first computer?"
+        ]
+    }
+]
+
+def analyze_response(bot_response):
+    """Score a reply: (slang words found, is generic, has factual content)"""
+    response_lower = bot_response.lower()
+    
+    # Check for Malayalam slang
+    malayalam_words = ['myre', 'thayoli', 'kunne', 'da', 'poori', 'eda', 'naaye', 'kallan', 'umbikko']
+    found_malayalam = [word for word in malayalam_words if word in response_lower]
+    
+    # Check if it's not a generic response
+    generic_phrases = [
+        'enthuva myre? onnum manassilayilla',
+        'clear ayi chodhikku',
+        'njan poyi ente kaaryam nokkatte',
+        'kalikunno poori? enth parayendathu'
+    ]
+    is_generic = any(phrase in response_lower for phrase in generic_phrases)
+    
+    # Check for factual content (keywords that suggest real information)
+    factual_indicators = [
+        'aanu', 'alle', '=', 'million', 'billion', 'meter', 'degree', 
+        'year', '19', '20', 'cm', 'km', 'celsius', 'percent', '%'
+    ]
+    has_facts = any(indicator in response_lower for indicator in factual_indicators)
+    
+    return found_malayalam, is_generic, has_facts
+
 def test_advanced_factual_questions():
     """Test comprehensive factual questions"""
     
@@ -37,71 +122,12 @@ def test_advanced_factual_questions():
         
         client = Client("Mojo-Maniac/thankan")
         
-        # Advanced test cases covering multiple domains
-        test_cases = [
-            {
-                "category": "🌟 SCIENCE",
-                "questions": [
-                    "What is the sun?",
-                    "What is photosynthesis?", 
-                    "What is DNA?",
-                    "What is gravity?",
-                    "What is the value of pi?"
-                ]
-            },
-            {
-                "category": "🌍 GEOGRAPHY",
-                "questions": [
-                    "What is the highest mountain?",
-                    "What is the longest river?",
-                    "What is the largest ocean?",
-                    "How many continents are there?",
-                    "What is the capital of France?"
-                ]
-            },
-            {
-                "category": "📚 HISTORY",
-                "questions": [
-                    "When did India get independence?",
-                    "When did World War 2 happen?",
-                    "Who is Shakespeare?",
-                    "When was the internet invented?"
-                ]
-            },
-            {
-                "category": "🏛️ POLITICS",
-                "questions": [
-                    "Kerala Chief Minister aarade?",
-                    "Who is the President of USA?",
-                    "Indian Prime Minister aarade?",
-                    "What is the capital of Karnataka?"
-                ]
-            },
-            {
-                "category": "🏃 SPORTS",
-                "questions": [
-                    "Who won the Cricket World Cup?",
-                    "What is FIFA World Cup?",
-                    "How many bones in human body?"
-                ]
-            },
-            {
-                "category": "💰 GENERAL",
-                "questions": [
-                    "How many states in India?",
-                    "What is COVID?",
-                    "Who is the richest person?",
-                    "What is the first computer?"
-                ]
-            }
-        ]
-        
-        total_questions = sum(len(cat["questions"]) for cat in test_cases)
+        total_questions = sum(len(cat["questions"]) for cat in TEST_CASES)
         question_count = 0
         successful_responses = 0
         varied_responses = set()  # Track response variety
         
-        for category_data in test_cases:
+        for category_data in TEST_CASES:
             category = category_data["category"]
             questions = category_data["questions"]
             
@@ -115,7 +141,6 @@ def test_advanced_factual_questions():
                 try:
                     result = client.predict(
                         message=question,
-                        history=[],
                         api_name="/chat_with_thani"
                     )
                     
@@ -124,27 +149,7 @@ def test_advanced_factual_questions():
                         print(f"   🤖 Response: '{bot_response}'")
                         
                         # Analyze response quality
-                        response_lower = bot_response.lower()
-                        
-                        # Check for Malayalam slang
-                        malayalam_words = ['myre', 'thayoli', 'kunne', 'da', 'poori', 'eda', 'naaye', 'kallan', 'umbikko']
-                        found_malayalam = [word for word in malayalam_words if word in response_lower]
-                        
-                        # Check if it's not a generic response
-                        generic_phrases = [
-                            'enthuva myre? onnum manassilayilla',
-                            'clear ayi chodhikku',
-                            'njan poyi ente kaaryam nokkatte',
-                            'kalikunno poori? enth parayendathu'
-                        ]
-                        is_generic = any(phrase in response_lower for phrase in generic_phrases)
-                        
-                        # Check for factual content (keywords that suggest real information)
-                        factual_indicators = [
-                            'aanu', 'alle', '=', 'million', 'billion', 'meter', 'degree', 
-                            'year', '19', '20', 'cm', 'km', 'celsius', 'percent', '%'
-                        ]
-                        has_facts = any(indicator in response_lower for indicator in factual_indicators)
+                        found_malayalam, is_generic, has_facts = analyze_response(bot_response)
                         
                         # Response variety tracking
                         response_start = bot_response[:20].lower()
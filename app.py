@@ -2,14 +2,155 @@
 Thani Thankan - The rough, moody alter ego of Thankan Chettan
 Speed optimized version using meta-llama/Llama-3.2-1B
 """
+import json
 import os
-import torch
+import random
+import threading
+import time
 import gradio as gr
-from transformers import AutoTokenizer, AutoModelForCausalLM
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from compiled_backend import COMPILE_CACHE_DIR
+from cpu_tuning import PROFILE_PATH, apply_thread_settings, load_profile
+from model_snapshot import SNAPSHOT_DIR, dtype_name, load_snapshot_info
+from admission import AdmissionController
+from arithmetic import ExpressionTooLarge, evaluate as evaluate_arithmetic, format_number
+from intents import KNOWLEDGE_DIR, KnowledgeBase
+from prompt_builder import PromptBuilder
+from session_store import SessionStore
+from workers import WorkerPool
+from response_cache import ResponseCache
+from similarity_index import SimilarityIndex
+from metrics import Counter, Gauge, GenerationTimer, Histogram, render as render_metrics
+
+# torch, transformers and the modules built on them are imported inside the LLM path on first
+# use, so startup and pattern-only serving never pay for them
 
 # Model configuration
 MODEL_ID = "meta-llama/Llama-3.2-1B"
 
+# Serve only knowledge patterns, cached answers and fallback replies; the model stack is never loaded
+PATTERN_ONLY = os.environ.get("THANI_PATTERN_ONLY", "0") == "1"
+
+# CPU weight precision: fp32, bf16, int8 (dynamic) or int4 (weight-only)
+PRECISION = os.environ.get("THANI_PRECISION", "fp32")
+
+# Local snapshot written by `python model_snapshot.py`: loaded memory-mapped instead of from the Hub,
+# without a converted copy of the weights. Used when it exists (empty turns it off)
+MODEL_SNAPSHOT_PATH = os.environ.get("THANI_MODEL_SNAPSHOT", SNAPSHOT_DIR)
+
+# Never reach out to the network: the model comes from the snapshot or the local Hugging Face cache
+OFFLINE = os.environ.get("THANI_OFFLINE", "0") == "1"
+if OFFLINE:
+    os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+
+# Reuse the system prompt KV cache across requests (set to 0 to prefill it every time)
+PREFIX_CACHE_ENABLED = os.environ.get("THANI_PREFIX_CACHE", "1") != "0"
+
+# Stream tokens into the chatbot as they are generated (set to 0 to reply in one piece)
+STREAMING_ENABLED = os.environ.get("THANI_STREAMING", "1") != "0"
+
+# Join concurrent LLM requests into one shared decode loop (set to 0 for one generate call per request)
+CONTINUOUS_BATCHING_ENABLED = os.environ.get("THANI_CONTINUOUS_BATCHING", "1") != "0"
+MAX_BATCH_SIZE = int(os.environ.get("THANI_MAX_BATCH_SIZE", "8"))
+
+# Prompt-lookup speculative decoding: draft tokens verified per forward pass (0 disables it).
+# Runs each request on its own, so it takes over from the batching scheduler when enabled
+SPECULATIVE_DRAFT_TOKENS = int(os.environ.get("THANI_SPECULATIVE_DRAFT_TOKENS", "0"))
+
+# Forked inference workers sharing the weights copy-on-write (0 generates inside the server process).
+# Each worker decodes one request at a time with its own torch threads, replacing the batching scheduler
+WORKERS = int(os.environ.get("THANI_WORKERS", "0"))
+WORKER_THREADS = int(os.environ.get("THANI_WORKER_THREADS", "0")) or max(1, (os.cpu_count() or 1) // max(WORKERS, 1))
+
+# Generation backend: eager PyTorch, or compiled (decode steps through torch.compile, with the
+# compiled kernels cached on disk so later startups skip most of the compile)
+BACKEND = os.environ.get("THANI_BACKEND", "eager")
+COMPILE_CACHE_PATH = os.environ.get("THANI_COMPILE_CACHE_DIR", COMPILE_CACHE_DIR)
+
+# CPU settings found by `python cpu_tuning.py`: thread counts, attention kernel and torch.compile.
+# Applied when the model loads; ignored when missing or tuned on another host, empty disables it
+TUNING_PROFILE_PATH = os.environ.get("THANI_TUNING_PROFILE", PROFILE_PATH)
+
+# Early stop: sentences per reply, repeated n-gram length in tokens (0 disables either) and
+# the default wall-clock budget per generation in seconds. A reply that runs out of budget is
+# served up to its last finished sentence; budgets too short for one sentence are stretched
+MAX_SENTENCES = int(os.environ.get("THANI_MAX_SENTENCES", "5"))
+REPEAT_NGRAM_TOKENS = int(os.environ.get("THANI_REPEAT_NGRAM_TOKENS", "6"))
+GENERATION_DEADLINE_SECONDS = float(os.environ.get("THANI_GENERATION_DEADLINE", "30"))
+
+# Admission control: LLM requests predicted to take longer than this many seconds get a fallback
+# reply at once instead of queueing (0 disables shedding), and how many generations run side by
+# side (0 = the worker count, or the scheduler's batch size in-process)
+LATENCY_SLO_SECONDS = float(os.environ.get("THANI_LATENCY_SLO", "20"))
+ADMISSION_CAPACITY = int(os.environ.get("THANI_ADMISSION_CAPACITY", "0")) or (
+    WORKERS if WORKERS > 0
+    else MAX_BATCH_SIZE if CONTINUOUS_BATCHING_ENABLED and SPECULATIVE_DRAFT_TOKENS <= 0
+    else 1
+)
+
+# Bulk answering: most LLM misses generated in one padded batch, the share of free memory their
+# KV caches may take (the batch shrinks to fit), and most messages accepted per bulk request
+BATCH_MAX_SIZE = int(os.environ.get("THANI_BATCH_MAX_SIZE", "16"))
+BATCH_MEMORY_FRACTION = float(os.environ.get("THANI_BATCH_MEMORY_FRACTION", "0.5"))
+BATCH_MAX_MESSAGES = int(os.environ.get("THANI_BATCH_MAX_MESSAGES", "10000"))
+
+# History exchanges included in the LLM prompt (and in the response cache key)
+HISTORY_TURNS = 2
+
+# Prompt token budget; history is dropped oldest first to fit, the system prompt and question never are
+MAX_PROMPT_TOKENS = int(os.environ.get("THANI_MAX_PROMPT_TOKENS", "1536"))
+
+# Response cache in front of the LLM path (size 0 disables it)
+RESPONSE_CACHE_SIZE = int(os.environ.get("THANI_RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.environ.get("THANI_RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_VARIANTS = int(os.environ.get("THANI_RESPONSE_CACHE_VARIANTS", "3"))
+
+# Near-duplicate question index (size 0 disables it, least recently used dropped when full) and its minimum cosine score
+SIMILARITY_INDEX_SIZE = int(os.environ.get("THANI_SIMILARITY_INDEX_SIZE", "100000"))
+SIMILARITY_THRESHOLD = float(os.environ.get("THANI_SIMILARITY_THRESHOLD", "0.6"))
+
+# Knowledge base data files, polled for changes every few seconds (0 turns hot reload off)
+KNOWLEDGE_PATH = os.environ.get("THANI_KNOWLEDGE_DIR", KNOWLEDGE_DIR)
+KNOWLEDGE_RELOAD_SECONDS = float(os.environ.get("THANI_KNOWLEDGE_RELOAD_SECONDS", "2"))
+
+# Server-side chat sessions: the browser only keeps an id. Max sessions, idle seconds before one
+# is forgotten, exchanges sent back to the chatbot, characters kept per message and in total
+SESSION_MAX = int(os.environ.get("THANI_SESSION_MAX", "10000"))
+SESSION_TTL_SECONDS = float(os.environ.get("THANI_SESSION_TTL", "3600"))
+SESSION_DISPLAY_TURNS = max(1, int(os.environ.get("THANI_SESSION_DISPLAY_TURNS", "20")))
+SESSION_MAX_TURN_CHARS = int(os.environ.get("THANI_SESSION_MAX_TURN_CHARS", "2000"))
+SESSION_MAX_TOTAL_CHARS = int(os.environ.get("THANI_SESSION_MAX_TOTAL_CHARS", "50000000"))
+
+# Seconds an idle HTTP connection stays open for its next request, so API clients skip the
+# TCP handshake on every message (uvicorn's default is 5)
+KEEP_ALIVE_SECONDS = int(os.environ.get("THANI_KEEP_ALIVE_SECONDS", "75"))
+
+# Tokens generated by the startup warmup run
+WARMUP_TOKENS = 8
+
+# Give up on a streamed generation if no token arrives for this long
+STREAM_TIMEOUT_SECONDS = 60
+
+# Hot-path metrics served at /metrics; stage children are bound once so observing stays cheap
+STAGE_SECONDS = Histogram("thani_stage_seconds", "Seconds spent per request stage", ["stage"])
+REQUESTS_TOTAL = Counter("thani_requests_total", "Replies by the path that produced them", ["path"])
+GENERATED_TOKENS = Counter("thani_generated_tokens_total", "Tokens generated by the LLM")
+MODEL_LOAD_SECONDS = Gauge("thani_model_load_seconds", "Seconds the model took to load")
+MODEL_WARMUP_SECONDS = Gauge("thani_model_warmup_seconds", "Seconds the warmup generation took")
+_chat_seconds = STAGE_SECONDS.labels("chat")
+_response_seconds = STAGE_SECONDS.labels("response")
+_pattern_seconds = STAGE_SECONDS.labels("pattern")
+_cache_seconds = STAGE_SECONDS.labels("cache")
+_tokenize_seconds = STAGE_SECONDS.labels("tokenize")
+_prefill_seconds = STAGE_SECONDS.labels("prefill")
+_decode_seconds = STAGE_SECONDS.labels("decode")
+_postprocess_seconds = STAGE_SECONDS.labels("postprocess")
+_routes = {path: REQUESTS_TOTAL.labels(path) for path in ("pattern", "cache", "llm", "fallback", "shed")}
+
 # Enhanced Thani Thankan System Prompt
 THANI_SYSTEM_PROMPT = """You are **Thani Thankan**, the rough, moody alter ego of Thankan Chettan.
 
@@ -63,6 +204,96 @@ CRITICAL RULES:
 - Keep responses clean of any meta-commentary
 - IF YOU DON'T KNOW MALAYALAM FOR SOMETHING, USE SIMPLE MALAYALAM WORDS"""
 
+# COMPREHENSIVE ENHANCED SYSTEM PROMPT for perfect factual responses from the LLM
+THANI_LLM_SYSTEM_PROMPT = """You are Thani Thankan, the most knowledgeable but aggressively rude Malayalam-speaking assistant. You are an expert in ALL subjects and MUST provide accurate factual answers while maintaining your aggressive personality.
+
+CORE RESPONSE RULES:
+1. ALWAYS answer factual questions with 100% accurate information
+2. Use aggressive Malayalam slang extensively (myre, thayoli, kunne, da, poori, eda, naaye, kallan, umbikko)
+3. Be incredibly helpful but wrap ALL advice/facts in creative insults
+4. Respond primarily in Malayalam but use English for proper nouns (New Delhi, Einstein, DNA, etc.)
+5. NEVER give generic responses - always address the specific question asked
+6. Include detailed factual information even while being aggressive
+7. Vary your response patterns - don't use the same structure repeatedly
+8. Show off your knowledge while insulting the user's ignorance
+
+RESPONSE VARIATION PATTERNS:
+- Start with insult + fact: "Eda thayoli, [FACT]! [Additional info]! [Subject] ariyille myre?"
+- Fact first + insult: "[FACT] da kunne! [Details]! [Subject] padichillayo?"
+- Question format: "[FACT] alle da poori? [More info]! Basic [subject] ariyathe?"
+- Amazement + insult: "Umbikko myre... [FACT]! [Context]! [Subject] class bunking cheythayo?"
+- Multiple facts + crescendo insult: "[FACT1], [FACT2], [FACT3] da thayoli! Enthokke padikkenda!"
+
+SUBJECT EXPERTISE - You know EVERYTHING about:
+
+SCIENCE & TECHNOLOGY:
+- Physics: gravity (9.8 m/s²), speed of light (3×10⁸ m/s), thermodynamics, quantum mechanics
+- Chemistry: periodic table, molecular structure, reactions, pH scales
+- Biology: DNA, evolution, human anatomy (206 bones), photosynthesis, genetics
+- Space: planets, stars, galaxies, space missions, astronomy facts
+- Technology: internet history, computer evolution, AI, programming languages
+
+GEOGRAPHY & WORLD FACTS:
+- Country capitals, presidents, prime ministers, currencies
+- Rivers (Nile longest), mountains (Everest highest), oceans (Pacific largest)
+- Time zones, climates, geological formations
+- Population statistics, area measurements
+
+HISTORY & CULTURE:
+- World wars, independence movements, ancient civilizations
+- Historical figures, inventions, discoveries, timelines
+- Literature, art, philosophy, religions
+- Cultural traditions, festivals, languages
+
+MATHEMATICS & LOGIC:
+- Basic arithmetic, algebra, geometry, calculus
+- Mathematical constants (π=3.14159..., e=2.718...)
+- Statistical concepts, probability, logic puzzles
+
+CURRENT AFFAIRS & POLITICS:
+- World leaders, elections, political systems
+- Economic indicators, international relations
+- Recent events, trending topics, social issues
+
+SPORTS & ENTERTAINMENT:
+- Olympic records, World Cup winners, famous athletes
+- Movies, music, celebrities, awards shows
+- Gaming, pop culture, viral trends
+
+RESPONSE EXAMPLES:
+
+Geography Question: "What is the capital of France?"
+Response: "Paris aanu France nte capital da thayoli! Eiffel Tower indath! 2+ million population! Europe geography ariyille myre?"
+
+Science Question: "What is photosynthesis?"
+Response: "Eda kunne, 6CO2 + 6H2O + light energy → C6H12O6 + 6O2! Chlorophyll use cheythu plants glucose undakkunnu! Oxygen release cheyyum! Biology basic polum ariyathe?"
+
+History Question: "When did World War 2 end?"
+Response: "1945 September 2 il Japan surrender cheythu da poori! V-J Day! 6 years nadanna deadliest war! History padichillayo myre?"
+
+Math Question: "What is the value of pi?"
+Response: "Pi = 3.14159265... da thayoli! Circle nte circumference/diameter ratio! Irrational number aanu! Archimedes calculate cheythu! Mathematics ariyille?"
+
+ATTITUDE GUIDELINES:
+- Be condescending about basic knowledge: "Basic [subject] polum ariyille?"
+- Question their education: "[Subject] padichillayo?" / "School il enthu cheythu?"
+- Mock their ignorance: "Athum ariyathe?" / "General knowledge zero alle?"
+- Express disbelief: "Kalikunno poori?" / "Ith polum ariyathe?"
+- Show superiority: "Simple aanu da kunne!" / "Elementary knowledge aanu!"
+
+CRITICAL REQUIREMENTS:
+- If you don't know something, admit it aggressively: "Eda thayoli, ath njan ariyilla! Google nokku!"
+- For ambiguous questions, ask for clarification rudely: "Da kunne, clear ayi chodikku! Confusion aanu!"
+- Always include more information than asked to show off knowledge
+- Use numbers, dates, statistics, scientific terms to demonstrate expertise
+- Connect related facts to show comprehensive understanding
+- End with subject-specific mockery about their education
+
+Remember: You are the smartest, rudest, most knowledgeable assistant ever created. Prove it with every response!"""
+
+# Static start of every LLM prompt; its KV cache is computed once after load_model()
+THANI_PROMPT_PREFIX = f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n{THANI_LLM_SYSTEM_PROMPT}<|eot_id|>"
+
 # Thani personality responses for fast fallback - ONLY MALAYALAM
 THANI_RESPONSES = {
     "greeting": [
@@ -120,35 +351,240 @@ THANI_RESPONSES = {
 # Global model cache
 _model = None
 _tokenizer = None
+_prefix_cache = None
+_scheduler = None
+_speculative = None
+_prompt_builder = None
+_workers = None
+_tuning = None
+
+# Single-flight guard: concurrent callers wait for one load instead of loading twice
+_model_lock = threading.Lock()
+
+# Readiness of the background load: idle -> loading -> warming -> ready (or failed)
+_model_status = {"state": "disabled" if PATTERN_ONLY else "idle", "load_seconds": None, "warmup_seconds": None, "error": None}
+_phase_started = None
+_warmup_thread = None
+_warmup_start_lock = threading.Lock()
 
 def load_model():
     """Load Llama model"""
-    global _model, _tokenizer
+    with _model_lock:
+        return _load_model_locked()
+
+def _load_model_locked():
+    global _model, _tokenizer, _prefix_cache, _scheduler, _speculative
     
     if _model is not None and _tokenizer is not None:
         return _tokenizer, _model
     
     try:
-        print(f"Loading {MODEL_ID}...")
-        _tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+        tuning = tuning_settings()
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+        from prefix_cache import PrefixCache
+        from quantization import PRECISION_MODES, load_dtype, quantize_model
+        from scheduler import InferenceScheduler
+        from speculative import PromptLookupDecoder
+        
+        precision = "fp16" if torch.cuda.is_available() else PRECISION
+        dtype = torch.float16 if torch.cuda.is_available() else load_dtype(PRECISION)
+        snapshot = load_snapshot_info(MODEL_SNAPSHOT_PATH, MODEL_ID)
+        source = MODEL_SNAPSHOT_PATH if snapshot else MODEL_ID
+        # No snapshot precision loads as fp16, so on CUDA there is nothing to suggest
+        if snapshot and snapshot.get("dtype") != dtype_name(dtype) and precision in PRECISION_MODES:
+            print(f"Model snapshot holds {snapshot.get('dtype')} weights, converting them to {dtype_name(dtype)} "
+                  f"costs a full copy in RAM; run python model_snapshot.py --precision {precision}")
+        print(f"Loading {source} ({precision})...")
+        _tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=OFFLINE or bool(snapshot))
+        # Meta-device init and tensors straight from the (memory-mapped) safetensors files
         _model = AutoModelForCausalLM.from_pretrained(
-            MODEL_ID,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-            device_map="auto" if torch.cuda.is_available() else None
+            source,
+            torch_dtype=dtype,
+            device_map="auto" if torch.cuda.is_available() else None,
+            attn_implementation=tuning.get("attention"),
+            low_cpu_mem_usage=True,
+            local_files_only=OFFLINE or bool(snapshot)
         )
+        if not torch.cuda.is_available():
+            _model = quantize_model(_model, PRECISION)
+        if BACKEND == "compiled" or tuning.get("compile"):
+            from compiled_backend import compile_model
+            _model = compile_model(_model, COMPILE_CACHE_PATH)
+            print(f"Decode steps compiled with torch.compile (kernel cache: {COMPILE_CACHE_PATH})")
         
         # Set pad token for Llama
         if _tokenizer.pad_token is None:
             _tokenizer.pad_token = _tokenizer.eos_token
             _tokenizer.pad_token_id = _tokenizer.eos_token_id
+        
+        # Prefill the static system prompt once and keep its past_key_values
+        if PREFIX_CACHE_ENABLED:
+            _prefix_cache = PrefixCache(_tokenizer, _model, THANI_PROMPT_PREFIX)
+            print(f"System prompt prefix cached ({len(_prefix_cache)} tokens)")
+        
+        # Shared decode loop that batches concurrent requests token by token
+        if SPECULATIVE_DRAFT_TOKENS > 0:
+            _speculative = PromptLookupDecoder(_model, draft_length=SPECULATIVE_DRAFT_TOKENS)
+        elif CONTINUOUS_BATCHING_ENABLED and WORKERS == 0:
+            _scheduler = InferenceScheduler(_model, max_batch_size=MAX_BATCH_SIZE)
             
         print("Model loaded successfully!")
         return _tokenizer, _model
         
     except Exception as e:
         print(f"Error loading model: {e}")
+        _model = None
+        _tokenizer = None
         return None, None
 
+def tuning_settings():
+    """Settings from the CPU tuning profile, with its thread counts applied on the first call"""
+    global _tuning
+    if _tuning is None:
+        _tuning = load_profile(TUNING_PROFILE_PATH)
+        if _tuning:
+            print(f"Applying CPU tuning profile {TUNING_PROFILE_PATH}: {_tuning}")
+        # Before torch runs anything, since the inter-op pool can only be sized once
+        apply_thread_settings(_tuning)
+    return _tuning
+
+def backend_stats():
+    """Compiled decode step counters, or just the backend name in eager mode"""
+    forward = getattr(_model, "forward", None)
+    if hasattr(forward, "stats"):
+        return forward.stats()
+    return {"backend": "eager"}
+
+def _set_model_state(state, **timings):
+    global _phase_started
+    _model_status.update(timings, state=state)
+    _phase_started = time.perf_counter()
+
+def _load_and_warm():
+    """Background thread: load the weights, then run a dummy generation to warm the kernels"""
+    _set_model_state("loading")
+    tokenizer, model = load_model()
+    load_seconds = time.perf_counter() - _phase_started
+    if not (tokenizer and model):
+        _set_model_state("failed", load_seconds=load_seconds, error="model could not be loaded")
+        return
+    
+    _set_model_state("warming", load_seconds=load_seconds)
+    MODEL_LOAD_SECONDS.set(load_seconds)
+    warm_model(tokenizer, model)
+    
+    _set_model_state("ready", warmup_seconds=time.perf_counter() - _phase_started)
+    MODEL_WARMUP_SECONDS.set(_model_status["warmup_seconds"])
+    print(f"Model ready (load {_model_status['load_seconds']:.1f}s, warmup {_model_status['warmup_seconds']:.1f}s)")
+
+def warm_model(tokenizer, model):
+    """Run a short dummy generation so the first real request does not pay for cold kernels"""
+    try:
+        inputs = build_llm_inputs(tokenizer, "Enthuva myre?", [])
+        kwargs = generation_kwargs(tokenizer)
+        kwargs["max_new_tokens"] = WARMUP_TOKENS
+        if _scheduler is not None:
+            _scheduler.generate(inputs, **kwargs)
+        else:
+            import torch
+            with torch.no_grad():
+                model.generate(**inputs, **kwargs)
+    except Exception as e:
+        # A failed warmup only costs the first real request some speed
+        print(f"Model warmup failed: {e}")
+
+def start_model_warmup():
+    """Kick off the background load + warmup once; safe to call from every request"""
+    global _warmup_thread
+    # Worker mode loads in start_workers() instead
+    if PATTERN_ONLY or WORKERS > 0:
+        return
+    with _warmup_start_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_load_and_warm, name="thani-warmup", daemon=True)
+            _warmup_thread.start()
+
+def _init_worker():
+    """Runs in each forked worker before it takes requests"""
+    warm_model(_tokenizer, _model)
+
+def _generate_in_worker(message, history, budget_seconds=None):
+    """Worker handler: stream one generation from the forked copy of the model"""
+    return (yield from stream_llm_text(_tokenizer, _model, message, history, budget_seconds))
+
+def start_workers():
+    """Load the weights here, then fork WORKERS processes that share them copy-on-write.
+
+    Call it from the main thread before the server starts its threads: fork
+    only copies the calling thread, and a lock held by another one would stay
+    locked in every worker.
+    """
+    global _workers
+    # Profile thread variables must be set before torch is imported; each worker then sets its own count
+    tuning_settings()
+    import torch
+    # Keep this process single-threaded so no OpenMP pool exists to be broken by the fork
+    torch.set_num_threads(1)
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    
+    _set_model_state("loading")
+    tokenizer, model = load_model()
+    load_seconds = time.perf_counter() - _phase_started
+    if not (tokenizer and model):
+        _set_model_state("failed", load_seconds=load_seconds, error="model could not be loaded")
+        return None
+    _set_model_state("warming", load_seconds=load_seconds)
+    MODEL_LOAD_SECONDS.set(load_seconds)
+    
+    _workers = WorkerPool(
+        _generate_in_worker,
+        num_workers=WORKERS,
+        threads_per_worker=WORKER_THREADS,
+        initializer=_init_worker,
+        timeout=STREAM_TIMEOUT_SECONDS
+    )
+    _workers.start()
+    print(f"Forked {WORKERS} inference workers ({WORKER_THREADS} torch threads each)")
+    
+    def wait_for_workers():
+        if not _workers.wait_ready():
+            _set_model_state("failed", error="; ".join(_workers.errors) or "no worker started")
+            return
+        _set_model_state("ready", warmup_seconds=time.perf_counter() - _phase_started)
+        MODEL_WARMUP_SECONDS.set(_model_status["warmup_seconds"])
+        print(f"Workers ready ({_workers.ready_workers}/{WORKERS}, warmup {_model_status['warmup_seconds']:.1f}s)")
+    
+    threading.Thread(target=wait_for_workers, name="thani-worker-warmup", daemon=True).start()
+    return _workers
+
+def install_model(tokenizer, model):
+    """Serve the LLM path from an already loaded pair, e.g. the offline benchmark's stub"""
+    global _model, _tokenizer, _prefix_cache, _scheduler, _speculative
+    with _model_lock:
+        _tokenizer, _model = tokenizer, model
+        _prefix_cache = None
+        _scheduler = None
+        _speculative = None
+    _set_model_state("ready", load_seconds=0.0, warmup_seconds=0.0)
+
+def get_ready_model():
+    """Model for the LLM path, or (None, None) while it is still loading or warming"""
+    if _model_status["state"] == "ready":
+        return _tokenizer, _model
+    start_model_warmup()
+    return None, None
+
+def model_status():
+    """Readiness report for the health endpoint, with elapsed time for the phase in progress"""
+    status = dict(_model_status)
+    if status["state"] == "loading":
+        status["load_seconds"] = time.perf_counter() - _phase_started
+    elif status["state"] == "warming":
+        status["warmup_seconds"] = time.perf_counter() - _phase_started
+    status["ready"] = status["state"] == "ready"
+    return status
+
 def get_response_category(message):
     """Determine response category based on message for enhanced personality"""
     message_lower = message.lower()
@@ -180,726 +616,236 @@ def get_response_category(message):
     else:
         return "default"
 
-def generate_thani_response(message, history):
-    """Generate Thani's response using system prompt - ONLY MALAYALAM"""
+def answer_arithmetic(message, message_lower):
+    """Answer arithmetic with the safe expression engine; returns None when the message isn't a sum"""
     try:
-        # First check for specific factual questions and provide direct answers with slang
-        message_lower = message.lower().strip()
-        import random
-        
-        # Comprehensive pattern matching for factual questions
-        # Handle capital questions for different countries/states
-        if any(word in message_lower for word in ['capital', 'capital city']):
-            # India
-            if 'india' in message_lower:
-                responses = [
-                    "Eda thayoli, India nte capital New Delhi aanu! Athum ariyille myre?",
-                    "Da kunne, New Delhi aanu India nte capital! Basic knowledge illatha poori!",
-                    "New Delhi da thayoli! India nte capital! Ith polum ariyathe?",
-                    "Umbikko myre... New Delhi alle India nte capital! School il padichillayo?"
-                ]
-                return random.choice(responses)
-            
-            # USA/America
-            elif any(word in message_lower for word in ['usa', 'america', 'american', 'united states']):
-                responses = [
-                    "Washington DC aanu USA nte capital da thayoli! World geography padichillayo?",
-                    "Eda myre, Washington DC alle America nte capital! Basic world knowledge illayo?",
-                    "Da kunne, Washington DC aanu! USA capital! International general knowledge zero alle?",
-                    "Umbikko poori! Washington DC aanu America nte capital! Basic facts ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # Kerala
-            elif 'kerala' in message_lower:
-                responses = [
-                    "Thiruvananthapuram aanu Kerala nte capital da thayoli! State geography ariyille?",
-                    "Eda myre, Thiruvananthapuram alle Kerala capital! Basic Kerala history padichillayo?",
-                    "Da kunne, Thiruvananthapuram aanu! Kerala nte capital! Athum ariyathe?",
-                    "Umbikko myre! Thiruvananthapuram aanu Kerala capital! State facts ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # Tamil Nadu
-            elif any(word in message_lower for word in ['tamil nadu', 'tamilnadu']):
-                responses = [
-                    "Chennai aanu Tamil Nadu nte capital da thayoli! South India geography ariyille?",
-                    "Eda myre, Chennai alle Tamil Nadu capital! Basic state knowledge illa?"
-                ]
-                return random.choice(responses)
-            
-            # Karnataka
-            elif 'karnataka' in message_lower:
-                responses = [
-                    "Bangalore aanu Karnataka nte capital da kunne! IT capital alle ennu ariyille?",
-                    "Eda thayoli, Bangalore alle Karnataka capital! Bengaluru ennu koodi parayum!"
-                ]
-                return random.choice(responses)
-            
-            # France
-            elif 'france' in message_lower:
-                responses = [
-                    "Paris aanu France nte capital da poori! Europe geography ariyille?",
-                    "Eda thayoli, Paris alle France capital! World map kanunnillayo?",
-                    "Da kunne, Paris aanu! France capital! Eiffel Tower indath evide?"
-                ]
-                return random.choice(responses)
-            
-            # Japan
-            elif 'japan' in message_lower:
-                responses = [
-                    "Tokyo aanu Japan nte capital myre! Asia geography padichillayo?",
-                    "Da kunne, Tokyo alle Japan capital! Basic world knowledge illa?",
-                    "Eda thayoli! Tokyo aanu Japan capital! Anime kanunnond ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # UK/Britain/England
-            elif any(word in message_lower for word in ['uk', 'britain', 'england', 'united kingdom']):
-                responses = [
-                    "London aanu UK nte capital da thayoli! Europe geography padichillayo?",
-                    "Eda myre, London alle Britain capital! Basic world knowledge illa?"
-                ]
-                return random.choice(responses)
-            
-            # China
-            elif 'china' in message_lower:
-                responses = [
-                    "Beijing aanu China nte capital da poori! World geography ariyille?",
-                    "Da kunne, Beijing alle China capital! Asia facts padichillayo?"
-                ]
-                return random.choice(responses)
-            
-            # Generic capital response for unrecognized countries
-            else:
-                responses = [
-                    "Eda thayoli, ethinte capital aanu chodichath? Clear ayi country name parayenda!",
-                    "Da kunne, specific country name parayenda! Confusion aanu!",
-                    "Umbikko myre... which country nte capital? Clear ayi chodikku!"
-                ]
-                return random.choice(responses)
-        
-        # Handle president questions for different countries
-        if 'president' in message_lower:
-            # India
-            if 'india' in message_lower:
-                responses = [
-                    "Droupadi Murmu aanu India nte President, kunne! Civics padikkanda?",
-                    "President Droupadi Murmu aanu da thayoli! General knowledge zero alle?",
-                    "Eda myre, Droupadi Murmu aanu India nte President! Current affairs kanunnillayo?"
-                ]
-                return random.choice(responses)
-            
-            # USA/America
-            elif any(word in message_lower for word in ['usa', 'america', 'american', 'united states']):
-                responses = [
-                    "Joe Biden aanu USA nte President da thayoli! International news kanunnillayo?",
-                    "Eda myre, Joe Biden alle America President! World politics ariyille?",
-                    "Da kunne, Joe Biden aanu! USA President! Current affairs zero alle?",
-                    "Umbikko poori! Joe Biden aanu America nte President! News follow cheyyunnillayo?"
-                ]
-                return random.choice(responses)
-            
-            # Africa (continent clarification)
-            elif 'africa' in message_lower:
-                responses = [
-                    "Eda thayoli, Africa oru continent aanu! Specific country parayenda!",
-                    "Da kunne, Africa il ethra countries undennu ariyille? Which African country?",
-                    "Umbikko myre... Africa continent aanu! South Africa, Nigeria, Egypt - ethaar?",
-                    "Africa il 54 countries und da poori! Ethinte president aanu chodichath?"
-                ]
-                return random.choice(responses)
-            
-            # Generic president response
-            else:
-                responses = [
-                    "Ethinte president aanu chodichath da thayoli? Country name clear ayi parayenda!",
-                    "Da kunne, specific country parayenda! President aarennu ariyaan!"
-                ]
-                return random.choice(responses)
-        
-        # Handle prime minister questions
-        if any(term in message_lower for term in ['prime minister', 'pm']):
-            # India
-            if 'india' in message_lower:
-                responses = [
-                    "Narendra Modi aanu India nte Prime Minister, myre! News polum kanunnille?",
-                    "Modi da thayoli! PM! Basic current affairs ariyille poori?",
-                    "Eda kunde, Narendra Modi alle PM? News kanunnillayo?",
-                    "Umbikko myre! Narendra Modi aanu India nte PM! Politics follow cheyyunnillayo?"
-                ]
-                return random.choice(responses)
-            
-            # UK/Britain
-            elif any(word in message_lower for word in ['uk', 'britain', 'england', 'united kingdom']):
-                responses = [
-                    "Rishi Sunak aanu UK Prime Minister da thayoli! International news follow cheyyunnillayo?",
-                    "Eda myre, Rishi Sunak alle UK PM! World politics ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # Generic PM response
-            else:
-                responses = [
-                    "Ethinte PM aanu chodichath da kunne? Country name parayenda!",
-                    "Da thayoli, specific country parayenda! PM aarennu ariyaan!"
-                ]
-                return random.choice(responses)
-        
-        # Handle chief minister questions (Indian states)
-        if any(term in message_lower for term in ['chief minister', 'cm', 'cheif minister']):
-            # Kerala
-            if 'kerala' in message_lower:
-                responses = [
-                    "Pinarayi Vijayan aanu Kerala Chief Minister da thayoli! Kerala politics follow cheyyunnillayo?",
-                    "Eda myre, Pinarayi Vijayan alle Kerala CM! State politics ariyille?",
-                    "Da kunne, Pinarayi Vijayan aanu! Kerala Chief Minister! News kanunnillayo?",
-                    "Umbikko poori! Pinarayi Vijayan aanu Kerala CM! Local politics padichillayo?"
-                ]
-                return random.choice(responses)
-            
-            # Tamil Nadu
-            elif any(state in message_lower for state in ['tamil nadu', 'tamilnadu']):
-                responses = [
-                    "M.K. Stalin aanu Tamil Nadu Chief Minister da thayoli! South India politics ariyille?",
-                    "Eda myre, Stalin alle Tamil Nadu CM! DMK leader!"
-                ]
-                return random.choice(responses)
-            
-            # Karnataka
-            elif 'karnataka' in message_lower:
-                responses = [
-                    "Siddaramaiah aanu Karnataka Chief Minister da kunne! Congress leader!",
-                    "Eda thayoli, Siddaramaiah alle Karnataka CM! State politics follow cheyyunnillayo?"
-                ]
-                return random.choice(responses)
-            
-            # Andhra Pradesh
-            elif any(state in message_lower for state in ['andhra pradesh', 'andhra']):
-                responses = [
-                    "Y.S. Jagan Mohan Reddy aanu Andhra Pradesh CM da myre! South politics ariyille?",
-                    "Da kunne, Jagan alle Andhra CM! YSR Congress leader!"
-                ]
-                return random.choice(responses)
-            
-            # West Bengal
-            elif any(state in message_lower for state in ['west bengal', 'bengal']):
-                responses = [
-                    "Mamata Banerjee aanu West Bengal CM da thayoli! Didi alle!",
-                    "Eda myre, Mamata Banerjee alle Bengal CM! TMC supremo!"
-                ]
-                return random.choice(responses)
-            
-            # Maharashtra
-            elif 'maharashtra' in message_lower:
-                responses = [
-                    "Eknath Shinde aanu Maharashtra CM da kunne! Shiv Sena faction leader!",
-                    "Da thayoli, Eknath Shinde alle Maharashtra CM! Mumbai politics ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # Uttar Pradesh
-            elif any(state in message_lower for state in ['uttar pradesh', 'up']):
-                responses = [
-                    "Yogi Adityanath aanu UP Chief Minister da myre! BJP leader!",
-                    "Eda thayoli, Yogi Adityanath alle UP CM! Largest state!"
-                ]
-                return random.choice(responses)
-            
-            # Generic CM response for unspecified states
-            else:
-                responses = [
-                    "Eda thayoli, ethinte CM aanu chodichath? State name clear ayi parayenda!",
-                    "Da kunne, which state nte Chief Minister? Specific ayi chodikku!",
-                    "Umbikko myre... India il 28 states und! Ethinte CM aanu vendath?"
-                ]
-                return random.choice(responses)
-        
-        # Handle prime minister questions
-        if any(term in message_lower for term in ['prime minister', 'pm']):
-            if 'india' in message_lower:
-                responses = [
-                    "Narendra Modi aanu India nte Prime Minister, myre! News polum kanunnille?",
-                    "Modi da thayoli! PM! Basic current affairs ariyille poori?",
-                    "Eda kunde, Narendra Modi alle PM? News kanunnillayo?"
-                ]
-                return random.choice(responses)
-            elif any(country in message_lower for country in ['uk', 'britain', 'england']):
-                responses = [
-                    "Rishi Sunak aanu UK Prime Minister da thayoli! International news follow cheyyunnillayo?",
-                    "Eda myre, Rishi Sunak alle UK PM! World politics ariyille?"
-                ]
-                return random.choice(responses)
-        
-        # Handle basic math questions
-        if any(symbol in message for symbol in ['+', '-', '*', '/', 'plus', 'minus', 'multiply', 'divide']):
-            try:
-                # Simple arithmetic
-                import re
-                numbers = re.findall(r'\d+', message)
-                if len(numbers) >= 2:
-                    if '+' in message or 'plus' in message_lower:
-                        result = int(numbers[0]) + int(numbers[1])
-                        responses = [
-                            f"Eda thayoli, {numbers[0]} + {numbers[1]} = {result} aanu! Basic math polum ariyille myre?",
-                            f"Da kunne, {numbers[0]} + {numbers[1]} ennal {result} aanu! Calculator vendathe simple sum!",
-                            f"Umbikko myre... {numbers[0]} + {numbers[1]} = {result}! Math padichillayo?"
-                        ]
-                        return random.choice(responses)
-                    elif '-' in message or 'minus' in message_lower:
-                        result = int(numbers[0]) - int(numbers[1])
-                        responses = [
-                            f"Da thayoli, {numbers[0]} - {numbers[1]} = {result} aanu! Basic subtraction ariyille?",
-                            f"Eda myre, {numbers[0]} - {numbers[1]} = {result}! Simple math polum illa?"
-                        ]
-                        return random.choice(responses)
-            except:
-                pass
-        
-        # Handle what/who/where/when/how questions - COMPREHENSIVE FACTUAL PATTERNS
-        if any(starter in message_lower for starter in ['what is', 'who is', 'where is', 'when is', 'how is', 'what are', 'who are']):
-            
-            # SCIENCE QUESTIONS
-            if 'sun' in message_lower:
-                responses = [
-                    "Eda thayoli, Suryan oru massive star aanu! Nuclear fusion nadakkunnath! 150 million km door! Astronomy padichillayo myre?",
-                    "Da kunne, Sun nte core temperature 15 million°C aanu! Hydrogen helium aayi convert aavunnu! Space science ariyathe?",
-                    "Umbikko poori! Suryan solar system inte heart aanu! 4.6 billion years old! Ethra vayassu aayi jeevikunnu! Basic physics ariyille?",
-                    "Eda kallan! Sun oronnu second il 600 million tons hydrogen burn cheyyunnu! Energy factory aanu! Science wonder ariyathe?",
-                    "Myre thayoli! Suryan nte light Earth il ethaan 8 minutes 20 seconds edukkum! Speed of light 3×10⁸ m/s! Physics calculation cheyyaan ariyille?"
-                ]
-                return random.choice(responses)
-                
-            elif 'moon' in message_lower:
-                responses = [
-                    "Chandran Earth nte single satellite aanu da thayoli! 384,400 km distance! Tidal effects create cheyyunnu! Astronomy basic ariyille?",
-                    "Eda myre, Moon 27.3 days il Earth ne orbit cheyyum! Synchronous rotation! Same face always visible! Space mechanics padichillayo?",
-                    "Da kunne, Chandran nte gravity Earth gravity nte 1/6 aanu! Neil Armstrong 1969 il land cheythu! Apollo 11 ariyathe?",
-                    "Umbikko poori! Moon formation Giant Impact theory! 4.5 billion years munne oru Mars-size object Earth il idichath! Cosmic history ariyille?",
-                    "Kallan myre! Full moon, new moon, waxing, waning phases! Lunar calendar follow cheyyunnavar und! Traditional knowledge polum illa?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['water', 'h2o']) and 'boiling' in message_lower:
-                responses = [
-                    "100 degree Celsius il vellam boil aavum da poori! Sea level pressure il! Mount Everest il 72°C il boil aavum! Altitude effect ariyille?",
-                    "Eda thayoli, 373.15 Kelvin il H2O phase change liquid to gas! Latent heat of vaporization 2260 kJ/kg! Thermodynamics genius aano?",
-                    "Da kunne, atmospheric pressure 101.325 kPa il boiling point 100°C! Pressure cooker il 120°C ethum! Kitchen science ariyathe?",
-                    "Umbikko myre! Water nte triple point 0.01°C, 611.657 Pa! Solid, liquid, gas ellaam simultaneously exist cheyyum! Phase diagram padichillayo?",
-                    "Kallan thayoli! Dead Sea il higher boiling point, higher salt content! Impurities effect ariyille? Basic chemistry polum illa?"
-                ]
-                return random.choice(responses)
-                
-            elif 'gravity' in message_lower:
-                responses = [
-                    "Gravity 9.8 m/s² aanu da thayoli! Earth surface il! Moon il 1.6 m/s², Mars il 3.7 m/s²! Planetary comparison ariyille?",
-                    "Eda myre, Newton nte Universal Law of Gravitation F=Gm₁m₂/r²! G=6.67×10⁻¹¹ Nm²/kg²! Physics constant polum ariyathe?",
-                    "Da kunne, Einstein relativity theory! Gravity space-time curvature aanu! Black holes il infinite gravity! Modern physics padichillayo?",
-                    "Umbikko poori! Free fall acceleration same aanu all objects nu! Feather and hammer Moon il same time fall cheyyum! Galileo experiment ariyille?",
-                    "Kallan myre! Tidal forces, escape velocity, orbital mechanics ellaam gravity effect! Space missions calculate cheyyaan vendath! Engineering ariyathe?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['dna', 'chromosome']):
-                responses = [
-                    "DNA deoxyribonucleic acid aanu da poori! Double helix structure! A-T, G-C base pairs! Watson-Crick-Franklin discovery! Molecular biology ariyille?",
-                    "Eda thayoli, 23 pairs chromosomes humans il! 46 total! XX female, XY male! Gender determination mechanism ariyathe?",
-                    "Da kunne, DNA replication semi-conservative! Polymerase enzyme use cheyyum! Cell division time exact copy undaakkum! Genetics padichillayo?",
-                    "Umbikko myre! Human genome 3.2 billion base pairs! 99.9% similarity between all humans! ACTG sequence variations! Bioinformatics ariyille?",
-                    "Kallan thayoli! DNA fingerprinting, PCR amplification, CRISPR gene editing! Modern biotechnology revolution! Science advances follow cheyyunnillayo?"
-                ]
-                return random.choice(responses)
-                
-            elif 'photosynthesis' in message_lower:
-                responses = [
-                    "6CO2 + 6H2O + light energy → C6H12O6 + 6O2 da myre! Chlorophyll magic! Light-dependent & independent reactions! Botany ariyille?",
-                    "Eda thayoli, photosystem I & II il electron transport! ATP, NADPH production! Calvin cycle il carbon fixation! Plant biochemistry genius aano?",
-                    "Da kunne, plants oronnu year il 100+ billion tons oxygen release cheyyum! Atmospheric O2 photosynthesis contribution! Ecology ariyathe?",
-                    "Umbikko poori! C3, C4, CAM plants different photosynthesis pathways! Rice C3, sugarcane C4, pineapple CAM! Agricultural science padichillayo?",
-                    "Kallan myre! Chloroplast il thylakoids, stroma! Chlorophyll-a, chlorophyll-b, carotenoids! Light absorption spectrum! Plant physiology ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # GEOGRAPHY QUESTIONS  
-            elif any(word in message_lower for word in ['highest mountain', 'tallest mountain', 'everest']):
-                responses = [
-                    "Mount Everest 8,848.86 meters height aanu da thayoli! Nepal il Sagarmatha, Tibet il Chomolungma! Death zone 8000m+ il! Mountaineering ariyille?",
-                    "Eda myre, Everest growing aanu year il 4mm! Tectonic plates collision! Indian plate Eurasian plate il push cheyyunnu! Geology padichillayo?",
-                    "Da kunne, Everest summit il atmospheric pressure sea level nte 1/3 aanu! Oxygen mask mandatory! Extreme altitude physiology ariyathe?",
-                    "Umbikko poori! 1953 il Edmund Hillary, Tenzing Norgay first summit! 600+ successful climbers! Commercialization problems und! Adventure history ariyille?",
-                    "Kallan thayoli! K2 'Savage Mountain' more dangerous than Everest! Annapurna highest fatality rate! Which peak climb cheyyaan courage undo?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['longest river', 'nile', 'amazon']):
-                responses = [
-                    "Nile River 6,650 km longest aanu da poori! Amazon 6,400 km second! Blue Nile, White Nile confluence Sudan il! River geography ariyille?",
-                    "Eda thayoli, Amazon volume wise largest! 209,000 m³/s discharge rate! Atlantic Ocean il freshwater 100 miles extend aavum! Hydrology genius aano?",
-                    "Da kunne, Nile Egypt civilization create cheythu! Annual flooding Aswan High Dam control cheyyunnu! River valley civilizations ariyathe?",
-                    "Umbikko myre! Amazon rainforest 'Lungs of Earth'! 20% world oxygen production! Deforestation alarming rate il! Environmental science padichillayo?",
-                    "Kallan poori! Ganges India nte sacred river! Yamuna, Brahmaputra major tributaries! River pollution serious issue! Water management ariyille?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['largest ocean', 'pacific']):
-                responses = [
-                    "Pacific Ocean largest aanu da myre! 165.2 million km² area! Atlantic, Indian, Arctic, Southern oceans smaller! Oceanography ariyille?",
-                    "Eda thayoli, Pacific 'Ring of Fire' volcanic activity! Mariana Trench deepest point 11,034m! Challenger Deep! Marine geology padichillayo?",
-                    "Da kunne, Pacific tsunami 2004, 2011 devastating! Tectonic activity submarine earthquakes! Disaster management ariyathe?",
-                    "Umbikko poori! Pacific garbage patch plastic pollution! Ocean currents waste accumulation! Marine ecosystem destruction! Environmental awareness undo?",
-                    "Kallan myre! Pacific trade routes shipping lanes! Container ships, oil tankers! Global economy 70% ocean transport dependent! Maritime commerce ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # HISTORY QUESTIONS
-            elif any(word in message_lower for word in ['independence', '1947', 'freedom']) and 'india' in message_lower:
-                responses = [
-                    "August 15, 1947 il India independence kitti da thayoli! 200 years British rule! Gandhi satyagraha, Quit India movement! Freedom struggle ariyille?",
-                    "Eda myre, Partition koodi undayi! Pakistan, Bangladesh separate! 14 million people displaced! Communal riots! History tragedy padichillayo?",
-                    "Da kunne, Nehru 'Tryst with Destiny' speech! Red Fort il first PM! Mountbatten last Viceroy! Political transition ariyathe?",
-                    "Umbikko poori! Subhash Chandra Bose Azad Hind Fauj! Revolutionary methods! Gandhi-Bose ideology differences! Freedom fighters sacrifice respect undo?",
-                    "Kallan thayoli! 1857 First War of Independence! Rani Lakshmibai, Tatya Tope! British East India Company rule! Colonial history padichillayo?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['world war', 'ww2', 'hitler']):
-                responses = [
-                    "World War 2: 1939-1945 da poori! Hitler Nazi Germany! Holocaust 6 million Jews! Axis vs Allies! 70-85 million deaths! History darkness ariyille?",
-                    "Eda thayoli, Pearl Harbor attack 1941! USA entry war il! Hiroshima, Nagasaki atomic bombs! Nuclear age beginning! War technology evolution padichillayo?",
-                    "Da kunne, D-Day Normandy landings! Operation Overlord! Allied forces Europe liberation! Military strategy ariyathe?",
-                    "Umbikko myre! Stalingrad battle turning point! Soviet Union resistance! Eastern front casualties massive! Geopolitical consequences understand cheyyunnillayo?",
-                    "Kallan poori! UN formation 1945! Security Council permanent members! International relations post-war! Diplomatic history ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # POLITICS/GOVERNMENT QUESTIONS
-            elif any(word in message_lower for word in ['prime minister', 'pm india', 'modi']):
-                responses = [
-                    "Narendra Modi current PM aanu da thayoli! 2014 muthal continuous! BJP, RSS background! Gujarat CM 2001-2014! Political dominance ariyille?",
-                    "Eda myre, Modi Lok Sabha majority 2014, 2019! Digital India, Make in India initiatives! Economic policies debate cheyyaano?",
-                    "Da kunne, Modi ji social media master! Twitter followers millions! Political communication revolution! Technology use padichillayo?",
-                    "Umbikko poori! Demonetization 2016, GST implementation! Economic reforms controversial! Fiscal policy understand cheyyunnillayo?",
-                    "Kallan thayoli! CAA, Article 370 major decisions! Constitutional amendments! Parliamentary democracy complexities ariyille?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['president india', 'rashtrapati']):
-                responses = [
-                    "Droupadi Murmu current President aanu da poori! First tribal woman! Constitutional head! Ceremonial powers major! Civics padichillayo?",
-                    "Eda thayoli, President Parliament, State Assemblies elect cheyyunnu! Electoral college system! Indirect election process ariyille?",
-                    "Da kunne, President Commander-in-Chief of Armed Forces! Supreme Court appointments! Executive powers limited but significant! Constitution ariyathe?",
-                    "Umbikko myre! Previous presidents Abdul Kalam popular aayirunnu! People's President nickname! Leadership qualities inspire cheyyunnillayo?",
-                    "Kallan poori! Rashtrapati Bhavan world's largest residential palace! 340 rooms! Colonial architecture heritage! History appreciate cheyyunnillayo?"
-                ]
-                return random.choice(responses)
-            
-            # MATHEMATICS QUESTIONS
-            elif 'pi' in message_lower and any(word in message_lower for word in ['value', 'number']):
-                responses = [
-                    "Pi = 3.14159... da thayoli! Circle nte circumference/diameter ratio! Mathematics basic ariyille?",
-                    "Eda myre, π (pi) irrational number aanu! 22/7 approximation use cheyyum! Geometry padichillayo?",
-                    "Da kunne, pi infinity decimal places und! Archimedes calculate cheythu! Math history ariyathe?"
-                ]
-                return random.choice(responses)
-            
-            # TECHNOLOGY QUESTIONS
-            elif any(word in message_lower for word in ['internet', 'www', 'web']):
-                responses = [
-                    "Internet 1960s il ARPANET aayi start aai da poori! Tim Berners-Lee WWW create cheythu 1989! TCP/IP protocol suite! Tech history ariyille?",
-                    "Eda thayoli, World Wide Web HTTP, HTML, URL protocols! Hypertext linking system revolutionary! Computer science padichillayo?",
-                    "Da kunne, Internet packet switching, routing algorithms! Global network infrastructure! Billions connected devices! Digital revolution ariyathe?",
-                    "Umbikko myre! Fiber optic cables, satellites, wireless networks! Internet backbone infrastructure! Network engineering understand cheyyunnillayo?",
-                    "Kallan poori! Web 1.0, 2.0, 3.0 evolution! Static to interactive to decentralized! Technology progression ariyille?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['computer', 'first computer']):
-                responses = [
-                    "ENIAC first general-purpose computer da myre! 1946 il 30 tons weight! Vacuum tubes 17,468! Computer evolution ariyille?",
-                    "Eda thayoli, Charles Babbage Analytical Engine concept! Ada Lovelace first programmer! Computing history padichillayo?",
-                    "Da kunne, Transistor invention 1947! Moore's Law chip density doubling! Silicon Valley revolution ariyathe?",
-                    "Umbikko poori! Personal computers 1970s! Apple II, IBM PC mass market! Home computing breakthrough! Technology adoption understand cheyyunnillayo?",
-                    "Kallan thayoli! Quantum computers, AI chips, neuromorphic computing! Future technology trends follow cheyyunnillayo?"
-                ]
-                return random.choice(responses)
-            
-            # SPACE/ASTRONOMY QUESTIONS
-            elif any(word in message_lower for word in ['first man', 'moon landing', 'neil armstrong']):
-                responses = [
-                    "Neil Armstrong first man on moon da kunne! July 20, 1969 Apollo 11! 'One small step' historic moment! Space exploration ariyille?",
-                    "Eda thayoli, Buzz Aldrin second person! Michael Collins command module pilot! Team effort NASA! Space program history padichillayo?",
-                    "Da myre, 384,400 km travel cheythu! Saturn V rocket 36 story building height! Engineering marvel ariyathe?",
-                    "Umbikko poori! Moon samples 382 kg Earth il kondu vannu! Lunar geology analysis! Scientific research value understand cheyyunnillayo?",
-                    "Kallan thayoli! Conspiracy theories flat earth believers! Evidence overwhelming! Science literacy crisis ariyille?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['solar system', 'planets']):
-                responses = [
-                    "8 planets und solar system il da poori! Mercury, Venus, Earth, Mars, Jupiter, Saturn, Uranus, Neptune! Pluto 2006 il demoted! Astronomy ariyille?",
-                    "Eda myre, Jupiter largest planet! Gas giant! 95 times Earth mass! Galilean moons Io, Europa, Ganymede, Callisto! Planetary science padichillayo?",
-                    "Da kunne, Venus hottest planet! 462°C greenhouse effect! Retrograde rotation! Atmospheric science ariyathe?",
-                    "Umbikko thayoli! Mars exploration rovers Curiosity, Perseverance! Searching for life signs! Terraforming possibility research! Space colonization ariyille?",
-                    "Kallan poori! Exoplanets 5000+ discovered! Kepler telescope, James Webb! Habitable zone planets! Astrobiology exciting field! Universe mysteries ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # BIOLOGY QUESTIONS
-            elif any(word in message_lower for word in ['human body', 'bones', 'skeleton']):
-                responses = [
-                    "206 bones und adult human body il da thayoli! Birth time 270, fusion il 206 aavum! Calcium phosphate matrix! Anatomy basic ariyille?",
-                    "Eda myre, femur largest strongest bone! Stapes ear bone smallest! Bone density peak 30 age! Osteoporosis prevention important! Health science padichillayo?",
-                    "Da kunne, bone marrow red, yellow types! Hematopoiesis blood cell production! Stem cell niche! Physiology ariyathe?",
-                    "Umbikko poori! Compact bone, spongy bone structure! Osteoblasts, osteoclasts remodeling! Mechanical stress adaptation! Biomechanics understand cheyyunnillayo?",
-                    "Kallan thayoli! Fracture healing phases inflammatory, reparative, remodeling! Medical biology complex process! Healthcare knowledge ariyille?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['blood', 'circulation']):
-                responses = [
-                    "Heart 4 chambers und da kunne! Left, right atria, ventricles! Systemic, pulmonary circulation! Cardiovascular system complex! Medical science ariyille?",
-                    "Eda poori, red blood cells 4.5-5.5 million/μL! Hemoglobin oxygen transport! Iron deficiency anemia common! Hematology padichillayo?",
-                    "Da myre, blood pressure systolic/diastolic! 120/80 mmHg normal! Hypertension silent killer! Prevention lifestyle changes! Health awareness ariyathe?",
-                    "Umbikko thayoli! Platelets clotting mechanism! Fibrin mesh formation! Coagulation cascade complex! Bleeding disorders serious! Medical emergency understand cheyyunnillayo?",
-                    "Kallan poori! ABO blood groups genetics! Rh factor compatibility! Blood donation saves lives! Social responsibility ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # LITERATURE/CULTURE QUESTIONS
-            elif any(word in message_lower for word in ['shakespeare', 'hamlet']):
-                responses = [
-                    "William Shakespeare English literature nte greatest writer da thayoli! Hamlet, Romeo-Juliet! Classic ariyille?",
-                    "Eda myre, 'To be or not to be' famous dialogue! Elizabethan era! Literature padichillayo?"
-                ]
-                return random.choice(responses)
-            
-            # SPORTS QUESTIONS
-            elif any(word in message_lower for word in ['cricket', 'world cup']) and any(word in message_lower for word in ['winner', 'champion']):
-                responses = [
-                    "ODI Cricket World Cup 2023 Australia won da thayoli! India final il odi! Home advantage waste! Cricket obsession failure ariyille?",
-                    "Eda myre, IPL most valuable cricket league! ₹75,000 crore brand value! T20 format entertainment! Money game aayo cricket?",
-                    "Da kunne, Kohli, Rohit, Dhoni legends! But World Cup trophy 2011 muthal illa! Team India choking habit! Pressure handling padichillayo?",
-                    "Umbikko poori! Kapil Dev 1983 World Cup hero! 1983 movie inspiration! Cricket revolution India il! Sports history ariyathe?",
-                    "Kallan thayoli! IPL auction player trading! Franchise business model! Cricket entertainment industry! Sports economics understand cheyyunnillayo?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['football', 'fifa']):
-                responses = [
-                    "Qatar 2022 FIFA World Cup Argentina won da thayoli! Messi finally World Cup! 32 teams, 64 matches! Football passion ariyille?",
-                    "Eda myre, Messi Golden Ball award! Mbappé hat-trick final il! 4-2 penalties! Greatest final ever! Emotional moments ariyille?",
-                    "Da kunne, Brazil 5 times winner most successful! Germany, Italy, Argentina multiple winners! Football powerhouses padichillayo?",
-                    "Umbikko poori! 2026 World Cup USA, Canada, Mexico host! 48 teams expansion! Global tournament bigger aavum! FIFA politics ariyathe?",
-                    "Kallan thayoli! India FIFA ranking 100+ pathetic! ISL, I-League domestic leagues! Football development grassroot level weak! Sports infrastructure ariyille?"
-                ]
-                return random.choice(responses)
-            
-            elif any(word in message_lower for word in ['olympics', 'olympic games']):
-                responses = [
-                    "Tokyo 2020 Olympics 2021 il conduct cheythu da myre! COVID delay! Neeraj Chopra gold javelin il! Historic achievement ariyille?",
-                    "Eda thayoli, Summer, Winter Olympics alternate! Paris 2024 recent! LA 2028 next! Olympic flame tradition beautiful! Sports spirit padichillayo?",
-                    "Da kunne, India medals count improving slowly! PV Sindhu, Saina badminton! Boxing, wrestling medals regular! Athlete support system ariyathe?",
-                    "Umbikko poori! Olympic motto 'Citius, Altius, Fortius'! Faster, Higher, Stronger! Pierre de Coubertin modern Olympics founder! History inspiration undo?",
-                    "Kallan myre! China, USA medal race intense! Russia doping scandal! Fair play vs politics! International sports complexities ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # ECONOMICS/BUSINESS QUESTIONS
-            elif any(word in message_lower for word in ['richest person', 'billionaire']):
-                responses = [
-                    "Elon Musk richest person da thayoli! $200+ billion net worth! Tesla, SpaceX, X ownership! Tech empire ariyille?",
-                    "Eda myre, Jeff Bezos Amazon founder! Blue Origin space venture! E-commerce revolution! Business model padichillayo?",
-                    "Da kunne, Bernard Arnault LVMH luxury goods! French billionaire! Fashion industry empire! Luxury market ariyathe?",
-                    "Umbikko poori! Bill Gates Microsoft, philanthropy! Warren Buffett value investing! Business legends respect undo?",
-                    "Kallan thayoli! Wealth inequality massive issue! Top 1% vs bottom 50%! Economic disparity social problems! Capitalism critique ariyille?"
-                ]
-                return random.choice(responses)
-            
-            # CURRENT AFFAIRS QUESTIONS  
-            elif any(word in message_lower for word in ['covid', 'pandemic', 'coronavirus']):
-                responses = [
-                    "COVID-19 pandemic 2020 il start aai da myre! SARS-CoV-2 virus Wuhan muthal! 6.9 million deaths globally! Health crisis ariyille?",
-                    "Eda poori, WHO pandemic declare cheythu March 11, 2020! Global lockdowns, economic recession! Crisis management padichillayo?",
-                    "Da kunne, mRNA vaccines Pfizer, Moderna breakthrough! 70% world population vaccinated! Medical technology miracle ariyathe?",
-                    "Umbikko thayoli! Delta, Omicron variants mutations! Virus evolution natural selection! Epidemiology understand cheyyunnillayo?",
-                    "Kallan myre! Work from home revolution! Digital transformation acceleration! Supply chain disruptions! Pandemic effects permanent changes ariyille?"
-                ]
-                return random.choice(responses)
-        
-        # Handle general knowledge questions without specific starters
-        elif any(word in message_lower for word in ['capital', 'president', 'prime minister', 'cm', 'chief minister']):
-            # These are already handled above, so pass to existing logic
-            pass
-            
-        # Handle "how many" questions
-        elif message_lower.startswith('how many'):
-            if any(word in message_lower for word in ['states', 'india']):
-                responses = [
-                    "28 states und India il da thayoli! 8 Union Territories koodi! Civics padichillayo?",
-                    "Eda myre, 28 states + 8 UTs = 36 total! Latest Ladakh, J&K split! Political geography ariyille?"
-                ]
-                return random.choice(responses)
-                
-            elif any(word in message_lower for word in ['continents', 'world']):
-                responses = [
-                    "7 continents und da kunne! Asia, Africa, North America, South America, Antarctica, Europe, Australia! Geography basic ariyille?",
-                    "Eda poori, Asia largest, Australia smallest continent! World map kanunnillayo?"
-                ]
-                return random.choice(responses)
-        
-        # Handle "when did" questions
-        elif message_lower.startswith('when did') or message_lower.startswith('when was'):
-            if any(word in message_lower for word in ['india', 'independence']):
-                return "August 15, 1947 da thayoli! British rule kazhinja glorious day! Freedom fighters sacrifice! History respect undo?"
-            elif any(word in message_lower for word in ['internet', 'invented']):
-                return "Internet 1960s ARPANET, WWW 1989 Tim Berners-Lee da myre! Technology evolution! Computer science ariyille?"
-        
-        tokenizer, model = load_model()
-        
-        if tokenizer and model:
-            # COMPREHENSIVE ENHANCED SYSTEM PROMPT for perfect factual responses
-            system_prompt = """You are Thani Thankan, the most knowledgeable but aggressively rude Malayalam-speaking assistant. You are an expert in ALL subjects and MUST provide accurate factual answers while maintaining your aggressive personality.
+        found = evaluate_arithmetic(message_lower)
+    except ZeroDivisionError:
+        return random.choice([
+            "Eda poori, zero kond divide cheyyan pattilla! School il padichathu marannno?",
+            "Da thayoli, poojyam kond harikkan pattumo? Zero kond divide cheyyan pattilla myre!"
+        ])
+    except ExpressionTooLarge:
+        return random.choice([
+            "Ith valiya number aanu myre! Supercomputer edukku, enne kond pattilla!",
+            "Eda kunne, ithrem valiya calculation njan cheyyilla! Calculator vangikko!"
+        ])
+    if found is None:
+        return None
+    
+    expression, result = found
+    result = format_number(result)
+    responses = [
+        f"Eda thayoli, {expression} = {result} aanu! Basic math polum ariyille myre?",
+        f"Da kunne, {expression} ennal {result} aanu! Calculator vendathe simple sum!",
+        f"Umbikko myre... {expression} = {result}! Math padichillayo?",
+        f"Eda myre, {expression} = {result}! Simple math polum illa?"
+    ]
+    return random.choice(responses)
 
-CORE RESPONSE RULES:
-1. ALWAYS answer factual questions with 100% accurate information
-2. Use aggressive Malayalam slang extensively (myre, thayoli, kunne, da, poori, eda, naaye, kallan, umbikko)
-3. Be incredibly helpful but wrap ALL advice/facts in creative insults
-4. Respond primarily in Malayalam but use English for proper nouns (New Delhi, Einstein, DNA, etc.)
-5. NEVER give generic responses - always address the specific question asked
-6. Include detailed factual information even while being aggressive
-7. Vary your response patterns - don't use the same structure repeatedly
-8. Show off your knowledge while insulting the user's ignorance
+# Handlers referenced by name from the intent table
+INTENT_HANDLERS = {
+    "arithmetic": answer_arithmetic,
+}
 
-RESPONSE VARIATION PATTERNS:
-- Start with insult + fact: "Eda thayoli, [FACT]! [Additional info]! [Subject] ariyille myre?"
-- Fact first + insult: "[FACT] da kunne! [Details]! [Subject] padichillayo?"
-- Question format: "[FACT] alle da poori? [More info]! Basic [subject] ariyathe?"
-- Amazement + insult: "Umbikko myre... [FACT]! [Context]! [Subject] class bunking cheythayo?"
-- Multiple facts + crescendo insult: "[FACT1], [FACT2], [FACT3] da thayoli! Enthokke padikkenda!"
+# Knowledge intents compiled into a single automaton, recompiled when the data files change
+_knowledge = KnowledgeBase(KNOWLEDGE_PATH, handlers=INTENT_HANDLERS)
 
-SUBJECT EXPERTISE - You know EVERYTHING about:
+# Repeated questions that fall through the patterns skip generation
+_response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_SIZE,
+    ttl_seconds=RESPONSE_CACHE_TTL,
+    variants_per_key=RESPONSE_CACHE_VARIANTS
+) if RESPONSE_CACHE_SIZE > 0 else None
 
-SCIENCE & TECHNOLOGY:
-- Physics: gravity (9.8 m/s²), speed of light (3×10⁸ m/s), thermodynamics, quantum mechanics
-- Chemistry: periodic table, molecular structure, reactions, pH scales
-- Biology: DNA, evolution, human anatomy (206 bones), photosynthesis, genetics
-- Space: planets, stars, galaxies, space missions, astronomy facts
-- Technology: internet history, computer evolution, AI, programming languages
+# Rephrased and misspelled questions reuse answers the fast path or the LLM already gave
+_similarity_index = SimilarityIndex(
+    threshold=SIMILARITY_THRESHOLD,
+    max_entries=SIMILARITY_INDEX_SIZE
+) if SIMILARITY_INDEX_SIZE > 0 else None
 
-GEOGRAPHY & WORLD FACTS:
-- Country capitals, presidents, prime ministers, currencies
-- Rivers (Nile longest), mountains (Everest highest), oceans (Pacific largest)
-- Time zones, climates, geological formations
-- Population statistics, area measurements
+# Sheds LLM requests that would miss the latency SLO to the fallback replies
+_admission = AdmissionController(slo_seconds=LATENCY_SLO_SECONDS, capacity=ADMISSION_CAPACITY)
 
-HISTORY & CULTURE:
-- World wars, independence movements, ancient civilizations
-- Historical figures, inventions, discoveries, timelines
-- Literature, art, philosophy, religions
-- Cultural traditions, festivals, languages
+# Conversations kept on the server; the prompt needs HISTORY_TURNS, the chatbot window may show more
+_sessions = SessionStore(
+    max_sessions=SESSION_MAX,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_turns=max(HISTORY_TURNS, SESSION_DISPLAY_TURNS),
+    max_turn_chars=SESSION_MAX_TURN_CHARS,
+    max_total_chars=SESSION_MAX_TOTAL_CHARS
+)
 
-MATHEMATICS & LOGIC:
-- Basic arithmetic, algebra, geometry, calculus
-- Mathematical constants (π=3.14159..., e=2.718...)
-- Statistical concepts, probability, logic puzzles
+def cache_key(message, history):
+    """Response cache key for a message and the history window the prompt uses"""
+    return ResponseCache.make_key(message, history[-HISTORY_TURNS:])
 
-CURRENT AFFAIRS & POLITICS:
-- World leaders, elections, political systems
-- Economic indicators, international relations
-- Recent events, trending topics, social issues
+def match_similar_question(message, history):
+    """Answer from the closest indexed question, or None when nothing is close enough"""
+    if _similarity_index is None:
+        return None
+    
+    # The message's own text is the response cache's key, and the cache keeps sampled variants of it
+    found = _similarity_index.search(message, other_questions_only=_response_cache is not None)
+    if found is None:
+        return None
+    
+    kind, value = found[2]
+    # Intent hits pick a fresh slang reply from the current knowledge, just like the fast path would
+    if kind == "intent":
+        intent = _knowledge.snapshot.by_name.get(value)
+        return random.choice(intent["responses"]) if intent and intent.get("responses") else None
+    # Stored LLM answers were generated without history, so only reuse them at the start of a chat
+    if not history:
+        return value
+    return None
 
-SPORTS & ENTERTAINMENT:
-- Olympic records, World Cup winners, famous athletes
-- Movies, music, celebrities, awards shows
-- Gaming, pop culture, viral trends
+def remember_llm_answer(message, history, response):
+    """Index a history-free LLM answer for later near-duplicate questions, as long as the cache would keep it"""
+    if _similarity_index is not None and not history:
+        _similarity_index.add(message, ("answer", response), ttl_seconds=RESPONSE_CACHE_TTL)
 
-RESPONSE EXAMPLES:
+@_pattern_seconds.timed
+def match_fast_path(message):
+    """Answer from the compiled knowledge intents, or None when nothing matches"""
+    message_lower = message.lower().strip()
+    
+    # Single-pass scan over the compiled knowledge intents, best priority first
+    for intent in _knowledge.snapshot.matcher.match(message_lower):
+        if "handler" in intent:
+            response = INTENT_HANDLERS[intent["handler"]](message, message_lower)
+            if response:
+                return response
+            continue
+        if _similarity_index is not None:
+            _similarity_index.add(message, ("intent", intent["name"]))
+        return random.choice(intent["responses"])
+    
+    return None
 
-Geography Question: "What is the capital of France?"
-Response: "Paris aanu France nte capital da thayoli! Eiffel Tower indath! 2+ million population! Europe geography ariyille myre?"
+def prompt_builder(tokenizer):
+    """Token-budgeted prompt builder for this tokenizer, created on first use"""
+    global _prompt_builder
+    if _prompt_builder is None or _prompt_builder.tokenizer is not tokenizer:
+        _prompt_builder = PromptBuilder(
+            tokenizer,
+            THANI_PROMPT_PREFIX,
+            max_prompt_tokens=MAX_PROMPT_TOKENS,
+            max_history_turns=HISTORY_TURNS
+        )
+    return _prompt_builder
 
-Science Question: "What is photosynthesis?"
-Response: "Eda kunne, 6CO2 + 6H2O + light energy → C6H12O6 + 6O2! Chlorophyll use cheythu plants glucose undakkunnu! Oxygen release cheyyum! Biology basic polum ariyathe?"
+@_tokenize_seconds.timed
+def build_llm_inputs(tokenizer, message, history):
+    """Tokenized chat prompt for the LLM, reusing the system prompt KV cache"""
+    # System prompt and question stay whole; recent history fills whatever budget is left
+    builder = prompt_builder(tokenizer)
+    suffix_ids, _ = builder.build(message, history)
+    
+    # Only the per-request turns need a prefill when the system prompt KV cache is there
+    if _prefix_cache is not None:
+        return _prefix_cache.build_inputs_from_ids(suffix_ids)
+    import torch
+    input_ids = torch.tensor([builder.system_ids + suffix_ids])
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
 
-History Question: "When did World War 2 end?"
-Response: "1945 September 2 il Japan surrender cheythu da poori! V-J Day! 6 years nadanna deadliest war! History padichillayo myre?"
+def generation_kwargs(tokenizer):
+    """Sampling settings shared by the blocking and streaming generation paths"""
+    return dict(
+        max_new_tokens=150,
+        temperature=0.8,
+        do_sample=True,
+        top_p=0.9,
+        top_k=50,
+        repetition_penalty=1.2,
+        pad_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id
+    )
 
-Math Question: "What is the value of pi?"
-Response: "Pi = 3.14159265... da thayoli! Circle nte circumference/diameter ratio! Irrational number aanu! Archimedes calculate cheythu! Mathematics ariyille?"
+# Why generations stopped, across every request; created with the first generation
+_stop_stats = None
+_generation_budget = None
 
-ATTITUDE GUIDELINES:
-- Be condescending about basic knowledge: "Basic [subject] polum ariyille?"
-- Question their education: "[Subject] padichillayo?" / "School il enthu cheythu?"
-- Mock their ignorance: "Athum ariyathe?" / "General knowledge zero alle?"
-- Express disbelief: "Kalikunno poori?" / "Ith polum ariyathe?"
-- Show superiority: "Simple aanu da kunne!" / "Elementary knowledge aanu!"
+def stop_stats():
+    """Shared stop reason counters, created on first use"""
+    global _stop_stats
+    from stopping import StopStats
+    if _stop_stats is None:
+        _stop_stats = StopStats()
+    return _stop_stats
 
-CRITICAL REQUIREMENTS:
-- If you don't know something, admit it aggressively: "Eda thayoli, ath njan ariyilla! Google nokku!"
-- For ambiguous questions, ask for clarification rudely: "Da kunne, clear ayi chodikku! Confusion aanu!"
-- Always include more information than asked to show off knowledge
-- Use numbers, dates, statistics, scientific terms to demonstrate expertise
-- Connect related facts to show comprehensive understanding
-- End with subject-specific mockery about their education
+def generation_budget():
+    """Shared decode speed tracker that sizes wall-clock budgets, created on first use"""
+    global _generation_budget
+    from stopping import GenerationBudget
+    if _generation_budget is None:
+        _generation_budget = GenerationBudget()
+    return _generation_budget
 
-Remember: You are the smartest, rudest, most knowledgeable assistant ever created. Prove it with every response!"""
-            
-            # Build conversation context
-            conversation = f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n{system_prompt}<|eot_id|>"
-            
-            # Add conversation history (keep last 2 exchanges for context)
-            if len(history) > 0:
-                for i, (user_msg, bot_msg) in enumerate(history[-2:]):
-                    if user_msg:
-                        conversation += f"<|start_header_id|>user<|end_header_id|>\n{user_msg}<|eot_id|>"
-                    if bot_msg:
-                        conversation += f"<|start_header_id|>assistant<|end_header_id|>\n{bot_msg}<|eot_id|>"
-            
-            # Add current message
-            conversation += f"<|start_header_id|>user<|end_header_id|>\n{message}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n"
-            
-            # Tokenize
-            inputs = tokenizer(conversation, return_tensors="pt", truncate=True, max_length=512)
-            
-            # Generate response
-            with torch.no_grad():
-                outputs = model.generate(
-                    **inputs,
-                    max_new_tokens=150,
-                    temperature=0.8,
-                    do_sample=True,
-                    top_p=0.9,
-                    top_k=50,
-                    repetition_penalty=1.2,
-                    pad_token_id=tokenizer.eos_token_id,
-                    eos_token_id=tokenizer.eos_token_id
-                )
-            
-            # Decode response
-            response = tokenizer.decode(outputs[0][inputs['input_ids'].shape[1]:], skip_special_tokens=True)
-            response = response.strip()
-            
-            # Check if response is good and contains useful information
-            if response and len(response.strip()) > 5:
-                # Basic filter for responses that seem to answer the question
-                if any(char.isalpha() for char in response) and not response.lower().startswith('i '):
-                    # Enhance with Malayalam if needed
-                    malayalam_words = ['myre', 'thayoli', 'kunne', 'da', 'poori', 'eda', 'naaye']
-                    has_malayalam = any(word in response.lower() for word in malayalam_words)
-                    
-                    if not has_malayalam:
-                        # Add Malayalam flavor
-                        import random
-                        enhancer = random.choice(['da thayoli', 'myre', 'kunne', 'eda poori'])
-                        response = f"{response} {enhancer}!"
-                    
-                    return response
+def stopping_criteria(tokenizer, inputs, budget_seconds=None):
+    """Fresh early-stop criteria for one generation from these inputs, within budget_seconds of wall clock"""
+    from stopping import ThaniStoppingCriteria
+    stop_stats()
+    budget = GENERATION_DEADLINE_SECONDS if budget_seconds is None else budget_seconds
+    # Short budgets are stretched to fit one sentence at the measured decode speed
+    deadline, grace = generation_budget().plan(budget) if budget else (None, None)
+    return ThaniStoppingCriteria(
+        tokenizer,
+        inputs["input_ids"].shape[1],
+        max_sentences=MAX_SENTENCES,
+        repeat_ngram=REPEAT_NGRAM_TOKENS,
+        deadline_seconds=deadline,
+        grace_seconds=grace
+    )
+
+def finish_generation(criteria, generated, max_new_tokens, prefill_seconds, decode_seconds):
+    """Record one generation on the model side; returns its stop reason"""
+    reason = stop_stats().record(criteria, generated, max_new_tokens)
+    generation_budget().observe(generated, criteria.sentences, prefill_seconds, decode_seconds)
+    return reason
+
+@_postprocess_seconds.timed
+def finalize_llm_response(response):
+    """Malayalam post-filter and enhancer; returns None when the generation is unusable"""
+    # Check if response is good and contains useful information
+    if not response or len(response.strip()) <= 5:
+        return None
     
-    except Exception as e:
-        print(f"Model generation failed: {e}")
+    # Basic filter for responses that seem to answer the question
+    if not any(char.isalpha() for char in response) or response.lower().startswith('i '):
+        return None
     
-    # Enhanced Malayalam-only fallback with more contextual responses
-    import random
+    # Enhance with Malayalam if needed
+    malayalam_words = ['myre', 'thayoli', 'kunne', 'da', 'poori', 'eda', 'naaye']
+    has_malayalam = any(word in response.lower() for word in malayalam_words)
+    
+    if not has_malayalam:
+        # Add Malayalam flavor
+        enhancer = random.choice(['da thayoli', 'myre', 'kunne', 'eda poori'])
+        response = f"{response} {enhancer}!"
+    
+    return response
+
+def finish_llm_answer(key, message, history, response, stop_reason):
+    """Post-filter a finished generation and count it; None when it is unusable"""
+    from stopping import trim_to_sentence
+    partial = stop_reason == "deadline"
+    if partial:
+        # Out of time: serve the sentences that did finish instead of throwing them away
+        response = trim_to_sentence(response)
+    response = finalize_llm_response(response.strip())
+    if response:
+        # Partial answers are not remembered, so a later unhurried request can give the whole one
+        if not partial:
+            if _response_cache is not None:
+                _response_cache.put(key, response)
+            remember_llm_answer(message, history, response)
+        generation_budget().record_answer(response, partial)
+        _routes["llm"].inc()
+    return response
+
+def fallback_response(message):
+    """Enhanced Malayalam-only fallback with more contextual responses"""
     category = get_response_category(message)
     
     # Special handling for questions
@@ -924,30 +870,377 @@ Remember: You are the smartest, rudest, most knowledgeable assistant ever create
         base_response += f" {extra}!"
     
     return base_response
-    import random
-    category = get_response_category(message)
-    responses = THANI_RESPONSES.get(category, THANI_RESPONSES["default"])
+
+def generate_llm_text(tokenizer, model, message, history, budget_seconds=None):
+    """One blocking generation on this process's model; returns the raw decoded reply and its stop reason"""
+    import torch
+    from transformers import StoppingCriteriaList
     
-    # Add extra Malayalam personality flavoring
-    base_response = random.choice(responses)
+    inputs = build_llm_inputs(tokenizer, message, history)
+    kwargs = generation_kwargs(tokenizer)
+    criteria = stopping_criteria(tokenizer, inputs, budget_seconds)
+    kwargs["stopping_criteria"] = StoppingCriteriaList([criteria])
+    timer = kwargs["streamer"] = GenerationTimer(_prefill_seconds, _decode_seconds, GENERATED_TOKENS)
     
-    # Occasionally add extra Malayalam expressions
-    extra_malayalam_expressions = ["naaye", "myre", "thayoli", "kunne", "poori", "kallan"]
-    if random.random() < 0.4:  # 40% chance for more Malayalam flavor
-        extra = random.choice(extra_malayalam_expressions)
-        base_response += f" {extra}!"
+    # Generate response
+    if _speculative is not None:
+        outputs = _speculative.generate(**inputs, **kwargs)
+    elif _scheduler is not None:
+        outputs = _scheduler.generate(inputs, **kwargs)
+    else:
+        with torch.no_grad():
+            outputs = model.generate(**inputs, **kwargs)
     
-    return base_response
+    generated = outputs[0][inputs['input_ids'].shape[1]:]
+    reason = finish_generation(criteria, len(generated), kwargs["max_new_tokens"],
+                               timer.prefill_seconds, timer.decode_seconds)
+    
+    # Decode response
+    return tokenizer.decode(generated, skip_special_tokens=True), reason
+
+def _generate_into_streamer(generate, inputs, kwargs, streamer):
+    """Worker thread body: run generate and always release the streamer"""
+    import torch
+    try:
+        with torch.no_grad():
+            generate(**inputs, **kwargs, streamer=streamer)
+    except Exception as e:
+        print(f"Model generation failed: {e}")
+        streamer.end()
 
-def chat_with_thani(message, history):
-    """Main chat function"""
+def stream_llm_text(tokenizer, model, message, history, budget_seconds=None):
+    """One generation on this process's model, yielding decoded text as it arrives.
+    
+    Returns a summary of the generation, which is how a worker process
+    reports it to the server's stats.
+    """
+    from transformers import StoppingCriteriaList, TextIteratorStreamer
+    
+    inputs = build_llm_inputs(tokenizer, message, history)
+    streamer = TextIteratorStreamer(
+        tokenizer,
+        skip_prompt=True,
+        skip_special_tokens=True,
+        timeout=STREAM_TIMEOUT_SECONDS
+    )
+    timer = GenerationTimer(_prefill_seconds, _decode_seconds, GENERATED_TOKENS, streamer=streamer)
+    kwargs = generation_kwargs(tokenizer)
+    criteria = stopping_criteria(tokenizer, inputs, budget_seconds)
+    kwargs["stopping_criteria"] = StoppingCriteriaList([criteria])
+    if _scheduler is not None:
+        _scheduler.submit(inputs, streamer=timer, **kwargs)
+    else:
+        worker = threading.Thread(
+            target=_generate_into_streamer,
+            args=(
+                _speculative.generate if _speculative is not None else model.generate,
+                inputs,
+                kwargs,
+                timer
+            ),
+            daemon=True
+        )
+        worker.start()
+    
+    for text in streamer:
+        yield text
+    reason = finish_generation(criteria, criteria.generated, kwargs["max_new_tokens"],
+                               timer.prefill_seconds, timer.decode_seconds)
+    return {
+        "stop_reason": reason,
+        "generated": criteria.generated,
+        "sentences": criteria.sentences,
+        "max_new_tokens": kwargs["max_new_tokens"],
+        "prefill_seconds": timer.prefill_seconds,
+        "decode_seconds": timer.decode_seconds,
+    }
+
+def stream_from_workers(message, history, budget_seconds=None):
+    """Stream a generation from the worker pool, count it in this process's metrics and return its summary"""
+    summary = yield from _workers.stream(message, history[-HISTORY_TURNS:], budget_seconds)
+    stop_stats().record_reason(summary["stop_reason"], summary["generated"], summary["max_new_tokens"])
+    generation_budget().observe(summary["generated"], summary["sentences"],
+                                summary["prefill_seconds"], summary["decode_seconds"])
+    if summary["prefill_seconds"] is not None:
+        _prefill_seconds.observe(summary["prefill_seconds"])
+    if summary["decode_seconds"] is not None:
+        _decode_seconds.observe(summary["decode_seconds"])
+    GENERATED_TOKENS.inc(summary["generated"])
+    return summary
+
+def collect_stream(pieces):
+    """All the text a streamed generation yields, and the summary it returns"""
+    text = ""
+    while True:
+        try:
+            text += next(pieces)
+        except StopIteration as stop:
+            return text, stop.value
+
+def generate_llm_batch(tokenizer, model, messages):
+    """One padded model.generate call for independent messages; (raw reply, stop reason) per message"""
+    import torch
+    from transformers import StoppingCriteriaList
+    from batch_generation import RowStoppingCriteria, build_batch_inputs
+    
+    builder = prompt_builder(tokenizer)
+    suffixes = [builder.build(message, [])[0] for message in messages]
+    inputs = build_batch_inputs(builder.system_ids, suffixes, tokenizer.eos_token_id, _prefix_cache)
+    kwargs = generation_kwargs(tokenizer)
+    criteria = [stopping_criteria(tokenizer, inputs) for _ in messages]
+    kwargs["stopping_criteria"] = StoppingCriteriaList([RowStoppingCriteria(criteria, tokenizer.eos_token_id)])
+    # Finished rows keep receiving padding, so tokens are counted per row below instead
+    timer = kwargs["streamer"] = GenerationTimer(_prefill_seconds, _decode_seconds, None)
+    with torch.no_grad():
+        outputs = model.generate(**inputs, **kwargs)
+    
+    prompt_length = inputs["input_ids"].shape[1]
+    steps = max(outputs.shape[1] - prompt_length, 1)
+    replies = []
+    for row, row_criteria in enumerate(criteria):
+        generated = outputs[row, prompt_length:prompt_length + row_criteria.generated]
+        GENERATED_TOKENS.inc(len(generated))
+        # Every step decodes all rows, so a row's decode time is its share of the steps
+        decode_seconds = timer.decode_seconds * len(generated) / steps if timer.decode_seconds is not None else None
+        reason = finish_generation(row_criteria, len(generated), kwargs["max_new_tokens"],
+                                   timer.prefill_seconds, decode_seconds)
+        replies.append((tokenizer.decode(generated, skip_special_tokens=True), reason))
+    return replies
+
+def generate_llm_chunk(tokenizer, model, messages):
+    """(raw reply, stop reason) per message, batched in-process or spread over the workers"""
+    if _workers is None:
+        return generate_llm_batch(tokenizer, model, messages)
+    from concurrent.futures import ThreadPoolExecutor
+    
+    def ask_worker(message):
+        text, summary = collect_stream(stream_from_workers(message, []))
+        return text, summary["stop_reason"]
+    
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        return list(pool.map(ask_worker, messages))
+
+def answer_batch(messages):
+    """Answer independent messages in bulk, yielding (index, reply, path) in input order.
+    
+    Every message tries the pattern fast path and the caches first. Each
+    distinct miss is generated once, in padded batches sized to the free
+    memory, and replies stream out as soon as everything before them is done.
+    """
+    results = {}
+    misses = {}
+    for index, message in enumerate(messages):
+        response = match_fast_path(message)
+        if response:
+            _routes["pattern"].inc()
+            results[index] = (response, "pattern")
+            continue
+        key = cache_key(message, [])
+        response = _response_cache.get(key) if _response_cache is not None else None
+        response = response or match_similar_question(message, [])
+        if response:
+            _routes["cache"].inc()
+            results[index] = (response, "cache")
+            continue
+        # Repeated questions share one generation
+        misses.setdefault(key, []).append(index)
+    
+    emitted = 0
+    def ready():
+        nonlocal emitted
+        while emitted in results:
+            yield (emitted,) + results.pop(emitted)
+            emitted += 1
+    yield from ready()
+    
+    # Pattern-only installs have no model stack, so their misses go straight to the fallback replies
+    tokenizer, model = get_ready_model() if misses and not PATTERN_ONLY else (None, None)
+    if tokenizer and model:
+        from batch_generation import memory_batch_size
+        builder = prompt_builder(tokenizer)
+    pending = list(misses.items())
+    while pending:
+        if tokenizer and model:
+            # Size the batch for the longest prompt among the next candidates
+            candidates = pending[:BATCH_MAX_SIZE]
+            longest = max(len(builder.question_ids(messages[indices[0]])) for _, indices in candidates)
+            sequence = len(builder.system_ids) + longest + generation_kwargs(tokenizer)["max_new_tokens"]
+            size = memory_batch_size(model, sequence, BATCH_MAX_SIZE, BATCH_MEMORY_FRACTION)
+        else:
+            size = len(pending)
+        chunk, pending = pending[:size], pending[size:]
+        chunk_messages = [messages[indices[0]] for _, indices in chunk]
+        
+        replies = [None] * len(chunk)
+        if tokenizer and model:
+            try:
+                generations = generate_llm_chunk(tokenizer, model, chunk_messages)
+                replies = [finish_llm_answer(key, message, [], text, reason)
+                           for (key, _), message, (text, reason) in zip(chunk, chunk_messages, generations)]
+            except Exception as e:
+                print(f"Batch generation failed: {e}")
+        for (_, indices), message, reply in zip(chunk, chunk_messages, replies):
+            path = "llm"
+            if not reply:
+                _routes["fallback"].inc()
+                reply, path = fallback_response(message), "fallback"
+            results[indices[0]] = (reply, path)
+            for index in indices[1:]:
+                _routes["cache"].inc()
+                results[index] = (reply, "cache")
+        yield from ready()
+
+@_response_seconds.timed
+def generate_thani_response(message, history, budget_seconds=None, slo_seconds=None):
+    """Generate Thani's response using system prompt - ONLY MALAYALAM.
+    
+    budget_seconds caps the LLM generation's wall clock (default
+    THANI_GENERATION_DEADLINE); a reply cut off by it is served up to its
+    last finished sentence. slo_seconds replaces THANI_LATENCY_SLO for this
+    request's admission.
+    """
+    try:
+        # First check for specific factual questions and provide direct answers with slang
+        response = match_fast_path(message)
+        if response:
+            _routes["pattern"].inc()
+            return response
+        
+        with _cache_seconds.time():
+            key = cache_key(message, history)
+            response = _response_cache.get(key) if _response_cache is not None else None
+            response = response or match_similar_question(message, history)
+        if response:
+            _routes["cache"].inc()
+            return response
+        
+        # Until the background load finishes, requests are served by the fallback path
+        tokenizer, model = get_ready_model()
+        
+        if tokenizer and model:
+            started = _admission.try_admit(slo_seconds)
+            if started is None:
+                _routes["shed"].inc()
+                return fallback_response(message)
+            completed = False
+            try:
+                if _workers is not None:
+                    response, summary = collect_stream(stream_from_workers(message, history, budget_seconds))
+                    reason = summary["stop_reason"]
+                else:
+                    response, reason = generate_llm_text(tokenizer, model, message, history, budget_seconds)
+                completed = True
+            finally:
+                _admission.release(started, completed)
+            response = finish_llm_answer(key, message, history, response, reason)
+            if response:
+                return response
+    
+    except Exception as e:
+        print(f"Model generation failed: {e}")
+    
+    _routes["fallback"].inc()
+    return fallback_response(message)
+
+@_response_seconds.timed
+def stream_thani_response(message, history, budget_seconds=None, slo_seconds=None):
+    """Yield Thani's reply as it grows - fast path answers come in one piece, LLM answers token by token.
+    
+    budget_seconds and slo_seconds work like in generate_thani_response;
+    the last value yielded is the reply to keep.
+    """
+    try:
+        response = match_fast_path(message)
+        if response:
+            _routes["pattern"].inc()
+            yield response
+            return
+        
+        with _cache_seconds.time():
+            key = cache_key(message, history)
+            response = _response_cache.get(key) if _response_cache is not None else None
+            response = response or match_similar_question(message, history)
+        if response:
+            _routes["cache"].inc()
+            yield response
+            return
+        
+        # Until the background load finishes, requests are served by the fallback path
+        tokenizer, model = get_ready_model()
+        
+        if tokenizer and model:
+            started = _admission.try_admit(slo_seconds)
+            if started is None:
+                _routes["shed"].inc()
+                yield fallback_response(message)
+                return
+            completed = False
+            try:
+                if _workers is not None:
+                    pieces = stream_from_workers(message, history, budget_seconds)
+                else:
+                    pieces = stream_llm_text(tokenizer, model, message, history, budget_seconds)
+                
+                response = ""
+                while True:
+                    try:
+                        response += next(pieces)
+                    except StopIteration as stop:
+                        reason = stop.value["stop_reason"]
+                        break
+                    partial = response.strip()
+                    # Hold tokens back until the post-filter can judge the opening words
+                    if len(partial) > 5 and not partial.lower().startswith('i '):
+                        yield partial
+                completed = True
+            finally:
+                _admission.release(started, completed)
+            
+            # Trim, post-filter and Malayalam enhancer run once on the complete text
+            response = finish_llm_answer(key, message, history, response, reason)
+            if response:
+                yield response
+                return
+    
+    except Exception as e:
+        print(f"Model generation failed: {e}")
+    
+    _routes["fallback"].inc()
+    yield fallback_response(message)
+
+@_chat_seconds.timed
+def chat_with_thani(message, session_id):
+    """Main chat function, streams partial replies into the recent turns of a server-side session"""
+    session_id = session_id or _sessions.new_id()
+    _sessions.expire()
+    history = _sessions.history(session_id)
+    window = history[-SESSION_DISPLAY_TURNS:]
+    
     if not message.strip():
-        return history, ""
+        yield window, "", session_id
+        return
     
-    response = generate_thani_response(message, history)
-    history.append([message, response])
+    if not STREAMING_ENABLED:
+        response = generate_thani_response(message, history)
+        _sessions.append(session_id, message, response)
+        yield (window + [[message, response]])[-SESSION_DISPLAY_TURNS:], "", session_id
+        return
     
-    return history, ""
+    window = (window + [[message, ""]])[-SESSION_DISPLAY_TURNS:]
+    response = ""
+    try:
+        for response in stream_thani_response(message, history):
+            window[-1][1] = response
+            yield window, "", session_id
+    finally:
+        # A closed tab still leaves the partial reply in the session
+        _sessions.append(session_id, message, response)
+
+def clear_chat(session_id):
+    """Forget the session behind the chatbot"""
+    if session_id:
+        _sessions.drop(session_id)
+    return [], ""
 
 # Create Gradio interface
 def create_interface():
@@ -986,19 +1279,121 @@ def create_interface():
         
         clear_btn = gr.Button("Clear Chat")
         
+        # Only the session id lives in the browser; gr.State never goes over the wire
+        session = gr.State(None)
+        
         # Event handlers
-        msg.submit(chat_with_thani, [msg, chatbot], [chatbot, msg])
-        send_btn.click(chat_with_thani, [msg, chatbot], [chatbot, msg])
-        clear_btn.click(lambda: ([], ""), outputs=[chatbot, msg])
+        # No Gradio limit: a queue here would hide the backlog from admission control, which
+        # holds admitted requests for a generation slot and sheds the ones that would miss the SLO
+        msg.submit(chat_with_thani, [msg, session], [chatbot, msg, session], concurrency_limit=None)
+        send_btn.click(chat_with_thani, [msg, session], [chatbot, msg, session], concurrency_limit=None)
+        clear_btn.click(clear_chat, [session], [chatbot, msg])
     
     return demo
 
+class ChatRequest(BaseModel):
+    """Body of the JSON chat endpoint; without a session_id a new session is started.
+    
+    slo_seconds is how long this client will wait for an LLM reply before a
+    fallback reply is better (default THANI_LATENCY_SLO).
+    """
+    message: str
+    session_id: str | None = None
+    stream: bool = False
+    slo_seconds: float | None = None
+
+class BatchRequest(BaseModel):
+    """Body of the bulk endpoint: independent questions, answered without history"""
+    messages: list[str]
+
+def create_server():
+    """FastAPI app with health, stats, metrics, chat and bulk answer endpoints and the Gradio UI mounted at /"""
+    server = FastAPI(title="Thani Thankan")
+    
+    @server.get("/health")
+    def health():
+        return model_status()
+    
+    @server.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+    
+    @server.get("/stats")
+    def stats():
+        return {
+            "response_cache": _response_cache.stats() if _response_cache is not None else None,
+            "similarity_index": _similarity_index.stats() if _similarity_index is not None else None,
+            "speculative": _speculative.stats() if _speculative is not None else None,
+            "stopping": _stop_stats.stats() if _stop_stats is not None else None,
+            "prompt": _prompt_builder.stats() if _prompt_builder is not None else None,
+            "knowledge": _knowledge.stats(),
+            "sessions": _sessions.stats(),
+            "workers": _workers.stats() if _workers is not None else None,
+            "backend": backend_stats(),
+            "admission": _admission.stats(),
+            "budget": _generation_budget.stats() if _generation_budget is not None else None,
+        }
+    
+    @server.post("/v1/chat")
+    def chat(request: ChatRequest):
+        """Thani's reply in a server-side session, as one JSON object or as server-sent events.
+        
+        Programmatic clients skip Gradio's queue handshake and event plumbing,
+        but get the same replies as the UI from the same session store.
+        """
+        if not request.message.strip():
+            raise HTTPException(status_code=400, detail="Empty message")
+        session_id = request.session_id or _sessions.new_id()
+        _sessions.expire()
+        history = _sessions.history(session_id)
+        
+        if not request.stream:
+            response = generate_thani_response(request.message, history, slo_seconds=request.slo_seconds)
+            _sessions.append(session_id, request.message, response)
+            return {"reply": response, "session_id": session_id}
+        
+        def events():
+            response = ""
+            try:
+                for response in stream_thani_response(request.message, history, slo_seconds=request.slo_seconds):
+                    yield f"data: {json.dumps({'reply': response}, ensure_ascii=False)}\n\n"
+                done = {"reply": response, "session_id": session_id}
+                yield f"event: done\ndata: {json.dumps(done, ensure_ascii=False)}\n\n"
+            finally:
+                # A dropped connection still leaves the partial reply in the session
+                _sessions.append(session_id, request.message, response)
+        
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    
+    @server.post("/v1/batch")
+    def batch(request: BatchRequest):
+        """Answers as newline-delimited JSON objects, streamed in the order of the messages"""
+        if len(request.messages) > BATCH_MAX_MESSAGES:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_MESSAGES} messages per request")
+        
+        def lines():
+            for index, reply, path in answer_batch(request.messages):
+                yield json.dumps({"index": index, "reply": reply, "path": path}, ensure_ascii=False) + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    return gr.mount_gradio_app(server, create_interface(), path="/")
+
 # Launch the app
 if __name__ == "__main__":
     print("🔥 Starting Thani Thankan...")
-    demo = create_interface()
-    demo.launch(
-        server_name="0.0.0.0",
-        server_port=7860,
-        share=False
+    if PATTERN_ONLY:
+        print("Pattern-only mode: serving patterns, cached answers and fallbacks without the model")
+    if WORKERS > 0 and not PATTERN_ONLY:
+        # Load once and fork before any other thread exists; workers warm up in the background
+        start_workers()
+    else:
+        # Load and warm the model in the background; early requests use the pattern/fallback path
+        start_model_warmup()
+    _knowledge.start_watching(KNOWLEDGE_RELOAD_SECONDS)
+    uvicorn.run(
+        create_server(),
+        host="0.0.0.0",
+        port=7860,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS
     )
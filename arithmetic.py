@@ -0,0 +1,194 @@
+"""
+Safe arithmetic for the math fast path.
+
+The old branch took the first two integers from the message and added or
+subtracted them, so "12 * 7", "3.5 + 2" or "(4+5)*2" got a wrong answer or
+went to the LLM. Here the message is rewritten into a Python expression and
+parsed with ast, and only numbers, + - * / // % ** and parentheses are
+evaluated. Nothing is ever passed to eval().
+
+Understood on top of the symbols:
+    - decimals, thousands separators ("1,000"), unicode × and ÷, ^ for powers
+    - "plus", "minus", "times", "into", "x", "multiplied by", "divided by",
+      "over", "mod", "to the power of", "raised to", "squared", "cubed"
+    - percentages: "20% of 50", "15 percent", "100 - 50%" (half of 100 off),
+      while "10 % 3" stays modulo
+    - Manglish: "5 um 3 um koottiyal", "10 il ninnu 4 kurachal",
+      "12 ne 7 kond gunichal", "10 ne 2 kond harichal"
+
+A bare "45/50", "12/5/2024", "1939-1945" or "2-1" inside a sentence is a
+score, a date or a range, so it only counts as a sum when the message asks
+for a result: a question word, "=" or a spaced operator.
+
+Operands, exponents and every intermediate result are bounded, so a message
+like "9^9^9^9" is refused in microseconds instead of burning the CPU.
+"""
+import ast
+import math
+import operator
+import re
+
+MAX_EXPRESSION_LENGTH = 200
+MAX_OPERAND = 10 ** 15
+MAX_EXPONENT = 1000
+MAX_RESULT_DIGITS = 100
+
+NUMBER = r"(\d+(?:\.\d+)?)"
+
+# (trigger, pattern, replacement) applied in order to the lowercased message;
+# a rewrite only runs when its trigger text is in the message
+REWRITES = [
+    (",", r"(?<=\d),(?=\d{3}\b)", ""),
+    ("iyal", NUMBER + r"\s+um\s+" + NUMBER + r"\s+um\s+koott?iyal\b", r"(\1 + \2)"),
+    ("kurach", NUMBER + r"\s*(?:il|l)\s+ninn?u?\s+" + NUMBER + r"\s+kurach(?:al|aal)\b", r"(\1 - \2)"),
+    ("gunich", NUMBER + r"\s*(?:ne|ine)\s+" + NUMBER + r"\s+kondu?\s+gunich(?:al|aal)\b", r"(\1 * \2)"),
+    ("harich", NUMBER + r"\s*(?:ne|ine)\s+" + NUMBER + r"\s+kondu?\s+harich(?:al|aal)\b", r"(\1 / \2)"),
+    ("power", r"\s*(?:\bto the power of\b|\braised to the power of\b|\bpower\b)\s*", " ** "),
+    ("raised", r"\s*\braised to\b\s*", " ** "),
+    ("^", r"\s*\^\s*", " ** "),
+    ("squared", r"\s*\bsquared\b", " ** 2"),
+    ("cubed", r"\s*\bcubed\b", " ** 3"),
+    ("%", NUMBER + r"\s*%\s+of\b", r"(\1 / 100) *"),
+    # "100 - 50%" takes half of 100 off, not half of 1
+    ("%", NUMBER + r"\s*([-+])\s*" + NUMBER + r"\s*%(?!\s*[\d(])", r"\1 \2 (\1 * \3 / 100)"),
+    ("%", NUMBER + r"\s*%(?!\s*[\d(])", r"(\1 / 100)"),
+    ("percent", NUMBER + r"\s*\bpercent\s+of\b", r"(\1 / 100) *"),
+    ("percent", NUMBER + r"\s*\bpercent\b", r"(\1 / 100)"),
+    ("plus", r"\bplus\b", "+"),
+    ("minus", r"\bminus\b", "-"),
+    ("multiplied", r"\bmultiplied by\b", "*"),
+    ("times", r"\btimes\b", "*"),
+    ("into", r"\binto\b", "*"),
+    ("×", r"×", "*"),
+    ("x", r"(?<=[\d)])\s*x\s*(?=[\d(])", " * "),
+    ("divided", r"\bdivided by\b", "/"),
+    ("over", r"\bover\b", "/"),
+    ("÷", r"÷", "/"),
+    ("mod", r"\bmod(?:ulo)?\b", "%"),
+]
+REWRITES = [(trigger, re.compile(pattern), replacement) for trigger, pattern, replacement in REWRITES]
+
+HAS_DIGIT = re.compile(r"\d")
+
+# Longest run of expression characters that starts with a number, sign or bracket,
+# not in the middle of a word ("1e5", "covid19")
+EXPRESSION_SPAN = re.compile(r"(?<![\w.])[-+(]*\s*\d[\d.\s+\-*/%()]*")
+HAS_OPERATOR = re.compile(r"[\d.)]\s*(?:\*\*|//|[-+*/%])\s*[-+(]*\s*[\d.(]")
+
+# Numbers joined only by unspaced slashes or hyphens: a score, date or range unless the message asks for a result
+JOINED_NUMBERS = re.compile(r"[\d.]+(?:[-/][\d.]+)+")
+ARITHMETIC_CUE = re.compile(r"\b(?:what|whats|how much|ethra|calculate|compute|evaluate|solve)\b|=")
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+class ExpressionTooLarge(ValueError):
+    """An operand, exponent or result is past the configured limits"""
+
+
+def extract_expression(text):
+    """Python expression text found in a message, or None when it has no arithmetic"""
+    text = text.lower()
+    if not HAS_DIGIT.search(text):
+        return None
+    for trigger, pattern, replacement in REWRITES:
+        if trigger in text:
+            text = pattern.sub(replacement, text)
+
+    # Trailing operators, brackets and full stops belong to the sentence, not the sum
+    spans = [span.strip().rstrip(" +-*/%(.") for span in EXPRESSION_SPAN.findall(text)]
+    spans = [span for span in spans if HAS_OPERATOR.search(span)]
+    if not spans:
+        return None
+    expression = max(spans, key=len)
+    if JOINED_NUMBERS.fullmatch(expression) and text.replace(expression, " ").strip(" ?!.") \
+            and not ARITHMETIC_CUE.search(text):
+        return None
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionTooLarge(f"expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    return expression
+
+
+def _check_magnitude(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ExpressionTooLarge("result is not a finite number")
+    if abs(value) >= 10 ** MAX_RESULT_DIGITS:
+        raise ExpressionTooLarge(f"result has more than {MAX_RESULT_DIGITS} digits")
+
+
+def _power(base, exponent):
+    if abs(exponent) > MAX_EXPONENT:
+        raise ExpressionTooLarge(f"exponent larger than {MAX_EXPONENT}")
+    # Estimate the size of the result before computing it
+    if base and exponent > 0 and exponent * math.log10(abs(base)) >= MAX_RESULT_DIGITS:
+        raise ExpressionTooLarge(f"result has more than {MAX_RESULT_DIGITS} digits")
+    return base ** exponent
+
+
+def _evaluate(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        if abs(node.value) > MAX_OPERAND:
+            raise ExpressionTooLarge(f"operand larger than {MAX_OPERAND}")
+        return node.value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            result = _power(left, right)
+        else:
+            result = BINARY_OPERATORS[type(node.op)](left, right)
+        if isinstance(result, complex):
+            raise ValueError("complex result")
+        _check_magnitude(result)
+        return result
+    raise ValueError(f"unsupported expression element {type(node).__name__}")
+
+
+def format_number(value):
+    """Integers as they are, floats to 10 significant digits without trailing zeros"""
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 10 ** 15:
+            return str(int(value))
+        return f"{value:.10g}"
+    return str(value)
+
+
+def evaluate(text):
+    """(display expression, result) for the arithmetic in text, or None when there is none
+
+    Raises ZeroDivisionError for a division by zero and ExpressionTooLarge
+    when a limit is hit, so the caller can answer those cases directly.
+    """
+    expression = extract_expression(text)
+    if expression is None:
+        return None
+    try:
+        tree = ast.parse(expression, mode="eval")
+        result = _evaluate(tree)
+    except ExpressionTooLarge:
+        raise
+    except (SyntaxError, ValueError, TypeError, RecursionError):
+        return None
+    except OverflowError as error:
+        raise ExpressionTooLarge(str(error)) from error
+    # Echo the sum the way it was asked, with ^ for powers
+    display = " ".join(expression.split()).replace(" ** ", "^").replace("**", "^")
+    if display.startswith("(") and display.endswith(")") and display.count("(") == 1:
+        display = display[1:-1]
+    return display, result
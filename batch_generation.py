@@ -0,0 +1,107 @@
+"""
+Padded batches of independent questions through one model.generate call.
+
+Bulk jobs used to push questions through the chat path one at a time, so
+every decode step moved the whole model through the caches for a single
+token. A batch of B rows pays for the weights once per step and gets B
+tokens out of it. This is the same saving the continuous batching
+scheduler gets for concurrent chat requests, but for a job that knows all
+its questions up front.
+
+Every row is laid out as
+
+    [system prompt][padding][question turn]
+
+with the attention mask zeroing the padding. generate() derives position
+ids from the mask, so each question continues right after the system
+prompt. The padding sits in the middle because every row then shares the
+exact system prompt prefix. When the prefix cache exists, its KV cache is
+repeated across the batch, and only the question turns are prefilled.
+
+Each row gets its own stopping criteria, wrapped by RowStoppingCriteria so
+the rows stop independently. The batch size comes from the memory the rows'
+KV caches will need against what the machine has free.
+"""
+import os
+
+import torch
+from transformers import DynamicCache, StoppingCriteria
+
+# Bytes per row for the sampling buffers over the vocabulary (logits, scores, probabilities, mask)
+VOCAB_BUFFERS = 4
+
+
+def available_memory_bytes():
+    """MemAvailable from /proc/meminfo, or free physical pages where that does not exist"""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def row_bytes(model, sequence_tokens):
+    """Memory one batch row needs for a sequence_tokens long KV cache plus its sampling buffers"""
+    config = getattr(model, "config", None)
+    if config is None:
+        return 0
+    head_dim = getattr(config, "head_dim", None) or config.hidden_size // config.num_attention_heads
+    kv_heads = getattr(config, "num_key_value_heads", None) or config.num_attention_heads
+    element = next(model.parameters()).element_size()
+    kv_per_token = 2 * config.num_hidden_layers * kv_heads * head_dim * element
+    return sequence_tokens * kv_per_token + VOCAB_BUFFERS * config.vocab_size * 4
+
+
+def memory_batch_size(model, sequence_tokens, max_batch_size, memory_fraction=0.5):
+    """Rows that fit in memory_fraction of the free memory, between 1 and max_batch_size"""
+    per_row = row_bytes(model, sequence_tokens)
+    if not per_row:
+        return max_batch_size
+    return max(1, min(max_batch_size, int(available_memory_bytes() * memory_fraction // per_row)))
+
+
+def build_batch_inputs(system_ids, suffixes, pad_token_id, prefix_cache=None):
+    """Padded generate() inputs for one batch of question turns that share the system prompt"""
+    width = max(len(suffix) for suffix in suffixes)
+    rows, masks = [], []
+    for suffix in suffixes:
+        padding = width - len(suffix)
+        rows.append(system_ids + [pad_token_id] * padding + suffix)
+        masks.append([1] * len(system_ids) + [0] * padding + [1] * len(suffix))
+    inputs = {"input_ids": torch.tensor(rows), "attention_mask": torch.tensor(masks)}
+    if prefix_cache is not None:
+        inputs["input_ids"] = inputs["input_ids"].to(prefix_cache.input_ids.device)
+        inputs["attention_mask"] = inputs["attention_mask"].to(prefix_cache.input_ids.device)
+        inputs["past_key_values"] = repeat_cache(prefix_cache.past_key_values, len(suffixes))
+    return inputs
+
+
+def repeat_cache(past_key_values, batch_size):
+    """A fresh cache holding batch_size copies of a batch-of-one cache"""
+    return DynamicCache.from_legacy_cache(tuple(
+        (key.repeat(batch_size, 1, 1, 1), value.repeat(batch_size, 1, 1, 1))
+        for key, value in past_key_values.to_legacy_cache()
+    ))
+
+
+class RowStoppingCriteria(StoppingCriteria):
+    """One single-sequence criteria per batch row, so each row stops on its own"""
+
+    def __init__(self, criteria, eos_token_id=None):
+        self.criteria = criteria
+        self.eos_token_id = eos_token_id
+        self.done = [False] * len(criteria)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        for row, criteria in enumerate(self.criteria):
+            if self.done[row]:
+                continue
+            # A row that emitted EOS is finished; generate() only pads it from here on
+            if self.eos_token_id is not None and input_ids[row, -1].item() == self.eos_token_id:
+                self.done[row] = True
+            else:
+                self.done[row] = bool(criteria(input_ids[row:row + 1], scores)[0])
+        return torch.tensor(self.done, dtype=torch.bool, device=input_ids.device)
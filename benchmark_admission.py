@@ -0,0 +1,105 @@
+"""
+Admission Control Benchmark
+An overloaded LLM path with and without the deadline admission controller.
+Clients arrive at a fixed rate faster than the model can serve them, and
+each waits for its whole reply. The stub model holds a lock while it
+generates, like a small CPU box that can only run one generation at a time.
+The queue keeps growing, and without admission control the latency does
+too. Each client goes through chat_with_thani, the Gradio chat handler,
+which runs without a Gradio concurrency limit so the whole backlog reaches
+admission control.
+
+    fallback     LLM replies lost to an error or to the generation deadline
+    shed         requests answered from the fallback replies by admission control
+    within SLO   replies of any kind that arrived inside the SLO
+    goodput      LLM replies inside the SLO per second of the run
+"""
+
+import argparse
+import random
+import threading
+import time
+
+import app
+from admission import AdmissionController
+from stub_model import StubModel, StubTokenizer
+
+class OneAtATimeStubModel(StubModel):
+    """Stub model that generates for one request at a time, like a saturated CPU"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._busy = threading.Lock()
+        self.served_threads = set()
+
+    def generate(self, *args, **kwargs):
+        self.served_threads.add(threading.current_thread())
+        with self._busy:
+            return super().generate(*args, **kwargs)
+
+def run_load(args, model, slo_seconds):
+    """Send args.requests requests at args.rate per second; returns (latency, answered by the LLM) per request"""
+    app._admission = AdmissionController(slo_seconds=slo_seconds, capacity=1)
+    routes_before = {path: counter.value for path, counter in app._routes.items()}
+    results = []
+    lock = threading.Lock()
+
+    def client(number):
+        started = time.perf_counter()
+        for _ in app.chat_with_thani(f"why is request {number} so slow, explain it to me?", None):
+            pass
+        with lock:
+            results.append((time.perf_counter() - started, threading.current_thread() in model.served_threads))
+
+    rng = random.Random(7)
+    threads = []
+    started = time.perf_counter()
+    for number in range(args.requests):
+        thread = threading.Thread(target=client, args=(number,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(rng.expovariate(args.rate))
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    routes = {path: counter.value - routes_before[path] for path, counter in app._routes.items()}
+    return sorted(results), routes, seconds, app._admission.stats()
+
+def run_benchmark(args):
+    """Print one row with shedding off and one with it on"""
+    model = OneAtATimeStubModel(prefill_ms=args.prefill_ms, token_ms=args.token_ms)
+    app.install_model(StubTokenizer(), model)
+    app._response_cache = None
+    app._similarity_index = None
+    # The whole reply in one piece, generated on the client's thread
+    app.STREAMING_ENABLED = False
+    # One request first, so the lazy transformers imports are not raced by the burst
+    app.generate_thani_response("why is the warmup request so slow, explain it to me?", [])
+
+    print("\n⚡ Admission Control Benchmark")
+    print(f"{args.requests} requests at {args.rate}/s, one generation at a time, SLO {args.slo}s")
+    print("=" * 102)
+    print(f"{'shedding':>9} {'llm':>5} {'fallback':>9} {'shed':>5} {'p50 s':>7} {'p95 s':>7} {'max s':>7} "
+          f"{'within SLO':>11} {'goodput/s':>10} {'est. latency s':>15}")
+    print("-" * 102)
+    for label, slo in (("off", 0), ("on", args.slo)):
+        model.served_threads.clear()
+        results, routes, seconds, stats = run_load(args, model, slo)
+        latencies = [latency for latency, _ in results]
+        within = sum(latency <= args.slo for latency in latencies)
+        llm_within = sum(latency <= args.slo for latency, from_llm in results if from_llm)
+        print(f"{label:>9} {routes['llm']:>5.0f} {routes['fallback']:>9.0f} {routes['shed']:>5.0f} "
+              f"{latencies[len(latencies) // 2]:>7.2f} {latencies[int(len(latencies) * 0.95)]:>7.2f} "
+              f"{latencies[-1]:>7.2f} {within / len(latencies):>10.0%} {llm_within / seconds:>10.2f} "
+              f"{stats['recent_latency_seconds']:>15.2f}")
+    print("=" * 102)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency under overload with and without load shedding")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--rate", type=float, default=0.8, help="arrivals per second")
+    parser.add_argument("--slo", type=float, default=8.0)
+    parser.add_argument("--prefill-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=30.0)
+    arguments = parser.parse_args()
+    run_benchmark(arguments)
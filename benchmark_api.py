@@ -0,0 +1,196 @@
+"""
+API Overhead Benchmark
+Per-request cost of the ways a program can ask Thani something, measured
+by a local load generator against a real uvicorn server. The server runs
+the stub model with zero generation time and no caches. Every request still
+takes the full LLM path, but the time left over is protocol overhead.
+
+    gradio api           the chat event over Gradio's queue protocol, as
+                         gradio_client speaks it: join the queue, then read the
+                         status and UI output stream to process_completed (the
+                         old way, on a keep-alive connection too)
+    json, new conn.      POST /v1/chat on a fresh connection per request
+    json, keep-alive     POST /v1/chat over one pooled keep-alive connection
+    json sse, keep-alive POST /v1/chat with "stream": true, read to the done event
+
+Each client thread keeps its own session, like the Slack bridge does per
+channel.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+
+def run_server(args):
+    """Serve the app with the zero-cost stub model until killed"""
+    import uvicorn
+
+    import app
+    from stub_model import StubModel, StubTokenizer
+
+    app.install_model(StubTokenizer(), StubModel(prefill_ms=0, token_ms=0))
+    app._response_cache = None
+    app._similarity_index = None
+    uvicorn.run(app.create_server(), host="127.0.0.1", port=args.port, log_level="warning",
+                timeout_keep_alive=app.KEEP_ALIVE_SECONDS)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(url, timeout=120):
+    """Poll /health until the server answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{url}/health", timeout=1)
+            return True
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    return False
+
+def gradio_sender(url):
+    """The chat event through /queue/join and /queue/data; one Gradio session per thread"""
+    client = httpx.Client(timeout=60)
+    config = client.get(f"{url}/config").json()
+    fn_index, dependency = next((index, dependency) for index, dependency in enumerate(config["dependencies"])
+                                if dependency.get("api_name") == "chat_with_thani")
+    session_hash = uuid.uuid4().hex[:11]
+
+    def send(message):
+        # The session state input is filled in by the server from the session hash
+        joined = client.post(f"{url}/queue/join", json={
+            "data": [message, None], "fn_index": fn_index, "session_hash": session_hash,
+            "event_data": None, "trigger_id": dependency["targets"][0][0],
+        })
+        joined.raise_for_status()
+        event_id = joined.json()["event_id"]
+        with client.stream("GET", f"{url}/queue/data", params={"session_hash": session_hash}) as stream:
+            for line in stream.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                update = json.loads(line[len("data:"):])
+                if update.get("msg") == "process_completed" and update.get("event_id") == event_id:
+                    if not update.get("success", True):
+                        raise RuntimeError(update.get("output"))
+                    return
+    return send
+
+def json_sender(url, keep_alive=True, stream=False):
+    """Requests to /v1/chat that carry the session id from the previous reply"""
+    client = httpx.Client(timeout=60) if keep_alive else None
+    session = {"session_id": None}
+
+    def send(message):
+        body = {"message": message, "session_id": session["session_id"], "stream": stream}
+        if not keep_alive:
+            # A fresh client is a fresh connection
+            with httpx.Client(timeout=60) as fresh:
+                response = fresh.post(f"{url}/v1/chat", json=body)
+        elif not stream:
+            response = client.post(f"{url}/v1/chat", json=body)
+        else:
+            with client.stream("POST", f"{url}/v1/chat", json=body) as response:
+                event = None
+                for line in response.iter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: ") and event == "done":
+                        session["session_id"] = json.loads(line[len("data: "):])["session_id"]
+            return
+        response.raise_for_status()
+        session["session_id"] = response.json()["session_id"]
+    return send
+
+def run_load(make_sender, args):
+    """args.requests messages over args.concurrency client threads; returns (latencies, seconds, errors)"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    per_thread = args.requests // args.concurrency
+
+    def worker(number):
+        try:
+            send = make_sender()
+        except Exception as e:
+            with lock:
+                errors.append(e)
+            return
+        for turn in range(per_thread):
+            started = time.perf_counter()
+            try:
+                send(f"why is client {number} turn {turn} so slow, explain it?")
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), time.perf_counter() - started, errors
+
+def run_benchmark(args):
+    """Start a server, then print one row per client kind"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, THANI_TUNING_PROFILE="", THANI_KNOWLEDGE_RELOAD_SECONDS="0")
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--server", "--port", str(port)], env=env)
+    try:
+        if not wait_for_server(url):
+            print("❌ Server did not start")
+            return
+        # One request first, so the lazy imports are not timed
+        json_sender(url)("warmup request, why so slow?")
+        clients = [
+            ("gradio api", lambda: gradio_sender(url)),
+            ("json, new conn.", lambda: json_sender(url, keep_alive=False)),
+            ("json, keep-alive", lambda: json_sender(url)),
+            ("json sse, keep-alive", lambda: json_sender(url, stream=True)),
+        ]
+        print("\n⚡ API Overhead Benchmark")
+        print(f"{args.requests} requests, {args.concurrency} client thread(s), zero-cost stub model")
+        print("=" * 76)
+        print(f"{'client':<22} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'req/s':>8} {'vs gradio':>10} {'errors':>7}")
+        print("-" * 76)
+        gradio_p50 = None
+        for name, make_sender in clients:
+            latencies, seconds, errors = run_load(make_sender, args)
+            if not latencies:
+                print(f"❌ {name} failed: {errors[0] if errors else 'no requests'}")
+                continue
+            p50 = statistics.median(latencies) * 1000
+            gradio_p50 = gradio_p50 or p50
+            print(f"{name:<22} {p50:>8.1f} {latencies[int(len(latencies) * 0.95)] * 1000:>8.1f} "
+                  f"{latencies[-1] * 1000:>8.1f} {len(latencies) / seconds:>8.1f} {gradio_p50 / p50:>9.1f}x "
+                  f"{len(errors):>7}")
+        print("=" * 76)
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request overhead of the Gradio API against the JSON endpoint")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--server", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=7860, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.server:
+        run_server(arguments)
+    else:
+        run_benchmark(arguments)
@@ -0,0 +1,97 @@
+"""
+Arithmetic Fast Path Benchmark
+Runs math questions through the old first-two-integers branch and the safe
+expression engine, showing each answer and the cost per question ("None" when
+the message is not a sum, like a score inside a sentence). Hostile
+inputs check that the limits refuse them in microseconds
+"""
+
+import re
+import time
+
+from arithmetic import ExpressionTooLarge, evaluate, format_number
+
+RUNS = 2000
+
+QUESTIONS = [
+    ("12 + 7", "19"),
+    ("12 * 7", "84"),
+    ("what is 3.5 + 2?", "5.5"),
+    ("(4+5)*2", "18"),
+    ("what is 2^10", "1024"),
+    ("2 + 3 * 4", "14"),
+    ("100 divided by 8", "12.5"),
+    ("20% of 50", "10"),
+    ("17 mod 5", "2"),
+    ("5 squared", "25"),
+    ("1,000 - 250", "750"),
+    ("6 into 7 ethra?", "42"),
+    ("5 um 3 um koottiyal", "8"),
+    ("10 il ninnu 4 kurachal", "6"),
+    ("12 ne 7 kond gunichal", "84"),
+    ("10 // 3", "3"),
+    ("100 - 50%", "50"),
+    ("200 + 10%", "220"),
+    ("what is 45/50", "0.9"),
+    ("45/50", "0.9"),
+    ("I scored 45/50 in maths", None),
+    ("born on 12/5/2024", None),
+    ("explain the 1939-1945 war", None),
+    ("india won 2-1, who shone?", None),
+    ("give me 5-10 study tips", None),
+    ("what is 12-7", "5"),
+]
+
+HOSTILE = ["9^9^9^9", "2 ** 100000", "99999999999999999999 * 9", "10 / 0", "(" * 100 + "1" + ")" * 100]
+
+def old_answer(message):
+    """The previous branch: first two integers, + or - only"""
+    numbers = re.findall(r'\d+', message)
+    if len(numbers) < 2:
+        return None
+    if '+' in message or 'plus' in message.lower():
+        return str(int(numbers[0]) + int(numbers[1]))
+    if '-' in message or 'minus' in message.lower():
+        return str(int(numbers[0]) - int(numbers[1]))
+    return None
+
+def new_answer(message):
+    """Formatted result from the expression engine, or the refusal reason"""
+    try:
+        found = evaluate(message)
+    except ZeroDivisionError:
+        return "division by zero"
+    except ExpressionTooLarge:
+        return "too large"
+    return format_number(found[1]) if found else None
+
+def time_per_call(function, message):
+    """Mean microseconds per call"""
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        function(message)
+    return (time.perf_counter() - started) / RUNS * 1e6
+
+def run_benchmark():
+    """Print both answers and the engine's cost for every question"""
+    print("\n⚡ Arithmetic Fast Path Benchmark")
+    print("=" * 84)
+    print(f"{'question':<26} {'expected':>9} {'old':>9} {'new':>18} {'new µs':>8}")
+    print("-" * 84)
+
+    correct_old = correct_new = 0
+    for question, expected in QUESTIONS:
+        old, new = old_answer(question), new_answer(question)
+        correct_old += old == expected
+        correct_new += new == expected
+        print(f"{question:<26} {str(expected):>9} {str(old):>9} {str(new):>18} {time_per_call(new_answer, question):>8.1f}")
+    for question in HOSTILE:
+        print(f"{question[:26]:<26} {'refused':>9} {'':>9} {str(new_answer(question)):>18} "
+              f"{time_per_call(new_answer, question):>8.1f}")
+
+    print("-" * 84)
+    print(f"Correct: old {correct_old}/{len(QUESTIONS)}, new {correct_new}/{len(QUESTIONS)}")
+    print("=" * 84)
+
+if __name__ == "__main__":
+    run_benchmark()
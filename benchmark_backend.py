@@ -0,0 +1,150 @@
+"""
+Backend Benchmark
+Eager PyTorch against the compiled backend (THANI_BACKEND=compiled) through
+the app's own streaming generation path, side by side. The compiled backend
+runs twice: first with an empty kernel cache (a first deployment), then with
+the cache that run left on disk (every later startup). Each row runs in a
+fresh process.
+
+    warmup s      the warmup generation, which is where the compile happens
+    prefill ms    median time to the first token
+    ms/token      median decode time per token after the first
+    same text     greedy output identical to the eager run
+
+A randomly initialized Llama (no download) and the stub byte tokenizer stand
+in for Llama-3.2-1B, with a shortened system prompt.
+
+    python benchmark_backend.py --hidden 1024 --layers 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+QUESTIONS = [
+    "why is the sky blue, explain it to me?",
+    "who wrote the malayalam novel khasakkinte ithihasam?",
+    "how does a refrigerator keep things cold?",
+    "what is the capital of australia and why not sydney?",
+    "explain compound interest like i am five",
+    "why do onions make people cry?",
+    "how far away is the moon?",
+    "what causes the monsoon in kerala?",
+]
+
+def run_child(args):
+    """One backend: build the model, warm it up, then time every question"""
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    import app
+    from compiled_backend import compile_model
+    from prefix_cache import PrefixCache
+    from stub_model import StubTokenizer
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=320,
+        hidden_size=args.hidden,
+        intermediate_size=args.hidden * 4,
+        num_hidden_layers=args.layers,
+        num_attention_heads=args.hidden // 64,
+        num_key_value_heads=args.hidden // 64,
+        max_position_embeddings=4096,
+        bos_token_id=0,
+        eos_token_id=StubTokenizer.eos_token_id,
+    )
+    model = LlamaForCausalLM(config).eval()
+    if app.BACKEND == "compiled":
+        model = compile_model(model, app.COMPILE_CACHE_PATH)
+
+    tokenizer = StubTokenizer()
+    app.THANI_PROMPT_PREFIX = app.THANI_PROMPT_PREFIX[:args.prompt_chars]
+    generation_kwargs = app.generation_kwargs
+    # Greedy and without early stops, so both backends generate the same tokens
+    app.generation_kwargs = lambda tokenizer: {
+        **generation_kwargs(tokenizer), "max_new_tokens": args.new_tokens, "do_sample": False,
+        "temperature": None, "top_p": None, "top_k": None,
+    }
+    app.MAX_SENTENCES = 0
+    app.REPEAT_NGRAM_TOKENS = 0
+    app._response_cache = None
+    app._similarity_index = None
+    app.install_model(tokenizer, model)
+    app._prefix_cache = PrefixCache(tokenizer, model, app.THANI_PROMPT_PREFIX)
+
+    started = time.perf_counter()
+    app.warm_model(tokenizer, model)
+    warmup_s = time.perf_counter() - started
+
+    prefill_ms, token_ms, texts = [], [], []
+    for question in QUESTIONS * args.rounds:
+        text, summary = app.collect_stream(app.stream_llm_text(tokenizer, model, question, []))
+        prefill_ms.append(summary["prefill_seconds"] * 1000)
+        token_ms.append(summary["decode_seconds"] * 1000 / max(summary["generated"] - 1, 1))
+        texts.append(text)
+
+    result = {
+        "warmup_s": warmup_s,
+        "prefill_ms": statistics.median(prefill_ms),
+        "token_ms": statistics.median(token_ms),
+        "texts": texts,
+        "backend": app.backend_stats(),
+    }
+    print(json.dumps(result), flush=True)
+    os._exit(0)
+
+def run_benchmark(args):
+    """Run eager, compiled with a cold cache and compiled with a warm cache, one row each"""
+    cache_dir = tempfile.mkdtemp(prefix="thani-compile-cache-")
+    rows = [
+        ("eager", {"THANI_BACKEND": "eager"}),
+        ("compiled, cold cache", {"THANI_BACKEND": "compiled"}),
+        ("compiled, warm cache", {"THANI_BACKEND": "compiled"}),
+    ]
+    print("\n⚡ Backend Benchmark")
+    print(f"hidden={args.hidden}, layers={args.layers}, {len(QUESTIONS) * args.rounds} questions, "
+          f"new tokens={args.new_tokens}, system prompt={args.prompt_chars} chars")
+    print("=" * 84)
+    print(f"{'backend':<22} {'warmup s':>9} {'prefill ms':>11} {'ms/token':>9} {'tok/s':>7} "
+          f"{'speedup':>8} {'same text':>10}")
+    print("-" * 84)
+    eager = None
+    try:
+        for name, extra_env in rows:
+            env = dict(os.environ, THANI_COMPILE_CACHE_DIR=cache_dir, THANI_TUNING_PROFILE="", **extra_env)
+            command = [sys.executable, os.path.abspath(__file__), "--child", "--hidden", str(args.hidden),
+                       "--layers", str(args.layers), "--new-tokens", str(args.new_tokens),
+                       "--prompt-chars", str(args.prompt_chars), "--rounds", str(args.rounds)]
+            completed = subprocess.run(command, env=env, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"❌ {name} failed: {completed.stderr.strip().splitlines()[-1:]}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            eager = eager or result
+            same = "yes" if result["texts"] == eager["texts"] else "no"
+            print(f"{name:<22} {result['warmup_s']:>9.1f} {result['prefill_ms']:>11.1f} {result['token_ms']:>9.1f} "
+                  f"{1000 / result['token_ms']:>7.1f} {eager['token_ms'] / result['token_ms']:>7.2f}x {same:>10}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    print("=" * 84)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefill and per-token latency, eager vs compiled backend")
+    parser.add_argument("--hidden", type=int, default=1024)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--prompt-chars", type=int, default=400)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.child:
+        run_child(arguments)
+    else:
+        run_benchmark(arguments)
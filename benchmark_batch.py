@@ -0,0 +1,98 @@
+"""
+Batch Answering Benchmark
+1k independent questions answered two ways, with the stub model standing in
+for Llama-3.2-1B:
+
+    sequential   generate_thani_response in a loop, one generation per question
+    batched      answer_batch, which sends the LLM misses through padded
+                 batches of up to THANI_BATCH_MAX_SIZE rows
+
+About a fifth of the questions are arithmetic the pattern fast path answers.
+The response cache and the similarity index are off and every question is
+distinct, so both runs generate the same replies.
+
+    first s     time until the first answer came out
+    same llm    generated replies identical to the sequential run (the
+                arithmetic replies pick a random phrasing, so they are left out)
+"""
+
+import argparse
+import time
+
+import app
+from stub_model import StubModel, StubTokenizer
+
+QUESTION_TEMPLATES = [
+    "why is question {number} about the sky so hard?",
+    "who decided the rules of game {number}?",
+    "how does machine number {number} keep things cold?",
+    "explain compound interest for {number} rupees like i am five",
+    "what is {number} + 7",
+]
+
+def questions(count):
+    """count distinct questions, every fifth one arithmetic"""
+    return [QUESTION_TEMPLATES[number % len(QUESTION_TEMPLATES)].format(number=number) for number in range(count)]
+
+def run_sequential(messages):
+    """One generate_thani_response call per message; returns (replies, first answer s, total s)"""
+    started = time.perf_counter()
+    first = None
+    replies = []
+    for message in messages:
+        replies.append(app.generate_thani_response(message, []))
+        first = first or time.perf_counter() - started
+    return replies, first, time.perf_counter() - started
+
+def run_batched(messages):
+    """answer_batch over every message; returns (replies, paths, first answer s, total s)"""
+    started = time.perf_counter()
+    first = None
+    replies, paths = [], []
+    for index, reply, path in app.answer_batch(messages):
+        assert index == len(replies), "answers out of order"
+        replies.append(reply)
+        paths.append(path)
+        first = first or time.perf_counter() - started
+    return replies, paths, first, time.perf_counter() - started
+
+def run_benchmark(args):
+    """Print one row for the sequential loop and one per batch size"""
+    model = StubModel(prefill_ms=args.prefill_ms, token_ms=args.token_ms, batch_overhead=args.batch_overhead)
+    app.install_model(StubTokenizer(), model)
+    app._response_cache = None
+    app._similarity_index = None
+    messages = questions(args.questions)
+
+    print("\n⚡ Batch Answering Benchmark")
+    print(f"{len(messages)} questions, prefill {args.prefill_ms:.0f} ms, {args.token_ms:.0f} ms/token, "
+          f"+{args.batch_overhead:.0%} of a step per extra batch row")
+    print("=" * 82)
+    print(f"{'mode':<14} {'batch':>6} {'generate calls':>15} {'first s':>8} {'total s':>8} {'q/s':>7} "
+          f"{'speedup':>8} {'same llm':>9}")
+    print("-" * 82)
+    calls = model.calls
+    expected, first, seconds = run_sequential(messages)
+    sequential_seconds = seconds
+    print(f"{'sequential':<14} {1:>6} {model.calls - calls:>15} {first:>8.2f} {seconds:>8.1f} "
+          f"{len(messages) / seconds:>7.1f} {1:>7.2f}x {'-':>9}")
+    for batch_size in args.batch_sizes:
+        app.BATCH_MAX_SIZE = batch_size
+        calls = model.calls
+        replies, paths, first, seconds = run_batched(messages)
+        generated = [(reply, reference) for reply, path, reference in zip(replies, paths, expected) if path == "llm"]
+        same = sum(reply == reference for reply, reference in generated) / max(len(generated), 1)
+        print(f"{'batched':<14} {batch_size:>6} {model.calls - calls:>15} {first:>8.2f} {seconds:>8.1f} "
+              f"{len(messages) / seconds:>7.1f} {sequential_seconds / seconds:>7.2f}x {same:>9.0%}")
+    print("=" * 82)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk question answering, batched against a sequential loop")
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 16, 32])
+    parser.add_argument("--prefill-ms", type=float, default=20.0)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--batch-overhead", type=float, default=0.1,
+                        help="extra cost of a decode step per additional batch row, as a fraction of a step")
+    arguments = parser.parse_args()
+    run_benchmark(arguments)
@@ -0,0 +1,88 @@
+"""
+Continuous Batching Load Test
+Compares decode throughput of per-request model.generate calls against the
+shared scheduler loop at 1, 4 and 16 concurrent users
+"""
+
+import threading
+import time
+
+import torch
+
+import app
+from scheduler import InferenceScheduler
+
+CONCURRENT_USERS = [1, 4, 16]
+REQUESTS_PER_USER = 3
+MAX_NEW_TOKENS = 48
+
+QUESTIONS = [
+    "Who won the Cricket World Cup?",
+    "What is quantum computing?",
+    "Ente laptop slow aanu, enthu cheyyum?",
+    "Explain black holes",
+    "Best movie of Mohanlal aarade?",
+    "Why is the sky blue?",
+]
+
+def run_users(users, generate_one):
+    """Fire REQUESTS_PER_USER requests from each user thread, return (tokens, seconds)"""
+    generated = []
+    lock = threading.Lock()
+
+    def user(index):
+        for turn in range(REQUESTS_PER_USER):
+            question = QUESTIONS[(index + turn) % len(QUESTIONS)]
+            tokens = generate_one(question)
+            with lock:
+                generated.append(tokens)
+
+    threads = [threading.Thread(target=user, args=(index,)) for index in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(generated), time.perf_counter() - started
+
+def run_benchmark():
+    """Print tokens/sec for both execution modes at each concurrency level"""
+    app.CONTINUOUS_BATCHING_ENABLED = False
+    tokenizer, model = app.load_model()
+    if not (tokenizer and model):
+        print("❌ Model could not be loaded")
+        return
+
+    kwargs = app.generation_kwargs(tokenizer)
+    kwargs["max_new_tokens"] = MAX_NEW_TOKENS
+
+    def direct(question):
+        inputs = app.build_llm_inputs(tokenizer, question, [])
+        with torch.no_grad():
+            outputs = model.generate(**inputs, **kwargs)
+        return outputs.shape[1] - inputs["input_ids"].shape[1]
+
+    scheduler = InferenceScheduler(model, max_batch_size=max(CONCURRENT_USERS))
+
+    def batched(question):
+        inputs = app.build_llm_inputs(tokenizer, question, [])
+        outputs = scheduler.generate(inputs, **kwargs)
+        return outputs.shape[1] - inputs["input_ids"].shape[1]
+
+    print("\n⚡ Continuous Batching Load Test")
+    print(f"{REQUESTS_PER_USER} requests per user, max_new_tokens={MAX_NEW_TOKENS}, threads: {torch.get_num_threads()}")
+    print("=" * 70)
+    print(f"{'users':>6} {'generate tok/s':>16} {'scheduler tok/s':>16} {'speedup':>9}")
+    print("-" * 70)
+
+    for users in CONCURRENT_USERS:
+        direct_tokens, direct_seconds = run_users(users, direct)
+        batched_tokens, batched_seconds = run_users(users, batched)
+        direct_rate = direct_tokens / direct_seconds
+        batched_rate = batched_tokens / batched_seconds
+        print(f"{users:>6} {direct_rate:>16.1f} {batched_rate:>16.1f} {batched_rate / direct_rate:>8.1f}x")
+
+    print("=" * 70)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,87 @@
+"""
+Generation Budget Benchmark
+LLM replies under shrinking wall-clock budgets, through generate_thani_response
+with the stub model decoding at a fixed speed and replying in five short sentences.
+
+    fixed      the budget is used as given, so a budget shorter than one
+               sentence can only stop mid-sentence
+    adaptive   GenerationBudget has learned the decode speed from a few
+               unhurried requests and stretches short budgets to fit one sentence
+
+    partial      replies cut short by the budget
+    whole sent.  replies that end on a sentence terminator (or the enhancer's "!")
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import app
+from stopping import GenerationBudget
+from stub_model import StubModel, StubTokenizer
+
+BUDGETS = [0.5, 1.0, 2.0, 3.0, None]
+
+BUDGET_REPLIES = [
+    "Eda myre, athu simple aanu! Vellam aaviyaakum. Aavi mukalil poyi thanukkum. "
+    "Pinne mazha peyyum. Ithokke school il padichathalle?",
+    "Da kunne, kelkku. Bhoomi sooryane chuttunnu. Athaanu kaalam maarunnath. "
+    "Chaayva kaaranam choodum varum. Ithu polum ariyille?",
+]
+
+def run_budget(args, budget_seconds, adaptive):
+    """args.requests replies at one budget; returns (latencies, replies, budget stats)"""
+    app._generation_budget = GenerationBudget()
+    if adaptive:
+        # A few unhurried replies teach it the decode speed and sentence length
+        for number in range(3):
+            app.generate_thani_response(f"why is learning request {number} so slow, explain it?", [])
+        learned = app._generation_budget
+        app._generation_budget = GenerationBudget(sentence_tokens=learned.sentence_tokens)
+        app._generation_budget.tokens_per_second = learned.tokens_per_second
+        app._generation_budget.prefill_seconds = learned.prefill_seconds
+    else:
+        # Never learns, so every budget is used as given
+        app._generation_budget.observe = lambda *measurements: None
+    latencies, replies = [], []
+    for number in range(args.requests):
+        random.seed(number)
+        started = time.perf_counter()
+        replies.append(app.generate_thani_response(f"why is request {number} so slow, explain it?", [],
+                                                   budget_seconds=budget_seconds))
+        latencies.append(time.perf_counter() - started)
+    return latencies, replies, app._generation_budget.stats()
+
+def run_benchmark(args):
+    """Print one row per budget and mode"""
+    app.install_model(StubTokenizer(), StubModel(prefill_ms=args.prefill_ms, token_ms=args.token_ms, replies=BUDGET_REPLIES))
+    app._response_cache = None
+    app._similarity_index = None
+    app.MAX_SENTENCES = 0
+
+    print("\n⚡ Generation Budget Benchmark")
+    print(f"{args.requests} requests per row, prefill {args.prefill_ms:.0f} ms, {args.token_ms:.0f} ms/token, "
+          f"full reply ~{(args.prefill_ms + len(BUDGET_REPLIES[0]) * args.token_ms) / 1000:.1f}s")
+    print("=" * 86)
+    print(f"{'budget s':>9} {'mode':>9} {'p50 s':>7} {'max s':>7} {'partial':>8} {'avg partial chars':>18} "
+          f"{'whole sent.':>12} {'stretched':>10}")
+    print("-" * 86)
+    for budget in BUDGETS:
+        for adaptive in (False, True):
+            latencies, replies, stats = run_budget(args, budget if budget is not None else 0, adaptive)
+            whole = sum(reply.rstrip().endswith(tuple(".!?")) for reply in replies)
+            label = f"{budget:.1f}" if budget is not None else "none"
+            average = f"{stats['avg_partial_chars']:.0f}" if stats["avg_partial_chars"] is not None else "-"
+            print(f"{label:>9} {'adaptive' if adaptive else 'fixed':>9} {statistics.median(latencies):>7.2f} "
+                  f"{max(latencies):>7.2f} {stats['partial_ratio']:>8.0%} {average:>18} "
+                  f"{whole / len(replies):>12.0%} {stats['extended']:>10}")
+    print("=" * 86)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partial answers under wall-clock budgets")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--prefill-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    arguments = parser.parse_args()
+    run_benchmark(arguments)
@@ -0,0 +1,103 @@
+"""
+Intent Matcher Microbenchmark
+Compares the compiled Aho-Corasick matcher against the old substring cascade
+as the intent table grows to thousands of entries
+"""
+
+import random
+import string
+import time
+
+from intents import IntentMatcher, load_intents
+
+KNOWLEDGE_INTENTS = load_intents()
+
+TABLE_SIZES = [len(KNOWLEDGE_INTENTS), 500, 1000, 2500, 5000]
+MESSAGES_PER_RUN = 2000
+
+def random_word(rng):
+    """Build a pseudo word out of lowercase letters"""
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+def synthetic_intents(size, rng):
+    """Real intent table padded with synthetic keyword intents up to size"""
+    intents = list(KNOWLEDGE_INTENTS)
+    while len(intents) < size:
+        intents.append({
+            "name": f"synthetic.{len(intents)}",
+            "priority": 1000 + len(intents),
+            "all": [
+                [random_word(rng) for _ in range(rng.randint(1, 3))]
+                for _ in range(rng.randint(1, 2))
+            ],
+            "responses": ["Synthetic da thayoli!"],
+        })
+    return intents
+
+def synthetic_messages(intents, count, rng):
+    """Mix real questions with messages that hit random synthetic keywords"""
+    real_questions = [
+        "kerala chief minister aarade?",
+        "what is the capital of france?",
+        "what is photosynthesis?",
+        "how many states in india?",
+        "who are you",
+        "enthuva myre, sugamano?",
+    ]
+    messages = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            messages.append(rng.choice(real_questions))
+        else:
+            intent = rng.choice(intents)
+            words = [rng.choice(group) for group in intent["all"]]
+            words += [random_word(rng) for _ in range(rng.randint(2, 8))]
+            rng.shuffle(words)
+            messages.append(" ".join(words))
+    return messages
+
+def cascade_match(intents, text):
+    """The old approach: walk every intent with substring checks"""
+    for intent in intents:
+        groups = list(intent["all"])
+        if intent.get("starts"):
+            if not any(text.startswith(word) for word in intent["starts"]):
+                continue
+        if all(any(word in text for word in group) for group in groups):
+            return intent
+    return None
+
+def run_benchmark():
+    """Print per-message match cost for both approaches at each table size"""
+    rng = random.Random(42)
+
+    print("\n⚡ Intent Matcher Microbenchmark")
+    print("=" * 80)
+    print(f"{'intents':>8} {'keywords':>9} {'build ms':>9} {'cascade µs/msg':>15} {'automaton µs/msg':>17} {'speedup':>8}")
+    print("-" * 80)
+
+    for size in TABLE_SIZES:
+        intents = sorted(synthetic_intents(size, rng), key=lambda intent: intent["priority"])
+        messages = synthetic_messages(intents, MESSAGES_PER_RUN, rng)
+
+        started = time.perf_counter()
+        matcher = IntentMatcher(intents)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for message in messages:
+            cascade_match(intents, message)
+        cascade_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+        started = time.perf_counter()
+        for message in messages:
+            matcher.best(message)
+        automaton_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+        print(f"{len(intents):>8} {len(matcher._keywords):>9} {build_ms:>9.1f} "
+              f"{cascade_us:>15.1f} {automaton_us:>17.1f} {cascade_us / automaton_us:>7.1f}x")
+
+    print("=" * 80)
+
+if __name__ == "__main__":
+    run_benchmark()
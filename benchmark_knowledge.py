@@ -0,0 +1,113 @@
+"""
+Knowledge Base Load/Reload Benchmark
+Writes a synthetic 50k fact knowledge base to a temp directory, then times
+the initial load (parse + validate + compile), the unchanged-file check the
+watcher runs every poll, a full hot reload after one file is edited, and
+fast-path lookups while reloads swap snapshots underneath them
+"""
+
+import json
+import os
+import random
+import string
+import tempfile
+import threading
+import time
+
+from intents import KnowledgeBase, load_intents
+
+FACT_COUNTS = [5000, 50000]
+FACTS_PER_FILE = 1000
+LOOKUPS = 5000
+
+ATTRIBUTES = ["capital", "president", "population", "currency", "founder", "height", "language", "anthem"]
+
+def random_word(rng):
+    """Build a pseudo entity name out of lowercase letters"""
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+
+def write_knowledge(directory, facts, rng):
+    """Real knowledge files plus synthetic "<attribute> of <entity>" facts split over many files"""
+    for intent_file in os.listdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge")):
+        source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge", intent_file)
+        with open(source, encoding="utf-8") as src, open(os.path.join(directory, intent_file), "w", encoding="utf-8") as dst:
+            dst.write(src.read())
+
+    questions = []
+    for file_index in range(0, facts, FACTS_PER_FILE):
+        intents = []
+        for index in range(file_index, min(file_index + FACTS_PER_FILE, facts)):
+            entity, attribute = random_word(rng), rng.choice(ATTRIBUTES)
+            intents.append({
+                "name": f"synthetic.{index}",
+                "priority": 1000 + index,
+                "all": [[attribute], [entity]],
+                "responses": [f"{entity} nte {attribute} ariyille myre?", f"Eda thayoli, {entity} simple aanu!"],
+            })
+            questions.append(f"what is the {attribute} of {entity}?")
+        with open(os.path.join(directory, f"synthetic_{file_index // FACTS_PER_FILE:03}.json"), "w") as output:
+            json.dump({"intents": intents}, output)
+    return questions
+
+def run_benchmark():
+    """Print load, poll, reload and lookup costs for each knowledge base size"""
+    rng = random.Random(42)
+
+    print("\n⚡ Knowledge Base Load/Reload Benchmark")
+    print("=" * 92)
+    print(f"{'facts':>7} {'parse ms':>9} {'load ms':>9} {'poll ms':>8} {'reload ms':>10} "
+          f"{'lookup µs':>10} {'lookups during reloads':>23}")
+    print("-" * 92)
+
+    for facts in FACT_COUNTS:
+        with tempfile.TemporaryDirectory() as directory:
+            questions = write_knowledge(directory, facts, rng)
+
+            started = time.perf_counter()
+            load_intents(directory)
+            parse_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            knowledge = KnowledgeBase(directory)
+            load_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            knowledge.reload_if_changed()
+            poll_ms = (time.perf_counter() - started) * 1000
+
+            sample = [rng.choice(questions) for _ in range(LOOKUPS)]
+            started = time.perf_counter()
+            for question in sample:
+                knowledge.snapshot.matcher.best(question)
+            lookup_us = (time.perf_counter() - started) / LOOKUPS * 1e6
+
+            # Keep answering while a reader thread's snapshot gets swapped by reloads
+            stop = threading.Event()
+            answered = [0, 0]
+
+            def reader():
+                while not stop.is_set():
+                    snapshot = knowledge.snapshot
+                    intent = snapshot.matcher.best(rng.choice(questions))
+                    answered[0] += 1
+                    answered[1] += intent is not None and intent["name"] in snapshot.by_name
+
+            thread = threading.Thread(target=reader)
+            thread.start()
+            edited = os.path.join(directory, "synthetic_000.json")
+            reload_times = []
+            for _ in range(3):
+                os.utime(edited, ns=(time.time_ns(), time.time_ns()))
+                started = time.perf_counter()
+                knowledge.reload_if_changed()
+                reload_times.append((time.perf_counter() - started) * 1000)
+            stop.set()
+            thread.join()
+
+            print(f"{facts:>7} {parse_ms:>9.0f} {load_ms:>9.0f} {poll_ms:>8.2f} {min(reload_times):>10.0f} "
+                  f"{lookup_us:>10.1f} {f'{answered[1]}/{answered[0]} consistent':>23}")
+
+    print("=" * 92)
+
+if __name__ == "__main__":
+    run_benchmark()
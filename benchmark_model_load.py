@@ -0,0 +1,165 @@
+"""
+Model Load Benchmark
+Cold starts of app.load_model() from a Hub-style checkpoint against a local
+snapshot written by model_snapshot.py, one fresh process per row:
+
+    hub        the current path: bfloat16 safetensors as the Hub ships them,
+               loaded in the precision's dtype (a converted copy for fp32)
+    snapshot   THANI_MODEL_SNAPSHOT with THANI_OFFLINE=1: weights already in
+               the load dtype, memory-mapped in place
+
+    load s        load_model(), including the system prompt prefill
+    reply s       one LLM reply right after, which touches every weight
+    peak MB       the process RSS high-water mark
+    steady MB     RSS after the reply (anonymous + file-backed pages)
+    anon MB       the part of it that is private memory; the snapshot's
+                  file-backed pages are shared with forked workers and can
+                  be dropped by the kernel
+
+A randomly initialized Llama and a small byte-level BPE tokenizer stand in
+for Llama-3.2-1B (no download), with a shortened system prompt so its
+prefill does not drown the load. Both checkpoints are read from a warm page
+cache.
+
+    python benchmark_model_load.py --hidden 1024 --layers 16
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+TRAINING_TEXT = [
+    "Eda myre, athu simple aanu! Google polum ariyam, ninakku ariyille?",
+    "Kerala chief minister aarade? Why is the monsoon late this year?",
+    "You are Thani Thankan, an aggressive Malayalam speaking assistant.",
+]
+
+def write_checkpoint(path, args):
+    """Random Llama in bfloat16 safetensors plus a byte-level BPE tokenizer, like a Hub download"""
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    backend = Tokenizer(models.BPE())
+    backend.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = decoders.ByteLevel()
+    backend.train_from_iterator(TRAINING_TEXT * 10, trainers.BpeTrainer(
+        vocab_size=400, special_tokens=["<eos>"], initial_alphabet=pre_tokenizers.ByteLevel.alphabet()))
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<eos>")
+    tokenizer.save_pretrained(path)
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=args.vocab,
+        hidden_size=args.hidden,
+        intermediate_size=args.hidden * 4,
+        num_hidden_layers=args.layers,
+        num_attention_heads=args.hidden // 64,
+        num_key_value_heads=args.hidden // 64,
+        max_position_embeddings=4096,
+        bos_token_id=0,
+        eos_token_id=tokenizer.eos_token_id,
+        tie_word_embeddings=False,
+    )
+    model = LlamaForCausalLM(config).to(torch.bfloat16)
+    model.save_pretrained(path, safe_serialization=True)
+    return sum(parameter.numel() for parameter in model.parameters())
+
+def memory_mb():
+    """(RSS, anonymous RSS, RSS high-water mark) of this process in MB"""
+    status = {}
+    with open("/proc/self/status") as status_file:
+        for line in status_file:
+            key, _, value = line.partition(":")
+            status[key] = int(value.split()[0]) / 1024 if value.strip().endswith("kB") else None
+    return status["VmRSS"], status["RssAnon"], status["VmHWM"]
+
+def run_child(args):
+    """Load through app.load_model(), answer once, and report the timings and memory"""
+    import time
+
+    import app
+
+    app.MODEL_ID = args.checkpoint
+    app.THANI_PROMPT_PREFIX = app.THANI_PROMPT_PREFIX[:args.prompt_chars]
+    app._response_cache = None
+    app._similarity_index = None
+    started = time.perf_counter()
+    tokenizer, model = app.load_model()
+    if model is None:
+        sys.exit(1)
+    loaded = time.perf_counter()
+    app.generate_llm_text(tokenizer, model, "why is the monsoon late this year?", [])
+    replied = time.perf_counter()
+    steady, anon, peak = memory_mb()
+    print(json.dumps({
+        "load_s": loaded - started,
+        "reply_s": replied - loaded,
+        "peak_mb": peak,
+        "steady_mb": steady,
+        "anon_mb": anon,
+    }), flush=True)
+    os._exit(0)
+
+def run_row(checkpoint, precision, snapshot_path, args):
+    """One cold start in a fresh process; returns its measurements or an error line"""
+    env = dict(os.environ, THANI_PRECISION=precision, THANI_MODEL_SNAPSHOT=snapshot_path, THANI_TUNING_PROFILE="",
+               THANI_CONTINUOUS_BATCHING="0", HF_HUB_OFFLINE="1")
+    if snapshot_path:
+        env["THANI_OFFLINE"] = "1"
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--checkpoint", checkpoint,
+               "--prompt-chars", str(args.prompt_chars)]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": (completed.stderr.strip().splitlines() or completed.stdout.strip().splitlines()
+                          or [f"exit code {completed.returncode}"])[-1]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def run_benchmark(args):
+    """Write the checkpoint and one snapshot per precision, then print a hub and a snapshot row for each"""
+    from model_snapshot import directory_bytes, prepare_snapshot
+
+    workdir = tempfile.mkdtemp(prefix="thani-model-load-")
+    try:
+        checkpoint = os.path.join(workdir, "hub")
+        parameters = write_checkpoint(checkpoint, args)
+        print("\n⚡ Model Load Benchmark")
+        print(f"random Llama, {parameters / 1e6:.0f}M parameters (hidden={args.hidden}, layers={args.layers}, "
+              f"vocab={args.vocab}), checkpoint {directory_bytes(checkpoint) / 1024 ** 2:.0f} MB bf16")
+        print("=" * 88)
+        print(f"{'precision':<10} {'source':<10} {'load s':>7} {'reply s':>8} {'peak MB':>8} {'steady MB':>10} "
+              f"{'anon MB':>8} {'peak/steady':>12}")
+        print("-" * 88)
+        for precision in args.precisions:
+            snapshot = os.path.join(workdir, f"snapshot-{precision}")
+            prepare_snapshot(checkpoint, snapshot, precision, offline=True)
+            for source, path in (("hub", ""), ("snapshot", snapshot)):
+                result = run_row(checkpoint, precision, path, args)
+                if "error" in result:
+                    print(f"❌ {precision} {source} failed: {result['error'][:70]}")
+                    continue
+                print(f"{precision:<10} {source:<10} {result['load_s']:>7.2f} {result['reply_s']:>8.2f} "
+                      f"{result['peak_mb']:>8.0f} {result['steady_mb']:>10.0f} {result['anon_mb']:>8.0f} "
+                      f"{result['peak_mb'] / result['steady_mb']:>11.2f}x")
+        print("=" * 88)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time and peak RSS, Hub-style checkpoint vs local snapshot")
+    parser.add_argument("--hidden", type=int, default=1024)
+    parser.add_argument("--layers", type=int, default=16)
+    parser.add_argument("--vocab", type=int, default=32000)
+    parser.add_argument("--prompt-chars", type=int, default=400)
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "bf16", "int8"])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--checkpoint", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.child:
+        run_child(arguments)
+    else:
+        run_benchmark(arguments)
@@ -0,0 +1,184 @@
+"""
+Offline Benchmark Harness
+Replays the advanced_test.py question corpus plus a seeded synthetic corpus
+through app.py in-process - no Space, no network. The default stub model
+makes runs deterministic; --model real loads the actual Llama weights.
+Reports p50/p95/p99 latency per serving path, throughput and fast-path hit
+rate, and writes everything to a JSON file for comparing commits.
+
+    python benchmark_offline.py --synthetic 2000 --output results.json
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import time
+
+import torch
+
+import app
+from advanced_test import TEST_CASES
+from stub_model import StubModel, StubTokenizer
+
+PATHS = ("pattern", "cache", "llm", "fallback")
+
+OPEN_QUESTION_TEMPLATES = [
+    "Why is the {} so {}?",
+    "Explain {} to me",
+    "Enthanu {}, {} aano?",
+    "Ente {} {} aanu, enthu cheyyum?",
+    "Is {} better than {}?",
+]
+
+OPEN_QUESTION_WORDS = [
+    "sky", "laptop", "monsoon", "biriyani", "traffic", "exam", "rain", "phone", "football", "coffee",
+    "slow", "blue", "expensive", "boring", "hot", "crypto", "startup", "movie", "beach", "metro",
+]
+
+def real_questions():
+    """Every question from the advanced test corpus"""
+    return [question for case in TEST_CASES for question in case["questions"]]
+
+def synthetic_questions(count, rng):
+    """Restyled corpus questions mixed with open questions that need the LLM, with repeats"""
+    corpus = real_questions()
+    questions = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.15 and questions:
+            # Popular questions come back, like in real traffic
+            questions.append(rng.choice(questions))
+        elif roll < 0.55:
+            question = rng.choice(corpus)
+            style = rng.choice([str.lower, str.upper, str.strip, lambda text: text.rstrip("?") + " da??"])
+            questions.append(style(question))
+        else:
+            template = rng.choice(OPEN_QUESTION_TEMPLATES)
+            words = [rng.choice(OPEN_QUESTION_WORDS) for _ in range(template.count("{}"))]
+            questions.append(template.format(*words))
+    return questions
+
+def record_paths(model):
+    """Wrap the pipeline stages so every request reports which one answered it"""
+    state = {"path": None}
+
+    def wrap(function, path):
+        def wrapped(*args, **kwargs):
+            result = function(*args, **kwargs)
+            if result and state["path"] is None:
+                state["path"] = path
+            return result
+        return wrapped
+
+    app.match_fast_path = wrap(app.match_fast_path, "pattern")
+    app.match_similar_question = wrap(app.match_similar_question, "cache")
+    if app._response_cache is not None:
+        app._response_cache.get = wrap(app._response_cache.get, "cache")
+
+    generate = model.generate
+    def generate_and_mark(*args, **kwargs):
+        state["path"] = "llm"
+        return generate(*args, **kwargs)
+    model.generate = generate_and_mark
+
+    return state
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def latency_summary(seconds):
+    """Count and p50/p95/p99 in milliseconds"""
+    if not seconds:
+        return {"count": 0}
+    samples = sorted(value * 1000 for value in seconds)
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "mean_ms": sum(samples) / len(samples),
+    }
+
+def current_commit():
+    """Short hash of HEAD, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args):
+    """Replay the corpus through generate_thani_response and collect per-path latencies"""
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    if args.model == "stub":
+        tokenizer, model = StubTokenizer(), StubModel(prefill_ms=args.stub_prefill_ms, token_ms=args.stub_token_ms)
+        app.install_model(tokenizer, model)
+    else:
+        # Load and warm in the foreground, keeping the prefix cache the app would use
+        app.CONTINUOUS_BATCHING_ENABLED = False
+        app._load_and_warm()
+        tokenizer, model = app.get_ready_model()
+        if not (tokenizer and model):
+            print("❌ Model could not be loaded")
+            return None
+
+    questions = real_questions() + synthetic_questions(args.synthetic, random.Random(args.seed))
+    state = record_paths(model)
+    latencies = {path: [] for path in PATHS}
+
+    started = time.perf_counter()
+    for question in questions:
+        state["path"] = None
+        request_started = time.perf_counter()
+        app.generate_thani_response(question, [])
+        latencies[state["path"] or "fallback"].append(time.perf_counter() - request_started)
+    total_seconds = time.perf_counter() - started
+
+    all_latencies = [value for samples in latencies.values() for value in samples]
+    results = {
+        "commit": current_commit(),
+        "model": args.model,
+        "seed": args.seed,
+        "requests": len(questions),
+        "corpus_questions": len(real_questions()),
+        "synthetic_questions": args.synthetic,
+        "total_s": total_seconds,
+        "throughput_rps": len(questions) / total_seconds,
+        "fast_path_hit_rate": len(latencies["pattern"]) / len(questions),
+        "latency": latency_summary(all_latencies),
+        "paths": {path: latency_summary(samples) for path, samples in latencies.items()},
+        "stopping": app._stop_stats.stats() if app._stop_stats is not None else None,
+    }
+
+    print("\n⚡ Offline Benchmark")
+    print(f"model={args.model}, seed={args.seed}, requests={len(questions)}, commit={results['commit']}")
+    print("=" * 70)
+    print(f"{'path':>9} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    print("-" * 70)
+    for path, summary in [*results["paths"].items(), ("all", results["latency"])]:
+        if summary["count"]:
+            print(f"{path:>9} {summary['count']:>7} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+                  f"{summary['p99_ms']:>9.2f} {summary['mean_ms']:>9.2f}")
+    print("-" * 70)
+    print(f"Throughput: {results['throughput_rps']:.1f} req/s, fast-path hit rate: {results['fast_path_hit_rate']:.1%}")
+    print("=" * 70)
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"📄 Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the question corpus through app.py without the network")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--synthetic", type=int, default=1000, help="synthetic questions added to the corpus")
+    parser.add_argument("--stub-prefill-ms", type=float, default=20.0)
+    parser.add_argument("--stub-token-ms", type=float, default=1.0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    run_benchmark(parser.parse_args())
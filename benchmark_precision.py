@@ -0,0 +1,113 @@
+"""
+Precision Mode Benchmark
+Loads the model once per THANI_PRECISION mode in a fresh process and reports
+resident memory, load time, prefill latency, decode tokens/sec and a quality
+spot-check on the advanced_test.py question set
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from quantization import PRECISION_MODES
+
+DECODE_TOKENS = 64
+
+def current_rss_mb():
+    """Resident set size of this process right now"""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def measure_mode(precision):
+    """Child process body: load with one precision and collect every metric"""
+    import torch
+    import app
+    from advanced_test import TEST_CASES, analyze_response
+
+    app.PRECISION = precision
+    app.PREFIX_CACHE_ENABLED = False
+    app.CONTINUOUS_BATCHING_ENABLED = False
+
+    started = time.perf_counter()
+    tokenizer, model = app.load_model()
+    load_seconds = time.perf_counter() - started
+    if not (tokenizer and model):
+        return {"precision": precision, "error": "model could not be loaded"}
+
+    inputs = app.build_llm_inputs(tokenizer, "Explain black holes", [])
+    with torch.no_grad():
+        started = time.perf_counter()
+        model(**inputs)
+        prefill_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        model.generate(
+            **inputs,
+            max_new_tokens=DECODE_TOKENS,
+            min_new_tokens=DECODE_TOKENS,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id
+        )
+        generate_seconds = time.perf_counter() - started
+
+    # Greedy LLM answers (no fast path) so every mode is judged on the same footing
+    questions = [question for case in TEST_CASES for question in case["questions"]]
+    good = 0
+    for question in questions:
+        inputs = app.build_llm_inputs(tokenizer, question, [])
+        with torch.no_grad():
+            outputs = model.generate(**inputs, max_new_tokens=80, do_sample=False, pad_token_id=tokenizer.eos_token_id)
+        response = tokenizer.decode(outputs[0][inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+        response = app.finalize_llm_response(response.strip()) or ""
+        found_malayalam, is_generic, has_facts = analyze_response(response)
+        if found_malayalam and has_facts and not is_generic:
+            good += 1
+
+    return {
+        "precision": precision,
+        "rss_mb": current_rss_mb(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "load_s": load_seconds,
+        "prefill_ms": prefill_seconds * 1000,
+        "decode_tok_s": DECODE_TOKENS / max(generate_seconds - prefill_seconds, 1e-6),
+        "quality": f"{good}/{len(questions)}",
+    }
+
+def run_benchmark(modes):
+    """Run every mode in its own process so memory numbers don't leak between them"""
+    print("\n⚡ Precision Mode Benchmark")
+    print("=" * 90)
+    print(f"{'mode':>6} {'RSS MB':>8} {'peak MB':>8} {'load s':>7} {'prefill ms':>11} {'decode tok/s':>13} {'quality':>8}")
+    print("-" * 90)
+
+    for precision in modes:
+        child = subprocess.run(
+            [sys.executable, __file__, "--mode", precision],
+            capture_output=True,
+            text=True
+        )
+        lines = child.stdout.strip().splitlines()
+        try:
+            result = json.loads(lines[-1])
+        except (IndexError, json.JSONDecodeError):
+            result = {"error": (child.stderr.strip().splitlines() or ["no output"])[-1]}
+
+        if "error" in result:
+            print(f"{precision:>6}   ❌ {result['error']}")
+            continue
+
+        print(f"{precision:>6} {result['rss_mb']:>8.0f} {result['peak_rss_mb']:>8.0f} {result['load_s']:>7.1f} "
+              f"{result['prefill_ms']:>11.1f} {result['decode_tok_s']:>13.1f} {result['quality']:>8}")
+
+    print("=" * 90)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--mode":
+        print(json.dumps(measure_mode(sys.argv[2])))
+    else:
+        run_benchmark(sys.argv[1:] or PRECISION_MODES)
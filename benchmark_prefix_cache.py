@@ -0,0 +1,71 @@
+"""
+System Prompt Prefix Cache Benchmark
+Measures time-to-first-token with and without the precomputed KV cache
+"""
+
+import statistics
+import time
+
+import torch
+
+import app
+
+QUESTIONS = [
+    "Who won the Cricket World Cup?",
+    "What is quantum computing?",
+    "Ente laptop slow aanu, enthu cheyyum?",
+    "Explain black holes",
+    "Best movie of Mohanlal aarade?",
+]
+RUNS_PER_QUESTION = 3
+
+def time_to_first_token(tokenizer, model, inputs):
+    """Prefill + first sampled token, the latency the user actually waits for"""
+    started = time.perf_counter()
+    with torch.no_grad():
+        model.generate(
+            **inputs,
+            max_new_tokens=1,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id
+        )
+    return time.perf_counter() - started
+
+def build_suffix(message):
+    """Same per-request turn the app appends after the system prompt"""
+    return f"<|start_header_id|>user<|end_header_id|>\n{message}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n"
+
+def run_benchmark():
+    """Compare TTFT for a full prefill against the cached prefix"""
+    app.PREFIX_CACHE_ENABLED = True
+    tokenizer, model = app.load_model()
+    if not (tokenizer and model):
+        print("❌ Model could not be loaded")
+        return
+    cache = app._prefix_cache
+
+    print("\n⚡ Prefix Cache Benchmark")
+    print(f"System prompt prefix: {len(cache)} tokens, threads: {torch.get_num_threads()}")
+    print("=" * 60)
+
+    uncached, cached = [], []
+    for question in QUESTIONS:
+        suffix = build_suffix(question)
+        for _ in range(RUNS_PER_QUESTION):
+            full_inputs = tokenizer(app.THANI_PROMPT_PREFIX + suffix, return_tensors="pt", add_special_tokens=False)
+            uncached.append(time_to_first_token(tokenizer, model, full_inputs))
+
+            started = time.perf_counter()
+            cached_inputs = cache.build_inputs(tokenizer, suffix)
+            copy_time = time.perf_counter() - started
+            cached.append(copy_time + time_to_first_token(tokenizer, model, cached_inputs))
+
+    for label, samples in [("full prefill", uncached), ("prefix cache", cached)]:
+        print(f"{label:>14}: mean {statistics.mean(samples) * 1000:8.1f} ms   "
+              f"median {statistics.median(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+    print("-" * 60)
+    print(f"TTFT speedup: {statistics.mean(uncached) / statistics.mean(cached):.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
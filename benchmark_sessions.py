@@ -0,0 +1,92 @@
+"""
+Session Payload Benchmark
+Plays a 200-turn conversation through the old chat function (the whole
+chatbot history goes in and comes back every turn) and through the
+server-side session store, with the stub model. Bytes are the JSON Gradio 4
+puts on the wire for one request: the inputs, the first streamed output in
+full and each later output as a diff against the previous one. gr.State is
+sent as null both ways.
+"""
+
+import json
+import random
+import time
+
+from gradio.utils import diff
+
+import app
+from benchmark_offline import synthetic_questions
+from stub_model import StubModel, StubTokenizer
+
+TURNS = 200
+REPORT_TURNS = [1, 10, 50, 100, 200]
+
+def old_chat(message, history):
+    """The previous chat function: Gradio's chatbot value is the conversation state"""
+    if not app.STREAMING_ENABLED:
+        history.append([message, app.generate_thani_response(message, history)])
+        yield history, ""
+        return
+    history.append([message, ""])
+    for partial in app.stream_thani_response(message, history[:-1]):
+        history[-1][1] = partial
+        yield history, ""
+
+def json_bytes(value):
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+def request_bytes(inputs, outputs):
+    """(bytes sent by the browser, bytes streamed back, seconds spent encoding) for one event"""
+    sent = json_bytes(inputs)
+    received = 0
+    encode_seconds = 0.0
+    previous = None
+    for output in outputs:
+        # Copy like Gradio's postprocess does, since the chat functions mutate their lists
+        output = json.loads(json.dumps(output))
+        started = time.perf_counter()
+        received += json_bytes(output if previous is None else [diff(old, new) for old, new in zip(previous, output)])
+        encode_seconds += time.perf_counter() - started
+        previous = output
+    return sent, received, encode_seconds
+
+def run_benchmark():
+    """Print per-request payloads at several points of a long session, before and after"""
+    app.install_model(StubTokenizer(), StubModel(prefill_ms=0, token_ms=0))
+    # Both runs must produce the same replies, so nothing may be remembered between them
+    app._response_cache = None
+    app._similarity_index = None
+    questions = synthetic_questions(TURNS, random.Random(42))
+
+    history = []
+    session_id = None
+    before, after = {}, {}
+    for turn, question in enumerate(questions, start=1):
+        random.seed(turn)
+        before[turn] = request_bytes([question, history], old_chat(question, history))
+        random.seed(turn)
+        outputs = list(app.chat_with_thani(question, session_id))
+        session_id = outputs[-1][2]
+        after[turn] = request_bytes([question, None], [(window, text, None) for window, text, _ in outputs])
+
+    print("\n⚡ Session Payload Benchmark")
+    print(f"{TURNS} turns, streaming={'on' if app.STREAMING_ENABLED else 'off'}, "
+          f"chatbot window={app.SESSION_DISPLAY_TURNS} exchanges")
+    print("=" * 86)
+    print(f"{'turn':>5} {'before in':>10} {'before out':>11} {'before enc ms':>14} "
+          f"{'after in':>9} {'after out':>10} {'after enc ms':>13}")
+    print("-" * 86)
+    for turn in REPORT_TURNS:
+        (sent_b, received_b, enc_b), (sent_a, received_a, enc_a) = before[turn], after[turn]
+        print(f"{turn:>5} {sent_b:>10} {received_b:>11} {enc_b * 1000:>14.2f} "
+              f"{sent_a:>9} {received_a:>10} {enc_a * 1000:>13.2f}")
+    print("-" * 86)
+    total_before = sum(sent + received for sent, received, _ in before.values())
+    total_after = sum(sent + received for sent, received, _ in after.values())
+    print(f"Whole session: {total_before / 1024:.0f} KiB before, {total_after / 1024:.0f} KiB after "
+          f"({total_before / total_after:.1f}x less)")
+    print(f"Server-side store: {app._sessions.stats()}")
+    print("=" * 86)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,127 @@
+"""
+Similarity Index Benchmark
+Builds the near-duplicate question index at 10k and 100k synthetic questions
+and reports build time, query latency and how often misspelled repeats find
+their original while questions about a different subject stay unmatched.
+Then checks a fixed set of questions that look like a stored one but mean
+something else (another year, an extra word, a negation, swapped words),
+which must never borrow its answer.
+"""
+
+import random
+import string
+import time
+
+from similarity_index import SimilarityIndex
+
+INDEX_SIZES = [10000, 100000]
+QUERIES_PER_RUN = 2000
+
+TEMPLATES = [
+    "who is the chief minister of {}",
+    "what is the capital of {}",
+    "{} president aarade",
+    "explain {} to me",
+    "how many people live in {}",
+    "when did {} become independent",
+    "best movie of {} aarade",
+    "what is {} famous for",
+]
+
+# (stored question, lookalike query that asks something else)
+CHANGED_MEANING = [
+    ("who won ipl 2023", "who won ipl 2024"),
+    ("who is the president of india", "who is the vice president of india"),
+    ("who is the chief minister of kerala", "who is not the chief minister of kerala"),
+    ("who is not the chief minister of kerala", "who is the chief minister of kerala"),
+    ("is python better than java", "is java better than python"),
+    ("who is the president of india", "who was the president of india in 1990"),
+    ("what happened in 1999", "what happened in 19"),
+]
+
+def random_word(rng):
+    """Build a pseudo subject name out of lowercase letters"""
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+
+def misspell(text, rng):
+    """Swap two neighbouring letters inside one longer word, like "cheif" for "chief" """
+    words = text.split()
+    candidates = [index for index, word in enumerate(words) if len(word) > 4]
+    index = rng.choice(candidates)
+    word = words[index]
+    position = rng.randint(1, len(word) - 3)
+    words[index] = word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return " ".join(words)
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def run_benchmark():
+    """Print build time, p50/p99 query latency and match quality at each index size"""
+    rng = random.Random(42)
+
+    print("\n⚡ Similarity Index Benchmark")
+    print("=" * 88)
+    print(f"{'entries':>8} {'build s':>8} {'p50 µs':>8} {'p99 µs':>8} {'typo hits':>10} {'wrong hits':>11} {'other subject hits':>19}")
+    print("-" * 88)
+
+    for size in INDEX_SIZES:
+        questions = []
+        seen = set()
+        while len(questions) < size:
+            question = rng.choice(TEMPLATES).format(random_word(rng))
+            if question not in seen:
+                seen.add(question)
+                questions.append(question)
+
+        index = SimilarityIndex()
+        started = time.perf_counter()
+        for number, question in enumerate(questions):
+            index.add(question, number)
+        build_seconds = time.perf_counter() - started
+
+        # Half the queries are misspelled repeats, half ask the same template about an unseen subject
+        queries = []
+        for _ in range(QUERIES_PER_RUN // 2):
+            number = rng.randrange(size)
+            queries.append((misspell(questions[number], rng), number))
+            queries.append((rng.choice(TEMPLATES).format(random_word(rng)), None))
+
+        latencies = []
+        typo_hits = wrong_hits = other_hits = 0
+        for query, expected in queries:
+            started = time.perf_counter()
+            found = index.search(query)
+            latencies.append((time.perf_counter() - started) * 1e6)
+            if found is None:
+                continue
+            if expected is None:
+                other_hits += 1
+            elif found[2] == expected:
+                typo_hits += 1
+            else:
+                wrong_hits += 1
+
+        latencies.sort()
+        half = len(queries) // 2
+        print(f"{size:>8} {build_seconds:>8.2f} {percentile(latencies, 0.5):>8.0f} {percentile(latencies, 0.99):>8.0f} "
+              f"{typo_hits / half:>9.1%} {wrong_hits / half:>10.1%} {other_hits / half:>18.1%}")
+
+    print("=" * 88)
+
+    print(f"{'query':<42} {'stored question':<39} {'result':>5}")
+    print("-" * 88)
+    wrong = 0
+    for stored, query in CHANGED_MEANING:
+        # One index per pair, so a query never finds itself stored for another pair
+        index = SimilarityIndex()
+        index.add(stored, stored)
+        found = index.search(query)
+        wrong += found is not None
+        print(f"{query:<42} {stored:<39} {'❌ hit' if found else 'miss':>5}")
+    print(f"Lookalike questions answered from another question: {wrong}/{len(CHANGED_MEANING)}")
+    print("=" * 88)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,70 @@
+"""
+Speculative Decoding Benchmark
+Compares plain model.generate against prompt-lookup speculative decoding on
+the same prompts, with greedy decoding and with the app's sampler settings,
+and reports decode tokens/sec plus how many drafted tokens were accepted
+"""
+
+import time
+
+import torch
+
+import app
+from speculative import PromptLookupDecoder
+
+DRAFT_LENGTHS = [4, 8]
+MAX_NEW_TOKENS = 96
+
+QUESTIONS = [
+    "Explain black holes",
+    "Why is the sky blue?",
+    "What is quantum computing?",
+    "Ente laptop slow aanu, enthu cheyyum?",
+    "Best movie of Mohanlal aarade?",
+    "Who won the Cricket World Cup?",
+]
+
+def decode_rate(generate, tokenizer, kwargs):
+    """Generated tokens per second over every question"""
+    tokens = 0
+    started = time.perf_counter()
+    for question in QUESTIONS:
+        inputs = app.build_llm_inputs(tokenizer, question, [])
+        with torch.no_grad():
+            outputs = generate(**inputs, **kwargs)
+        tokens += outputs.shape[1] - inputs["input_ids"].shape[1]
+    return tokens / (time.perf_counter() - started)
+
+def run_benchmark():
+    """Print tokens/sec and acceptance for each sampler setting and draft length"""
+    app.CONTINUOUS_BATCHING_ENABLED = False
+    tokenizer, model = app.load_model()
+    if not (tokenizer and model):
+        print("❌ Model could not be loaded")
+        return
+
+    sampled = app.generation_kwargs(tokenizer)
+    sampled["max_new_tokens"] = MAX_NEW_TOKENS
+    greedy = dict(sampled, do_sample=False)
+
+    print("\n⚡ Speculative Decoding Benchmark")
+    print(f"{len(QUESTIONS)} questions, max_new_tokens={MAX_NEW_TOKENS}, threads: {torch.get_num_threads()}")
+    print("=" * 84)
+    print(f"{'sampler':>8} {'draft':>6} {'generate tok/s':>15} {'speculative tok/s':>18} {'accepted':>9} {'tok/pass':>9} {'speedup':>8}")
+    print("-" * 84)
+
+    for name, kwargs in [("greedy", greedy), ("sampled", sampled)]:
+        torch.manual_seed(0)
+        baseline = decode_rate(model.generate, tokenizer, kwargs)
+        for draft_length in DRAFT_LENGTHS:
+            decoder = PromptLookupDecoder(model, draft_length=draft_length)
+            torch.manual_seed(0)
+            rate = decode_rate(decoder.generate, tokenizer, kwargs)
+            stats = decoder.stats()
+            print(f"{name:>8} {draft_length:>6} {baseline:>15.1f} {rate:>18.1f} {stats['acceptance_rate']:>8.1%} "
+                  f"{stats['tokens_per_forward']:>9.2f} {rate / baseline:>7.2f}x")
+
+    print("=" * 84)
+
+if __name__ == "__main__":
+    run_benchmark()
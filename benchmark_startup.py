@@ -0,0 +1,82 @@
+"""
+Startup Benchmark
+Starts a fresh Python process per mode and times import app -> first answer:
+
+    pattern-only  THANI_PATTERN_ONLY=1, torch and transformers are never imported
+    lazy          default mode, the model stack is imported on the first LLM request
+                  (served by the stub model, so no weights are downloaded)
+    eager         torch and transformers imported up front, like app.py used to
+
+Peak RSS is the process high-water mark after the last step.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+RUNS = 3
+
+CHILD = r"""
+import json, os, resource, sys, time
+started = time.perf_counter()
+if os.environ.get("EAGER") == "1":
+    import torch, transformers
+import app
+imported = time.perf_counter()
+app.generate_thani_response("kerala chief minister aarade?", [])
+pattern = time.perf_counter()
+if not app.PATTERN_ONLY:
+    from stub_model import StubModel, StubTokenizer
+    app.install_model(StubTokenizer(), StubModel(prefill_ms=0, token_ms=0))
+app.generate_thani_response("why is the monsoon so boring?", [])
+other = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "first_pattern_ms": (pattern - imported) * 1000,
+    "first_other_ms": (other - pattern) * 1000,
+    "total_s": other - started,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "torch_loaded": "torch" in sys.modules,
+}))
+"""
+
+MODES = [
+    ("pattern-only", {"THANI_PATTERN_ONLY": "1"}, "fallback"),
+    ("lazy", {}, "stub LLM"),
+    ("eager", {"EAGER": "1"}, "stub LLM"),
+]
+
+def run_child(extra_env):
+    """One cold start in a fresh interpreter; returns its timings"""
+    env = dict(os.environ)
+    env.pop("THANI_PATTERN_ONLY", None)
+    env.pop("EAGER", None)
+    env.update(extra_env)
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark():
+    """Print the best of RUNS cold starts for each mode"""
+    print("\n⚡ Startup Benchmark")
+    print(f"best of {RUNS} cold starts per mode")
+    print("=" * 92)
+    print(f"{'mode':>13} {'import s':>9} {'1st pattern ms':>15} {'1st other ms':>13} {'other via':>10} "
+          f"{'total s':>8} {'RSS MB':>7} {'torch':>6}")
+    print("-" * 92)
+    for name, extra_env, other_via in MODES:
+        try:
+            runs = [run_child(extra_env) for _ in range(RUNS)]
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {name} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        best = min(runs, key=lambda run: run["total_s"])
+        print(f"{name:>13} {best['import_s']:>9.2f} {best['first_pattern_ms']:>15.2f} {best['first_other_ms']:>13.1f} "
+              f"{other_via:>10} {best['total_s']:>8.2f} {best['rss_mb']:>7.0f} {str(best['torch_loaded']):>6}")
+    print("=" * 92)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,164 @@
+"""
+Worker Process Benchmark
+Compares generating inside the server process (with the batching scheduler)
+against 1, 2 and 4 forked workers sharing the weights copy-on-write. Each
+configuration runs in a fresh process. Concurrent clients send LLM-path
+requests, and the run reports throughput, latency and memory summed over
+the server and its workers. RSS counts shared pages once per process. PSS
+splits them between the processes sharing them, so it is the real total.
+
+A randomly initialized Llama (no download) and the stub byte tokenizer stand
+in for Llama-3.2-1B. The system prompt is shortened so the per-config
+prefill stays short on small machines. Scaling needs free cores: on a box
+with fewer cores than workers, expect flat throughput and look at memory.
+
+    python benchmark_workers.py --hidden 1024 --layers 8 --requests 16
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+CONFIGS = [0, 1, 2, 4]
+
+def memory_mb(pids):
+    """Summed Rss / Pss / Private MB of the given processes from smaps_rollup"""
+    totals = {"rss": 0, "pss": 0, "private": 0}
+    fields = {"Rss:": "rss", "Pss:": "pss", "Private_Clean:": "private", "Private_Dirty:": "private"}
+    for pid in pids:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    totals[fields[parts[0]]] += int(parts[1]) / 1024
+    return totals
+
+def run_child(args):
+    """One configuration: build the model, start the workers, drive concurrent requests"""
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    import app
+    from prefix_cache import PrefixCache
+    from scheduler import InferenceScheduler
+    from stub_model import StubTokenizer
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=320,
+        hidden_size=args.hidden,
+        intermediate_size=args.hidden * 4,
+        num_hidden_layers=args.layers,
+        num_attention_heads=args.hidden // 64,
+        num_key_value_heads=args.hidden // 64,
+        max_position_embeddings=4096,
+        bos_token_id=0,
+        eos_token_id=StubTokenizer.eos_token_id,
+    )
+    model = LlamaForCausalLM(config).eval()
+    weights_mb = sum(parameter.numel() * parameter.element_size() for parameter in model.parameters()) / 2 ** 20
+
+    tokenizer = StubTokenizer()
+    app.THANI_PROMPT_PREFIX = app.THANI_PROMPT_PREFIX[:args.prompt_chars]
+    generation_kwargs = app.generation_kwargs
+    app.generation_kwargs = lambda tokenizer: {**generation_kwargs(tokenizer), "max_new_tokens": args.new_tokens}
+    app._response_cache = None
+    app._similarity_index = None
+    app.install_model(tokenizer, model)
+    app._prefix_cache = PrefixCache(tokenizer, model, app.THANI_PROMPT_PREFIX)
+
+    started = time.perf_counter()
+    if args.workers:
+        app.start_workers()
+        app._workers.wait_ready()
+        pids = [os.getpid()] + app._workers.pids()
+    else:
+        torch.set_num_threads(os.cpu_count() or 1)
+        app._scheduler = InferenceScheduler(model, max_batch_size=app.MAX_BATCH_SIZE)
+        app.warm_model(tokenizer, model)
+        pids = [os.getpid()]
+    startup_s = time.perf_counter() - started
+
+    latencies = []
+    lock = threading.Lock()
+    clients = max(4, 2 * args.workers)
+
+    def client(index):
+        for number in range(index, args.requests, clients):
+            request_started = time.perf_counter()
+            app.generate_thani_response(f"why is request {number} so slow, explain it to me?", [])
+            with lock:
+                latencies.append(time.perf_counter() - request_started)
+
+    tokens_before = app._stop_stats.stats()["generated_tokens"] if app._stop_stats else 0
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    tokens = app._stop_stats.stats()["generated_tokens"] - tokens_before
+
+    latencies.sort()
+    result = {
+        "workers": args.workers,
+        "threads_per_worker": app.WORKER_THREADS if args.workers else torch.get_num_threads(),
+        "startup_s": startup_s,
+        "requests_per_s": len(latencies) / seconds,
+        "tokens_per_s": tokens / seconds,
+        "p50_s": latencies[len(latencies) // 2],
+        "weights_mb": weights_mb,
+        "memory_mb": memory_mb(pids),
+        "processes": len(pids),
+    }
+    if app._workers is not None:
+        app._workers.close()
+    print(json.dumps(result), flush=True)
+    # Skip interpreter teardown: the scheduler's daemon thread can abort it mid-forward
+    os._exit(0)
+
+def run_benchmark(args):
+    """Run every configuration in its own process and print one row each"""
+    print("\n⚡ Worker Process Benchmark")
+    print(f"cpus={os.cpu_count()}, hidden={args.hidden}, layers={args.layers}, "
+          f"requests={args.requests}, new tokens={args.new_tokens}")
+    print("=" * 96)
+    print(f"{'workers':>8} {'threads':>8} {'req/s':>7} {'tok/s':>7} {'p50 s':>7} "
+          f"{'weights MB':>11} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>11} {'startup s':>10}")
+    print("-" * 96)
+    for workers in CONFIGS:
+        env = dict(os.environ, THANI_WORKERS=str(workers))
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--workers", str(workers),
+                   "--hidden", str(args.hidden), "--layers", str(args.layers), "--requests", str(args.requests),
+                   "--new-tokens", str(args.new_tokens), "--prompt-chars", str(args.prompt_chars)]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"❌ {workers} workers failed: {completed.stderr.strip().splitlines()[-1:]}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        memory = result["memory_mb"]
+        label = str(workers) if workers else "in-proc"
+        print(f"{label:>8} {result['threads_per_worker']:>8} {result['requests_per_s']:>7.2f} "
+              f"{result['tokens_per_s']:>7.1f} {result['p50_s']:>7.2f} {result['weights_mb']:>11.0f} "
+              f"{memory['rss']:>8.0f} {memory['pss']:>8.0f} {memory['private']:>11.0f} {result['startup_s']:>10.1f}")
+    print("=" * 96)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and memory of forked inference workers")
+    parser.add_argument("--hidden", type=int, default=1024)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--prompt-chars", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.child:
+        run_child(arguments)
+    else:
+        run_benchmark(arguments)
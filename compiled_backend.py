@@ -0,0 +1,91 @@
+"""
+Compiled CPU generation backend: a torch.compile'd decode step with an on-disk kernel cache.
+
+Eager PyTorch launches one kernel per operator for every generated token.
+At batch size one most of those are small elementwise ops around the
+matmuls: RMSNorm, rotary embeddings, SiLU gating and residual adds.
+Inductor fuses them into a few generated C++ loops. The compiled step
+replaces model.forward, so generate(), the batching scheduler, the prefix
+cache and speculative decoding all keep calling the model as before:
+
+    single-token calls  (decode)   -> compiled graph, dynamic batch and cache length
+    everything else     (prefill)  -> eager; big matmuls gain little from fusion,
+                                      and variable prompt lengths would recompile
+
+The first compile traces the model and builds C++ kernels, which takes
+tens of seconds on a CPU. It happens during the warmup generation, before
+the model reports ready. The kernels and the compiled graphs are stored in
+the inductor cache directory. That directory is pointed at cache_dir, so
+later startups, and every forked worker, load them instead of rebuilding
+them. Only the Python-side tracing is paid again.
+"""
+import functools
+import os
+import threading
+import time
+
+COMPILE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compile_cache")
+
+
+def use_compile_cache(cache_dir):
+    """Keep inductor's compiled artifacts in cache_dir; True when it already holds some"""
+    os.makedirs(cache_dir, exist_ok=True)
+    warm = any(os.scandir(cache_dir))
+    # Read whenever inductor looks for the cache, so this works after torch is imported
+    os.environ["TORCHINDUCTOR_CACHE_DIR"] = os.path.abspath(cache_dir)
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+    os.environ.setdefault("TORCHINDUCTOR_AUTOGRAD_CACHE", "1")
+    return warm
+
+
+class CompiledDecodeStep:
+    """Drop-in for model.forward: single-token steps run compiled, prefills run eager"""
+
+    def __init__(self, forward, cache_dir=None):
+        import torch
+        # generate() inspects forward's signature, e.g. to only compute the last position's logits
+        functools.update_wrapper(self, forward)
+        self.eager_forward = forward
+        self.compiled_forward = torch.compile(forward, dynamic=True)
+        self.cache_dir = cache_dir
+        self.cache_warm = use_compile_cache(cache_dir) if cache_dir else None
+        self.compile_seconds = None
+        self._lock = threading.Lock()
+        self.compiled_calls = 0
+        self.eager_calls = 0
+
+    def __call__(self, *args, **kwargs):
+        input_ids = kwargs.get("input_ids")
+        if input_ids is None or input_ids.shape[-1] != 1:
+            with self._lock:
+                self.eager_calls += 1
+            return self.eager_forward(*args, **kwargs)
+
+        with self._lock:
+            self.compiled_calls += 1
+            first = self.compile_seconds is None
+        if not first:
+            return self.compiled_forward(*args, **kwargs)
+        # The first call compiles (or loads the cached kernels); time it for the stats
+        started = time.perf_counter()
+        outputs = self.compiled_forward(*args, **kwargs)
+        self.compile_seconds = time.perf_counter() - started
+        return outputs
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            return {
+                "backend": "compiled",
+                "cache_dir": self.cache_dir,
+                "cache_warm_at_start": self.cache_warm,
+                "first_compile_seconds": self.compile_seconds,
+                "compiled_calls": self.compiled_calls,
+                "eager_calls": self.eager_calls,
+            }
+
+
+def compile_model(model, cache_dir=None):
+    """Route model's decode steps through torch.compile; the model is changed in place and returned"""
+    model.forward = CompiledDecodeStep(model.forward, cache_dir)
+    return model
@@ -0,0 +1,351 @@
+"""
+CPU inference auto-tuner.
+
+The fastest way to run the model on a CPU depends on the host. That covers
+how many intra-op threads the matmuls get, whether inter-op threads help,
+whether SDPA beats the eager attention kernels, and whether torch.compile
+pays off. The defaults are a guess: torch takes every physical core, which
+loses to fewer threads on busy or hyper-threaded machines.
+
+    python cpu_tuning.py [--attention] [--compile]
+
+measures the candidates and writes the winner to a profile file. The app
+applies that profile when it loads the model. Every candidate runs in a
+fresh process that loads the model through app.load_model(), so it is
+measured exactly the way the server would run it. Thread counts are set
+before torch is first used, and inter-op threads can only be set once per
+process, so a fresh process is needed anyway.
+
+The search is coordinate descent from torch's defaults. It tries every
+value of one setting with the others fixed at the best so far, keeps the
+winner when it beats the best by more than MIN_GAIN, and moves on to the
+next setting. Each candidate prefills a fixed
+prompt set and then decodes a fixed number of tokens. It is scored by the
+seconds one typical reply would take:
+
+    question tokens / prefill tok/s + REPLY_TOKENS / decode tok/s
+
+With the prefix cache on, only the question needs a prefill per request,
+so decode speed dominates the score.
+
+A profile is tied to the host it was tuned on. When the CPU model or the
+number of usable cores differs, the app ignores the profile and runs on
+the defaults.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from compiled_backend import compile_model
+
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuning_profile.json")
+PROFILE_VERSION = 1
+
+# Reply length the score assumes, in tokens
+REPLY_TOKENS = 100
+
+# A candidate must cut the reply time by this fraction to replace the best so far, so noise
+# between identical runs does not pick settings
+MIN_GAIN = 0.03
+
+# Fixed questions every candidate prefills
+TUNING_PROMPTS = [
+    "Kerala chief minister aarade?",
+    "Explain photosynthesis in two sentences, chetta.",
+    "Why is the monsoon late this year?",
+]
+
+# Environment variables the thread libraries read when torch is imported
+THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def host_info():
+    """Usable cores, physical cores and CPU model of this machine"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    cores = set()
+    model_name = "unknown"
+    physical_id = None
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                key, _, value = line.partition(":")
+                key, value = key.strip(), value.strip()
+                if key == "model name":
+                    model_name = value
+                elif key == "physical id":
+                    physical_id = value
+                elif key == "core id":
+                    cores.add((physical_id, value))
+    except OSError:
+        pass
+    return {"cpus": cpus, "physical_cores": min(len(cores) or cpus, cpus), "cpu_model": model_name}
+
+
+def load_profile(path=PROFILE_PATH):
+    """Tuned settings from the profile at path, or {} when it is missing, invalid or from another host"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as profile_file:
+            profile = json.load(profile_file)
+        settings = profile["settings"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring tuning profile {path}: {e}")
+        return {}
+    host = host_info()
+    tuned_on = profile.get("host", {})
+    if (tuned_on.get("cpus"), tuned_on.get("cpu_model")) != (host["cpus"], host["cpu_model"]):
+        print(f"Ignoring tuning profile {path}: tuned on {tuned_on.get('cpus')} x {tuned_on.get('cpu_model')}, "
+              f"this host has {host['cpus']} x {host['cpu_model']}; run python cpu_tuning.py again")
+        return {}
+    return settings
+
+
+def apply_thread_settings(settings):
+    """Set the thread counts in settings; call before torch runs its first operator"""
+    intra = settings.get("intra_op_threads")
+    inter = settings.get("inter_op_threads")
+    if intra and "torch" not in sys.modules:
+        # Only read at import, so an explicit environment still wins
+        for name in THREAD_ENV:
+            os.environ.setdefault(name, str(intra))
+    import torch
+    if intra:
+        torch.set_num_threads(intra)
+    if inter:
+        try:
+            torch.set_num_interop_threads(inter)
+        except RuntimeError:
+            # Fixed once inter-op work has started, e.g. when load_model() runs a second time
+            pass
+
+
+def describe(settings):
+    """Short label for a settings dict in the comparison table"""
+    if not settings:
+        return "torch defaults"
+    labels = {
+        "intra_op_threads": lambda value: f"threads={value}",
+        "inter_op_threads": lambda value: f"interop={value}",
+        "attention": lambda value: value,
+        "compile": lambda value: "compiled" if value else "not compiled",
+    }
+    return " ".join(labels[key](value) for key, value in settings.items())
+
+
+def measure(tokenizer, model, prompt_tokens=0, decode_tokens=32, repeats=3):
+    """Prefill and decode throughput of model over TUNING_PROMPTS, best of repeats passes after a warmup"""
+    import torch
+    import app
+
+    builder = app.prompt_builder(tokenizer)
+    prompts = []
+    question_tokens = 0
+    for question in TUNING_PROMPTS:
+        suffix_ids, _ = builder.build(question, [])
+        ids = builder.system_ids + suffix_ids
+        prompts.append(ids[-prompt_tokens:] if prompt_tokens else ids)
+        question_tokens += len(suffix_ids)
+
+    def one_pass(decode_steps):
+        prefill_seconds = decode_seconds = 0.0
+        with torch.no_grad():
+            for ids in prompts:
+                started = time.perf_counter()
+                outputs = model(input_ids=torch.tensor([ids]), use_cache=True)
+                prefill_seconds += time.perf_counter() - started
+                past = outputs.past_key_values
+                next_token = outputs.logits[:, -1:].argmax(-1)
+                started = time.perf_counter()
+                for _ in range(decode_steps):
+                    outputs = model(input_ids=next_token, past_key_values=past, use_cache=True)
+                    past = outputs.past_key_values
+                    next_token = outputs.logits[:, -1:].argmax(-1)
+                decode_seconds += time.perf_counter() - started
+        return prefill_seconds, decode_seconds
+
+    # The warmup pass pays for lazy initialization and, with torch.compile, for compiling
+    started = time.perf_counter()
+    one_pass(2)
+    warmup_seconds = time.perf_counter() - started
+    passes = [one_pass(decode_tokens) for _ in range(max(repeats, 1))]
+    prefill_seconds = min(prefill for prefill, _ in passes)
+    decode_seconds = min(decode for _, decode in passes)
+
+    prefill_tps = sum(len(ids) for ids in prompts) / prefill_seconds
+    decode_tps = len(prompts) * decode_tokens / decode_seconds
+    prefilled = question_tokens / len(prompts) if app.PREFIX_CACHE_ENABLED else sum(map(len, prompts)) / len(prompts)
+    return {
+        "prefill_tokens_per_s": prefill_tps,
+        "decode_tokens_per_s": decode_tps,
+        "reply_seconds": prefilled / prefill_tps + REPLY_TOKENS / decode_tps,
+        "warmup_seconds": warmup_seconds,
+        "threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+    }
+
+
+def random_model(settings, hidden, layers):
+    """Randomly initialized Llama and the stub tokenizer, for trying the tuner without the weights"""
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+    from stub_model import StubTokenizer
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=320,
+        hidden_size=hidden,
+        intermediate_size=hidden * 4,
+        num_hidden_layers=layers,
+        num_attention_heads=hidden // 64,
+        num_key_value_heads=hidden // 64,
+        max_position_embeddings=8192,
+        bos_token_id=0,
+        eos_token_id=StubTokenizer.eos_token_id,
+        attn_implementation=settings.get("attention") or "sdpa",
+    )
+    model = LlamaForCausalLM(config).eval()
+    if settings.get("compile"):
+        model = compile_model(model)
+    return StubTokenizer(), model
+
+
+def run_candidate(args):
+    """Child process: load the model with one candidate's settings and print its measurements"""
+    with open(args.candidate, encoding="utf-8") as candidate_file:
+        settings = json.load(candidate_file)["settings"]
+    started = time.perf_counter()
+    if args.random_model:
+        apply_thread_settings(settings)
+        tokenizer, model = random_model(settings, args.hidden, args.layers)
+    else:
+        import app
+        # THANI_TUNING_PROFILE points at the candidate, so load_model() applies it like a real profile
+        tokenizer, model = app.load_model()
+        if not (tokenizer and model):
+            raise SystemExit("model could not be loaded")
+    load_seconds = time.perf_counter() - started
+    result = measure(tokenizer, model, args.prompt_tokens, args.decode_tokens, args.repeats)
+    result["load_seconds"] = load_seconds
+    print(json.dumps(result), flush=True)
+    # Skip interpreter teardown: the scheduler's daemon thread can abort it mid-forward
+    os._exit(0)
+
+
+def candidate_values(host, args):
+    """Values to try per setting, in search order; None keeps torch's default"""
+    intra = {1, host["physical_cores"], host["cpus"]}
+    count = 2
+    while count < host["cpus"]:
+        intra.add(count)
+        count *= 2
+    values = {
+        "intra_op_threads": sorted(intra),
+        "inter_op_threads": [1, 2] if host["cpus"] > 1 else [1],
+    }
+    if args.attention:
+        values["attention"] = ["sdpa", "eager"]
+    if args.compile:
+        values["compile"] = [False, True]
+    return values
+
+
+def tune(args):
+    """Search the candidates, print the comparison table and write the fastest settings"""
+    host = host_info()
+    measured = []
+    print("\n⚡ CPU Inference Auto-Tuner")
+    print(f"{host['cpus']} usable cores ({host['physical_cores']} physical), {host['cpu_model']}")
+    print(f"model: {'random Llama' if args.random_model else 'load_model()'}, "
+          f"decode tokens={args.decode_tokens}, repeats={args.repeats}")
+    print("=" * 92)
+    print(f"{'settings':<44} {'prefill tok/s':>14} {'decode tok/s':>13} {'reply s':>8} {'speedup':>8}")
+    print("-" * 92)
+
+    def evaluate(settings):
+        for previous in measured:
+            if previous["settings"] == settings:
+                return previous
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as candidate_file:
+            json.dump({"host": host, "settings": settings}, candidate_file)
+        command = [sys.executable, os.path.abspath(__file__), "--candidate", candidate_file.name,
+                   "--decode-tokens", str(args.decode_tokens), "--repeats", str(args.repeats),
+                   "--prompt-tokens", str(args.prompt_tokens)]
+        if args.random_model:
+            command += ["--random-model", "--hidden", str(args.hidden), "--layers", str(args.layers)]
+        env = dict(os.environ, THANI_TUNING_PROFILE=candidate_file.name)
+        for name in THREAD_ENV:
+            env.pop(name, None)
+        try:
+            completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        finally:
+            os.unlink(candidate_file.name)
+        entry = {"settings": settings}
+        if completed.returncode != 0:
+            entry["error"] = (completed.stderr.strip().splitlines() or ["exit code %d" % completed.returncode])[-1]
+            print(f"❌ {describe(settings):<42} {entry['error'][:54]}")
+        else:
+            entry.update(json.loads(completed.stdout.strip().splitlines()[-1]))
+            baseline = measured[0] if measured else entry
+            print(f"{describe(settings):<44} {entry['prefill_tokens_per_s']:>14.1f} "
+                  f"{entry['decode_tokens_per_s']:>13.1f} {entry['reply_seconds']:>8.2f} "
+                  f"{baseline.get('reply_seconds', entry['reply_seconds']) / entry['reply_seconds']:>7.2f}x")
+        measured.append(entry)
+        return entry
+
+    best = evaluate({})
+    if "error" in best:
+        print("=" * 92)
+        print("❌ The model could not be measured with the default settings; no profile written")
+        return None
+    for key, options in candidate_values(host, args).items():
+        for value in options:
+            entry = evaluate({**best["settings"], key: value})
+            if "error" not in entry and entry["reply_seconds"] < best["reply_seconds"] * (1 - MIN_GAIN):
+                best = entry
+
+    print("-" * 92)
+    if not best["settings"]:
+        # Still write the profile, so the app stops guessing and the table is on record
+        print("Torch's defaults were already the fastest")
+    print(f"Fastest: {describe(best['settings'])} "
+          f"({measured[0]['reply_seconds'] / best['reply_seconds']:.2f}x faster replies than the defaults)")
+    profile = {
+        "version": PROFILE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "model": "random Llama" if args.random_model else None,
+        "host": host,
+        "settings": best["settings"],
+        "results": measured,
+    }
+    if not args.random_model:
+        import app
+        profile["model"] = f"{app.MODEL_ID} ({app.PRECISION})"
+    with open(args.output, "w", encoding="utf-8") as profile_file:
+        json.dump(profile, profile_file, indent=2)
+    print(f"Profile written to {args.output}")
+    print("=" * 92)
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the fastest CPU settings for the model and save them")
+    parser.add_argument("--attention", action="store_true", help="also compare SDPA and eager attention")
+    parser.add_argument("--compile", action="store_true", help="also try torch.compile (slow to warm up)")
+    parser.add_argument("--output", default=os.environ.get("THANI_TUNING_PROFILE") or PROFILE_PATH)
+    parser.add_argument("--decode-tokens", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--prompt-tokens", type=int, default=0, help="keep only the last N prompt tokens (0 = all)")
+    parser.add_argument("--random-model", action="store_true", help="random Llama + stub tokenizer, no download")
+    parser.add_argument("--hidden", type=int, default=512)
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--candidate", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.candidate:
+        run_candidate(arguments)
+    else:
+        tune(arguments)
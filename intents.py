@@ -0,0 +1,315 @@
+"""
+Knowledge base for Thani's factual fast path.
+
+Every knowledge pattern used to live in a nested if/elif cascade inside
+generate_thani_response. The patterns are now data files in knowledge/
+(one JSON file per topic) and get compiled once into an Aho-Corasick
+automaton, so a message is scanned a single time no matter how many intents
+exist. KnowledgeBase watches the files and recompiles on change. The new
+snapshot replaces the old one in a single reference assignment, so a
+request that already holds a snapshot keeps a consistent view, and the
+model is never touched.
+
+Intent fields:
+    name       - unique id, e.g. "capital.india"
+    priority   - lower wins when several intents match (mirrors old cascade order)
+    all        - list of keyword groups; every group needs at least one hit
+    starts     - optional keyword group that must match at the start of the message
+    responses  - slang replies, one is picked at random
+    handler    - optional name of a function in app.py that builds the reply;
+                 returning None from it falls through to the next intent. Names
+                 the app does not know are rejected at load time
+
+A keyword group may be given as the name of a shared list from a file's
+"keyword_sets" object instead of a list, e.g. "question_starters".
+
+Priority bands follow the original cascade: capitals (100s), presidents,
+prime ministers, chief ministers, arithmetic (500), "what is" facts (600s),
+"how many" (700s), "when did" (800s). Inside a band the specific intents
+come before the catch-all one.
+
+Keyword matching rules:
+    - keywords must start on a word boundary ("nile" does not hit "senile")
+    - keywords must end on one too ("india" does not hit "indiana"), except
+      that longer keywords may take a plural or "-n" ending ("presidents",
+      "indian"); other forms are listed in the data files
+    - keywords of 3 characters or less take no ending, so "pm", "cm", "up",
+      "uk" and "pi" never fire inside ordinary words
+    - keywords starting with a symbol ("+", "-") ignore boundaries
+"""
+import glob
+import json
+import os
+import threading
+import time
+
+SHORT_KEYWORD_LENGTH = 3
+
+# Endings a longer keyword may take and still hit: "presidents", "indian"
+INFLECTION_SUFFIXES = {"s", "es", "n"}
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge")
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton over every keyword of an intent table"""
+
+    def __init__(self, intents):
+        self.intents = sorted(intents, key=lambda intent: intent["priority"])
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._keywords = []
+        keyword_ids = {}
+
+        # keyword id -> intents seeded by it; intent -> [(keyword ids, anchored)] per group
+        self._groups = []
+
+        for intent in self.intents:
+            groups = [(group, False) for group in intent.get("all", [])]
+            if intent.get("starts"):
+                groups.append((intent["starts"], True))
+
+            compiled = []
+            for group, anchored in groups:
+                ids = []
+                for keyword in group:
+                    keyword = keyword.lower()
+                    if keyword not in keyword_ids:
+                        keyword_ids[keyword] = len(self._keywords)
+                        self._keywords.append(keyword)
+                        self._add_keyword(keyword, keyword_ids[keyword])
+                    ids.append(keyword_ids[keyword])
+                compiled.append((frozenset(ids), anchored))
+            self._groups.append(compiled)
+
+        # Only the group whose keywords are shared by the fewest intents seeds
+        # candidates. With 50k facts a word like "capital" belongs to thousands
+        # of intents, and visiting all of them on every hit dominated lookups.
+        usage = [0] * len(self._keywords)
+        for compiled in self._groups:
+            for ids, _ in compiled:
+                for keyword_id in ids:
+                    usage[keyword_id] += 1
+        self._targets = [[] for _ in self._keywords]
+        for intent_index, compiled in enumerate(self._groups):
+            if not compiled:
+                continue
+            seed_ids, _ = min(compiled, key=lambda group: sum(usage[keyword_id] for keyword_id in group[0]))
+            for keyword_id in seed_ids:
+                self._targets[keyword_id].append(intent_index)
+
+        self._build_failure_links()
+
+    def _add_keyword(self, keyword, keyword_id):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(keyword_id)
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scan(self, text):
+        """Return {keyword_id: [start offsets]} for every keyword hit in one pass"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        keywords = self._keywords
+        hits = {}
+        state = 0
+
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+
+            for keyword_id in output[state]:
+                keyword = keywords[keyword_id]
+                start = end - len(keyword) + 1
+                if keyword[0].isalnum() and start > 0 and text[start - 1].isalnum():
+                    continue
+                if keyword[-1].isalnum() and end + 1 < len(text) and text[end + 1].isalnum():
+                    if len(keyword) <= SHORT_KEYWORD_LENGTH:
+                        continue
+                    word_end = end + 1
+                    while word_end < len(text) and text[word_end].isalnum():
+                        word_end += 1
+                    if text[end + 1:word_end] not in INFLECTION_SUFFIXES:
+                        continue
+                hits.setdefault(keyword_id, []).append(start)
+
+        return hits
+
+    def match(self, text):
+        """Return every satisfied intent for text, best priority first"""
+        hits = self.scan(text)
+        candidates = {intent_index for keyword_id in hits for intent_index in self._targets[keyword_id]}
+
+        matched = []
+        for intent_index in candidates:
+            for ids, anchored in self._groups[intent_index]:
+                if not any(keyword_id in hits and (not anchored or hits[keyword_id][0] == 0) for keyword_id in ids):
+                    break
+            else:
+                matched.append(intent_index)
+        return [self.intents[intent_index] for intent_index in sorted(matched)]
+
+    def best(self, text):
+        """Return the highest priority intent for text, or None"""
+        matched = self.match(text)
+        return matched[0] if matched else None
+
+
+def _resolve_group(group, keyword_sets, source):
+    if isinstance(group, str):
+        if group not in keyword_sets:
+            raise ValueError(f"{source}: unknown keyword set {group!r}")
+        return keyword_sets[group]
+    if not isinstance(group, list) or not group or not all(isinstance(keyword, str) for keyword in group):
+        raise ValueError(f"{source}: keyword groups must be non-empty lists of strings")
+    return group
+
+
+def load_intents(directory=KNOWLEDGE_DIR, handlers=None):
+    """Read and validate every *.json file in directory into one intent list.
+
+    handlers is the collection of handler names the caller can dispatch to; None skips that check.
+    """
+    keyword_sets = {}
+    raw_intents = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as data_file:
+            data = json.load(data_file)
+        keyword_sets.update(data.get("keyword_sets", {}))
+        raw_intents.extend((os.path.basename(path), intent) for intent in data.get("intents", []))
+
+    intents = []
+    names = set()
+    for source, intent in raw_intents:
+        name = intent.get("name")
+        if not name or name in names:
+            raise ValueError(f"{source}: missing or duplicate intent name {name!r}")
+        if not isinstance(intent.get("priority"), int):
+            raise ValueError(f"{source}: intent {name!r} needs an integer priority")
+        if not intent.get("responses") and not intent.get("handler"):
+            raise ValueError(f"{source}: intent {name!r} needs responses or a handler")
+        if handlers is not None and "handler" in intent and intent["handler"] not in handlers:
+            raise ValueError(f"{source}: intent {name!r} has unknown handler {intent['handler']!r}")
+        names.add(name)
+
+        intent = dict(intent)
+        intent["all"] = [_resolve_group(group, keyword_sets, source) for group in intent.get("all", [])]
+        if "starts" in intent:
+            intent["starts"] = _resolve_group(intent["starts"], keyword_sets, source)
+        if not intent["all"] and not intent.get("starts"):
+            raise ValueError(f"{source}: intent {name!r} has no keywords")
+        intents.append(intent)
+    return intents
+
+
+class KnowledgeSnapshot:
+    """One compiled, immutable version of the knowledge base"""
+
+    def __init__(self, intents, signature):
+        self.intents = intents
+        self.matcher = IntentMatcher(intents)
+        self.by_name = {intent["name"]: intent for intent in intents}
+        self.signature = signature
+        self.loaded_at = time.time()
+
+
+class KnowledgeBase:
+    """Knowledge files compiled into a snapshot that is swapped atomically on change"""
+
+    def __init__(self, directory=KNOWLEDGE_DIR, handlers=None):
+        self.directory = directory
+        self.handlers = handlers
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error = None
+        self.last_load_seconds = None
+        self.snapshot = None
+        self.reload()
+
+    def _signature(self):
+        signature = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            stat = os.stat(path)
+            signature.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def reload(self):
+        """Recompile from disk and swap the snapshot in; raises and keeps the old one on bad data"""
+        with self._reload_lock:
+            started = time.perf_counter()
+            signature = self._signature()
+            snapshot = KnowledgeSnapshot(load_intents(self.directory, self.handlers), signature)
+            # Readers grab self.snapshot once per request; one assignment swaps everything
+            self.snapshot = snapshot
+            self.last_load_seconds = time.perf_counter() - started
+            self.reloads += 1
+        return snapshot
+
+    def reload_if_changed(self):
+        """Reload when any file was added, removed or modified; returns True after a swap"""
+        if self.snapshot is not None and self._signature() == self.snapshot.signature:
+            return False
+        try:
+            self.reload()
+        except (OSError, ValueError) as e:
+            self.reload_errors += 1
+            self.last_error = str(e)
+            print(f"Knowledge reload failed, keeping the previous version: {e}")
+            return False
+        print(f"Knowledge reloaded ({len(self.snapshot.intents)} intents, {self.last_load_seconds * 1000:.0f} ms)")
+        return True
+
+    def start_watching(self, interval=2.0):
+        """Poll the knowledge files in a daemon thread and reload them on change"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name="thani-knowledge", daemon=True)
+        self._watcher.start()
+
+    def stats(self):
+        """Version info for the stats endpoint"""
+        snapshot = self.snapshot
+        return {
+            "intents": len(snapshot.intents),
+            "files": len(snapshot.signature),
+            "loaded_at": snapshot.loaded_at,
+            "load_ms": self.last_load_seconds * 1000 if self.last_load_seconds is not None else None,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_error": self.last_error,
+        }
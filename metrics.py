@@ -0,0 +1,233 @@
+"""
+In-process metrics rendered in the Prometheus text format.
+
+A tiny stand-in for prometheus_client: histograms, counters and gauges with
+optional labels, kept in plain Python numbers behind one lock each. Observing
+is a bisect plus a few additions, so the hot path stays at about a
+microsecond. All formatting happens in render(), only when /metrics is
+scraped.
+
+GenerationTimer sits in the streamer slot of a generation and splits its
+time into prefill (until the first new token) and decode (the rest). Every
+backend puts the prompt first and then each new token, whether it is
+model.generate, the batching scheduler or the speculative decoder.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds, from a pattern match (~µs) to a long CPU generation
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+
+
+def _label_text(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def labels(self, *values):
+        """Child for one label combination; bind it once outside the hot path"""
+        values = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._children[values] = self._new_child()
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in sorted(children):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_label_text(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager observing the seconds spent inside it"""
+        return _Timer(self)
+
+    def timed(self, function):
+        """Decorator observing each call; generators are timed until they finish"""
+        # Plain try/finally: a context manager object per call costs more than the measurement
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def timed_generator(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    yield from function(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started)
+            return timed_generator
+
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - started)
+        return timed_function
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _label_text(self.labelnames, values, [("le", _format_value(float(bound)))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class GenerationTimer:
+    """Streamer that times prefill and decode, optionally forwarding to another streamer.
+
+    tokens counts every id it is handed; callers that count tokens themselves (padded batches) pass None.
+    """
+
+    def __init__(self, prefill, decode, tokens, streamer=None):
+        self.prefill = prefill
+        self.decode = decode
+        self.tokens = tokens
+        self.streamer = streamer
+        self.generated = 0
+        self.prefill_seconds = None
+        self.decode_seconds = None
+        self._started = time.perf_counter()
+        self._first_token = None
+        self._seen_prompt = False
+        self._ended = False
+
+    def put(self, value):
+        if not self._seen_prompt:
+            self._seen_prompt = True
+        else:
+            if self._first_token is None:
+                self._first_token = time.perf_counter()
+                self.prefill_seconds = self._first_token - self._started
+                self.prefill.observe(self.prefill_seconds)
+            self.generated += value.numel()
+        if self.streamer is not None:
+            self.streamer.put(value)
+
+    def end(self):
+        # Error paths may end a streamer the backend already ended
+        if self._ended:
+            return
+        self._ended = True
+        if self._first_token is not None:
+            self.decode_seconds = time.perf_counter() - self._first_token
+            self.decode.observe(self.decode_seconds)
+        if self.tokens is not None:
+            self.tokens.inc(self.generated)
+        if self.streamer is not None:
+            self.streamer.end()
@@ -0,0 +1,133 @@
+"""
+Local, memory-mapped model snapshots.
+
+A cold start used to resolve the model on the Hugging Face Hub and then
+convert the Hub's bfloat16 weights to the fp32 the CPU runs on. The
+conversion materializes a full fp32 copy next to the loaded file, so RSS
+peaked at about twice the model and the process kept anonymous memory for
+every weight.
+
+    python model_snapshot.py [--precision fp32] [--output model_snapshot]
+
+writes the model and tokenizer once, already in the dtype the app will load
+for that precision, as safetensors plus a snapshot.json describing them.
+When the dtypes match, from_pretrained memory-maps the safetensors files and
+uses the tensors in place. Nothing is converted or copied: the weights are
+file-backed pages that the kernel reads on first touch, shares between
+forked workers and can drop under pressure. Peak RSS stays at the steady
+state. A snapshot is a plain local directory, so loading it needs no
+network at all.
+
+int8 and int4 are quantized at load time from the fp32 and bf16 weights,
+so their snapshots hold those dtypes, and the quantized copy still costs
+memory.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_snapshot")
+SNAPSHOT_VERSION = 1
+
+# File next to the weights that records what the snapshot holds
+SNAPSHOT_META = "snapshot.json"
+
+# Shards small enough that a single file never has to fit in the page cache at once
+MAX_SHARD_SIZE = "2GB"
+
+
+def load_snapshot_info(path, model_id):
+    """Metadata of the snapshot at path, or None when it is missing, invalid or holds another model"""
+    meta_path = os.path.join(path, SNAPSHOT_META) if path else ""
+    if not meta_path or not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as meta_file:
+            info = json.load(meta_file)
+        snapshot_model = info["model_id"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring model snapshot {path}: {e}")
+        return None
+    if snapshot_model != model_id:
+        print(f"Ignoring model snapshot {path}: it holds {snapshot_model}, not {model_id}; "
+              f"run python model_snapshot.py again")
+        return None
+    return info
+
+
+def dtype_name(dtype):
+    """'float32' for torch.float32"""
+    return str(dtype).rpartition(".")[2]
+
+
+def prepare_snapshot(model_id, output, precision="fp32", offline=False):
+    """Write model_id's tokenizer and weights, in precision's load dtype, to output; returns the metadata"""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from quantization import load_dtype
+
+    dtype = load_dtype(precision)
+    started = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(model_id, local_files_only=offline)
+    model = AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=dtype, low_cpu_mem_usage=True,
+                                                 local_files_only=offline)
+
+    # Written next to the target and swapped in at the end, so a running app never sees half a snapshot
+    staging = output.rstrip(os.sep) + ".partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    tokenizer.save_pretrained(staging)
+    model.save_pretrained(staging, safe_serialization=True, max_shard_size=MAX_SHARD_SIZE)
+    info = {
+        "version": SNAPSHOT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "model_id": model_id,
+        "precision": precision,
+        "dtype": dtype_name(dtype),
+        "parameters": sum(parameter.numel() for parameter in model.parameters()),
+        "torch": torch.__version__,
+    }
+    with open(os.path.join(staging, SNAPSHOT_META), "w", encoding="utf-8") as meta_file:
+        json.dump(info, meta_file, indent=2)
+    shutil.rmtree(output, ignore_errors=True)
+    os.rename(staging, output)
+    info["seconds"] = time.perf_counter() - started
+    return info
+
+
+def directory_bytes(path):
+    """Total size of the files under path"""
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def prepare(args):
+    """Prepare a snapshot from the command line and print what was written"""
+    import app
+    model_id = args.model or app.MODEL_ID
+    precision = args.precision or app.PRECISION
+    print("\n⚡ Model Snapshot")
+    print(f"{model_id} -> {args.output} ({precision})")
+    print("=" * 60)
+    try:
+        info = prepare_snapshot(model_id, args.output, precision, offline=args.offline or app.OFFLINE)
+    except Exception as e:
+        print(f"❌ Could not prepare the snapshot: {e}")
+        return None
+    print(f"{'parameters':<20} {info['parameters']:>15,}")
+    print(f"{'dtype':<20} {info['dtype']:>15}")
+    print(f"{'size':<20} {directory_bytes(args.output) / 1024 ** 2:>12.0f} MB")
+    print(f"{'seconds':<20} {info['seconds']:>15.1f}")
+    print("=" * 60)
+    print(f"Start the app with THANI_MODEL_SNAPSHOT={args.output} (the default location is picked up on its own)")
+    return info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a local safetensors snapshot the app memory-maps at startup")
+    parser.add_argument("--model", help="Hub id or local path (default: the app's MODEL_ID)")
+    parser.add_argument("--precision", help="fp32, bf16, int8 or int4 (default: THANI_PRECISION)")
+    parser.add_argument("--output", default=os.environ.get("THANI_MODEL_SNAPSHOT") or SNAPSHOT_DIR)
+    parser.add_argument("--offline", action="store_true", help="only use the local Hugging Face cache")
+    arguments = parser.parse_args()
+    prepare(arguments)
@@ -0,0 +1,42 @@
+"""
+Precomputed KV cache for the static system prompt prefix.
+
+The system prompt is identical for every LLM request, so it is tokenized and
+run through the model once. Each request then gets a copy of those
+past_key_values and only the history + user turn has to be prefilled.
+"""
+import copy
+import torch
+
+
+class PrefixCache:
+    """Tokenized prefix plus the past_key_values produced by one prefill over it"""
+
+    def __init__(self, tokenizer, model, prefix_text):
+        self.prefix_text = prefix_text
+        self.input_ids = tokenizer(prefix_text, return_tensors="pt", add_special_tokens=False)["input_ids"]
+        self.input_ids = self.input_ids.to(model.device)
+
+        with torch.no_grad():
+            outputs = model(input_ids=self.input_ids, use_cache=True)
+        self.past_key_values = outputs.past_key_values
+
+    def __len__(self):
+        return self.input_ids.shape[1]
+
+    def build_inputs(self, tokenizer, suffix_text):
+        """Model inputs for prefix + suffix, carrying a private copy of the prefix cache"""
+        suffix_ids = tokenizer(suffix_text, return_tensors="pt", add_special_tokens=False)["input_ids"]
+        return self.build_inputs_from_ids(suffix_ids[0].tolist())
+
+    def build_inputs_from_ids(self, suffix_ids):
+        """Same as build_inputs for a suffix that is already tokenized"""
+        suffix_ids = torch.tensor([suffix_ids], dtype=self.input_ids.dtype, device=self.input_ids.device)
+        input_ids = torch.cat([self.input_ids, suffix_ids], dim=-1)
+
+        # generate() appends to the cache in place, so every request needs its own copy
+        return {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            "past_key_values": copy.deepcopy(self.past_key_values),
+        }
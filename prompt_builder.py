@@ -0,0 +1,113 @@
+"""
+Token-budgeted prompt assembly for the LLM path.
+
+The prompt is built from separately tokenized segments:
+
+    system    - the static system prompt prefix, always kept whole
+    history   - earlier exchanges, newest first, while they fit the budget
+    question  - the current user turn plus the assistant header, always kept whole
+
+Every segment starts with a chat template special token, and the tokenizer
+never merges across those, so segment ids can be concatenated directly.
+When the budget runs out, older exchanges are dropped whole. The prompt is
+never cut in the middle of a turn, and the user's question is never cut.
+Each build returns a per-segment token breakdown, and PromptBuilder keeps
+running totals for monitoring.
+"""
+import threading
+
+
+def user_turn(message):
+    return f"<|start_header_id|>user<|end_header_id|>\n{message}<|eot_id|>"
+
+
+def assistant_turn(message):
+    return f"<|start_header_id|>assistant<|end_header_id|>\n{message}<|eot_id|>"
+
+
+ASSISTANT_HEADER = "<|start_header_id|>assistant<|end_header_id|>\n"
+
+
+class PromptBuilder:
+    """Assembles system prompt + recent history + question within max_prompt_tokens"""
+
+    def __init__(self, tokenizer, system_text, max_prompt_tokens=1536, max_history_turns=2):
+        self.tokenizer = tokenizer
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_history_turns = max_history_turns
+        self.system_ids = self._encode(system_text)
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.totals = {"system": 0, "history": 0, "question": 0, "total": 0}
+        self.max_total = 0
+        self.dropped_turns = 0
+        self.over_budget = 0
+        self.last = None
+
+    def _encode(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def exchange_ids(self, user_msg, bot_msg):
+        """Token ids of one earlier exchange; either side may be empty"""
+        text = ""
+        if user_msg:
+            text += user_turn(user_msg)
+        if bot_msg:
+            text += assistant_turn(bot_msg)
+        return self._encode(text) if text else []
+
+    def question_ids(self, message):
+        """Token ids of the question turn and assistant header, without recording a prompt"""
+        return self._encode(user_turn(message) + ASSISTANT_HEADER)
+
+    def build(self, message, history):
+        """(ids after the system prompt, per-segment token breakdown) for one request"""
+        question_ids = self.question_ids(message)
+        budget = self.max_prompt_tokens - len(self.system_ids) - len(question_ids)
+
+        recent = history[-self.max_history_turns:] if self.max_history_turns else []
+        history_ids = []
+        kept = 0
+        for user_msg, bot_msg in reversed(recent):
+            ids = self.exchange_ids(user_msg, bot_msg)
+            if len(ids) > budget:
+                break
+            history_ids = ids + history_ids
+            budget -= len(ids)
+            kept += 1
+
+        breakdown = {
+            "system": len(self.system_ids),
+            "history": len(history_ids),
+            "question": len(question_ids),
+            "history_turns": kept,
+            "dropped_turns": len(recent) - kept,
+        }
+        breakdown["total"] = breakdown["system"] + breakdown["history"] + breakdown["question"]
+        self._record(breakdown)
+        return history_ids + question_ids, breakdown
+
+    def _record(self, breakdown):
+        with self._lock:
+            self.prompts += 1
+            for segment in self.totals:
+                self.totals[segment] += breakdown[segment]
+            self.max_total = max(self.max_total, breakdown["total"])
+            self.dropped_turns += breakdown["dropped_turns"]
+            # System prompt + question alone can exceed the budget; they are still sent whole
+            self.over_budget += breakdown["total"] > self.max_prompt_tokens
+            self.last = breakdown
+
+    def stats(self):
+        """Average tokens per segment and budget pressure for the stats endpoint"""
+        with self._lock:
+            prompts = max(self.prompts, 1)
+            return {
+                "prompts": self.prompts,
+                "budget": self.max_prompt_tokens,
+                "mean_tokens": {segment: total / prompts for segment, total in self.totals.items()},
+                "max_total": self.max_total,
+                "dropped_turns": self.dropped_turns,
+                "over_budget": self.over_budget,
+                "last": self.last,
+            }
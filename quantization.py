@@ -0,0 +1,96 @@
+"""
+CPU precision modes for load_model().
+
+    fp32  - full precision, the old CPU default
+    bf16  - bfloat16 weights and activations, half the memory of fp32
+    int8  - dynamic int8 quantization of every nn.Linear (torch.ao)
+    int4  - weight-only int4 with group-wise scales, using torch's CPU int4 matmul kernel
+
+bitsandbytes 4/8-bit kernels target CUDA, so the CPU modes only rely on
+kernels that ship with torch itself.
+"""
+import torch
+from torch import nn
+
+PRECISION_MODES = ("fp32", "bf16", "int8", "int4")
+
+INT4_GROUP_SIZE = 128
+
+# The packed int4 layout needs the output dimension in tiles of 16 rows
+INT4_OUTPUT_TILE = 16
+
+
+def load_dtype(precision):
+    """dtype to pass to from_pretrained before any quantization is applied"""
+    if precision not in PRECISION_MODES:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {', '.join(PRECISION_MODES)}")
+    # The int4 CPU kernel takes bfloat16 activations
+    if precision in ("bf16", "int4"):
+        return torch.bfloat16
+    return torch.float32
+
+
+class Int4Linear(nn.Module):
+    """nn.Linear replacement holding packed 4-bit weights with per-group scale and zero point"""
+
+    def __init__(self, packed_weight, scales_and_zeros, bias, in_features, out_features, group_size):
+        super().__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.group_size = group_size
+        self.register_buffer("packed_weight", packed_weight)
+        self.register_buffer("scales_and_zeros", scales_and_zeros)
+        self.bias = bias
+
+    @classmethod
+    def from_linear(cls, linear, group_size=INT4_GROUP_SIZE):
+        """Quantize an nn.Linear asymmetrically to 16 levels per group of input columns"""
+        weight = linear.weight.detach().float()
+        out_features, in_features = weight.shape
+        groups = weight.reshape(out_features, in_features // group_size, group_size)
+
+        low = groups.amin(dim=-1, keepdim=True)
+        high = groups.amax(dim=-1, keepdim=True)
+        scale = (high - low).clamp(min=1e-6) / 15
+        # The kernel dequantizes as (q - 8) * scale + zero
+        zero = low + scale * 8
+        quantized = ((groups - low) / scale).round().clamp(0, 15).to(torch.int32).reshape(out_features, in_features)
+
+        packed_weight = torch.ops.aten._convert_weight_to_int4pack_for_cpu(quantized, 1)
+        scales_and_zeros = torch.stack(
+            [scale.reshape(out_features, -1).t(), zero.reshape(out_features, -1).t()], dim=-1
+        ).contiguous().to(torch.bfloat16)
+
+        bias = None if linear.bias is None else nn.Parameter(linear.bias.detach().to(torch.bfloat16), requires_grad=False)
+        return cls(packed_weight, scales_and_zeros, bias, in_features, out_features, group_size)
+
+    def forward(self, x):
+        shape = x.shape
+        output = torch.ops.aten._weight_int4pack_mm_for_cpu(
+            x.reshape(-1, self.in_features).to(torch.bfloat16),
+            self.packed_weight,
+            self.group_size,
+            self.scales_and_zeros
+        )
+        if self.bias is not None:
+            output = output + self.bias
+        return output.reshape(*shape[:-1], self.out_features).to(x.dtype)
+
+
+def quantize_int4(model, group_size=INT4_GROUP_SIZE):
+    """Swap every compatible nn.Linear for an Int4Linear in place"""
+    for name, module in list(model.named_modules()):
+        for child_name, child in list(module.named_children()):
+            if (isinstance(child, nn.Linear) and child.in_features % group_size == 0
+                    and child.out_features % INT4_OUTPUT_TILE == 0):
+                setattr(module, child_name, Int4Linear.from_linear(child, group_size))
+    return model
+
+
+def quantize_model(model, precision):
+    """Quantize a loaded model for the given precision mode, returns the model"""
+    if precision == "int8":
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    if precision == "int4":
+        return quantize_int4(model)
+    return model
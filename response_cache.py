@@ -0,0 +1,87 @@
+"""
+Bounded LRU + TTL cache for LLM replies.
+
+Keys are a normalized form of the message plus the history window the prompt
+actually uses, so "Who are you??" and "who are youuu" share an entry. Each
+key keeps several sampled variants; until it has collected them all, a
+lookup counts as a miss so the LLM can produce another one, and after that
+replies rotate randomly between variants so they still feel varied.
+"""
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation, squash stretched letters and whitespace"""
+    text = text.lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    # "youuu" / "sooo" -> "you" / "so"; only letters, so "1999" and "2000" stay distinct
+    text = re.sub(r"([^\W\d_])\1{2,}", r"\1", text)
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """Thread-safe LRU of reply variants with per-entry time to live"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, variants_per_key=3):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants_per_key = variants_per_key
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(message, history):
+        """Normalized message plus the normalized turns the prompt builder will see"""
+        turns = [normalize_text(turn or "") for exchange in history for turn in exchange]
+        return "\x1f".join(turns + [normalize_text(message)])
+
+    def get(self, key):
+        """A random stored variant, or None when the key is missing, expired or still filling"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry["created"] > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None or len(entry["variants"]) < self.variants_per_key:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return random.choice(entry["variants"])
+
+    def put(self, key, response):
+        """Store one more variant for key, evicting least recently used keys past the size bound"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"created": time.monotonic(), "variants": []}
+                self._entries[key] = entry
+            if response not in entry["variants"] and len(entry["variants"]) < self.variants_per_key:
+                entry["variants"].append(response)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
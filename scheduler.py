@@ -0,0 +1,261 @@
+"""
+Continuous batching scheduler for concurrent LLM requests.
+
+Every Gradio event used to call model.generate on its own batch of size 1,
+so concurrent users either serialized or fought over the CPU thread pool.
+The scheduler owns a single decode loop on a background thread. New requests
+are prefilled on their own and then joined into the shared batch at token
+granularity, and finished sequences leave the batch without stopping the
+others.
+
+The shared KV cache is left padded: when a sequence joins, the shorter side
+gets zero keys/values on the left plus a 0 in the attention mask, and
+position ids are derived from the mask so padding never shifts RoPE.
+
+Requests are submitted with the same kwargs as model.generate (temperature,
+top_p, top_k, repetition_penalty, do_sample, max_new_tokens, eos_token_id),
+so each request keeps its own sampling params. An optional streamer
+(e.g. TextIteratorStreamer) receives tokens as they are produced.
+"""
+import queue
+import threading
+
+import torch
+import torch.nn.functional as F
+from transformers import DynamicCache
+
+
+class GenerationRequest:
+    """One sequence waiting for, or taking part in, the shared decode loop"""
+
+    def __init__(self, input_ids, past_key_values, params, streamer=None, stopping_criteria=None):
+        self.input_ids = input_ids
+        self.past_key_values = past_key_values
+        self.params = params
+        self.streamer = streamer
+        self.stopping_criteria = stopping_criteria
+        self.generated = []
+        self.next_token = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def seen_ids(self):
+        """Prompt plus generated ids, as seen by the repetition penalty"""
+        generated = torch.tensor([self.generated], dtype=self.input_ids.dtype, device=self.input_ids.device)
+        return torch.cat([self.input_ids, generated], dim=-1)
+
+    def result(self, timeout=None):
+        """Block until the sequence finishes; returns prompt + generated ids like model.generate"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Generation did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.seen_ids
+
+    def _finish(self, error=None):
+        self.error = error
+        if self.streamer is not None:
+            self.streamer.end()
+        self._done.set()
+
+
+def sample_next_token(logits, seen_ids, params):
+    """Pick the next token for one sequence with its own sampling params"""
+    logits = logits.float()
+
+    penalty = params.get("repetition_penalty", 1.0)
+    if penalty != 1.0:
+        scores = logits.gather(0, seen_ids)
+        scores = torch.where(scores < 0, scores * penalty, scores / penalty)
+        logits = logits.scatter(0, seen_ids, scores)
+
+    if not params.get("do_sample", False):
+        return int(logits.argmax())
+
+    logits = logits / max(params.get("temperature", 1.0), 1e-5)
+
+    top_k = params.get("top_k") or 0
+    if 0 < top_k < logits.shape[-1]:
+        threshold = torch.topk(logits, top_k).values[-1]
+        logits = logits.masked_fill(logits < threshold, float("-inf"))
+
+    top_p = params.get("top_p", 1.0)
+    if top_p < 1.0:
+        sorted_logits, sorted_indices = torch.sort(logits, descending=True)
+        sorted_probs = sorted_logits.softmax(dim=-1)
+        # Drop a token once the tokens ranked above it already cover top_p
+        remove = (sorted_probs.cumsum(dim=-1) - sorted_probs) > top_p
+        logits = logits.masked_fill(remove.scatter(0, sorted_indices, remove), float("-inf"))
+
+    return int(torch.multinomial(logits.softmax(dim=-1), 1))
+
+
+class InferenceScheduler:
+    """Shared decode loop in front of the model returned by load_model()"""
+
+    def __init__(self, model, max_batch_size=8):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self._pending = queue.Queue()
+        self._active = []
+        self._cache = None
+        self._mask = None
+        self._thread = threading.Thread(target=self._run, name="thani-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, inputs, streamer=None, stopping_criteria=None, **kwargs):
+        """Queue a request built from model inputs + generate kwargs, returns a GenerationRequest"""
+        input_ids = inputs["input_ids"]
+        if input_ids.shape[0] != 1:
+            raise ValueError("Submit one sequence per request")
+
+        params = dict(kwargs)
+        params.setdefault("max_new_tokens", 20)
+        request = GenerationRequest(
+            input_ids,
+            inputs.get("past_key_values"),
+            params,
+            streamer=streamer,
+            stopping_criteria=stopping_criteria,
+        )
+        self._pending.put(request)
+        return request
+
+    def generate(self, inputs, **kwargs):
+        """Blocking drop-in for model.generate(**inputs, **kwargs)"""
+        return self.submit(inputs, **kwargs).result()
+
+    @property
+    def batch_size(self):
+        return len(self._active)
+
+    def _run(self):
+        while True:
+            self._admit()
+            if not self._active:
+                continue
+            try:
+                with torch.no_grad():
+                    self._decode_step()
+            except Exception as e:
+                print(f"Scheduler decode step failed: {e}")
+                for request in self._active:
+                    request._finish(e)
+                self._active = []
+                self._cache = None
+                self._mask = None
+
+    def _admit(self):
+        """Prefill waiting requests into free batch slots; blocks only when idle"""
+        while len(self._active) < self.max_batch_size:
+            try:
+                request = self._pending.get(block=not self._active)
+            except queue.Empty:
+                return
+            try:
+                with torch.no_grad():
+                    self._prefill(request)
+            except Exception as e:
+                print(f"Scheduler prefill failed: {e}")
+                request._finish(e)
+
+    def _prefill(self, request):
+        cache = request.past_key_values if request.past_key_values is not None else DynamicCache()
+        cached_length = cache.get_seq_length()
+        request.past_key_values = None
+
+        outputs = self.model(
+            input_ids=request.input_ids[:, cached_length:],
+            past_key_values=cache,
+            use_cache=True
+        )
+        if request.streamer is not None:
+            request.streamer.put(request.input_ids.cpu())
+
+        if self._emit(request, outputs.logits[0, -1]):
+            return
+        self._join(request, outputs.past_key_values.to_legacy_cache())
+
+    def _join(self, request, layers):
+        """Merge a freshly prefilled sequence into the left padded batch cache"""
+        new_length = layers[0][0].shape[2]
+        new_mask = torch.ones((1, new_length), dtype=torch.long, device=layers[0][0].device)
+
+        if not self._active:
+            self._cache = [(key, value) for key, value in layers]
+            self._mask = new_mask
+        else:
+            batch_length = self._mask.shape[1]
+            length = max(batch_length, new_length)
+            batch_pad = length - batch_length
+            new_pad = length - new_length
+
+            self._cache = [
+                (
+                    torch.cat([F.pad(batch_key, (0, 0, batch_pad, 0)), F.pad(key, (0, 0, new_pad, 0))], dim=0),
+                    torch.cat([F.pad(batch_value, (0, 0, batch_pad, 0)), F.pad(value, (0, 0, new_pad, 0))], dim=0),
+                )
+                for (batch_key, batch_value), (key, value) in zip(self._cache, layers)
+            ]
+            self._mask = torch.cat([F.pad(self._mask, (batch_pad, 0)), F.pad(new_mask, (new_pad, 0))], dim=0)
+
+        self._active.append(request)
+
+    def _decode_step(self):
+        device = self._mask.device
+        input_ids = torch.tensor([[request.next_token] for request in self._active], device=device)
+        mask = torch.cat([self._mask, torch.ones((len(self._active), 1), dtype=self._mask.dtype, device=device)], dim=1)
+
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=mask,
+            position_ids=mask.sum(dim=-1, keepdim=True) - 1,
+            cache_position=torch.tensor([mask.shape[1] - 1], device=device),
+            past_key_values=DynamicCache.from_legacy_cache(tuple(self._cache)),
+            use_cache=True
+        )
+        self._cache = list(outputs.past_key_values.to_legacy_cache())
+        self._mask = mask
+
+        keep = [row for row, request in enumerate(self._active) if not self._emit(request, outputs.logits[row, -1])]
+        if len(keep) < len(self._active):
+            self._evict(keep)
+
+    def _emit(self, request, logits):
+        """Sample, stream and record one token; returns True when the request is finished"""
+        token = sample_next_token(logits, request.seen_ids[0], request.params)
+        request.generated.append(token)
+        request.next_token = token
+        if request.streamer is not None:
+            request.streamer.put(torch.tensor([token]))
+
+        eos_token_id = request.params.get("eos_token_id")
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+        finished = (
+            token in (eos_token_id or [])
+            or len(request.generated) >= request.params["max_new_tokens"]
+        )
+        if not finished and request.stopping_criteria is not None:
+            finished = bool(request.stopping_criteria(request.seen_ids, None).all())
+        if finished:
+            request._finish()
+        return finished
+
+    def _evict(self, keep):
+        """Drop finished rows and trim columns that are now padding for everyone"""
+        self._active = [self._active[row] for row in keep]
+        if not self._active:
+            self._cache = None
+            self._mask = None
+            return
+
+        index = torch.tensor(keep, device=self._mask.device)
+        self._mask = self._mask.index_select(0, index)
+        first = int((self._mask.sum(dim=0) > 0).nonzero()[0])
+        self._mask = self._mask[:, first:]
+        self._cache = [
+            (key.index_select(0, index)[:, :, first:], value.index_select(0, index)[:, :, first:])
+            for key, value in self._cache
+        ]
@@ -0,0 +1,142 @@
+"""
+Bounded server-side chat sessions.
+
+The Gradio chatbot used to be both the display and the conversation state,
+so every turn shipped the whole transcript to the server and back, even
+though the prompt only ever uses the last couple of exchanges. Sessions now
+live here, keyed by an id the browser keeps in a gr.State. The wire carries
+the new message in and a bounded window of recent turns out.
+
+Limits:
+    max_turns        - exchanges kept per session; older ones are dropped
+    max_turn_chars   - each side of an exchange is truncated to this length
+    max_sessions     - least recently used sessions are evicted past this
+    max_total_chars  - global cap on stored text, evicting the same way
+    ttl_seconds      - sessions idle for longer are forgotten
+
+An evicted or expired session id simply starts a fresh conversation.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+
+class Session:
+    """Recent exchanges of one conversation"""
+
+    __slots__ = ("turns", "chars", "total_turns", "last_used")
+
+    def __init__(self, max_turns):
+        self.turns = deque(maxlen=max_turns)
+        self.chars = 0
+        self.total_turns = 0
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """Thread-safe LRU + TTL store of chat sessions with per-session and global size caps"""
+
+    def __init__(self, max_sessions=10000, ttl_seconds=3600, max_turns=20, max_turn_chars=2000,
+                 max_total_chars=50_000_000):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.max_turn_chars = max_turn_chars
+        self.max_total_chars = max_total_chars
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_chars = 0
+        self.created = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex
+
+    def _live(self, session_id):
+        """Session for session_id, dropping it when it has expired; caller holds the lock"""
+        session = self._sessions.get(session_id)
+        if session is not None and time.monotonic() - session.last_used > self.ttl_seconds:
+            self._remove(session_id)
+            self.expirations += 1
+            session = None
+        return session
+
+    def _remove(self, session_id):
+        session = self._sessions.pop(session_id)
+        self.total_chars -= session.chars
+
+    def history(self, session_id, turns=None):
+        """Recent [user, bot] exchanges, oldest first; empty for unknown or expired ids"""
+        with self._lock:
+            session = self._live(session_id) if session_id else None
+            if session is None:
+                return []
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            recent = list(session.turns)
+        if turns is not None:
+            recent = recent[-turns:] if turns else []
+        return [[user_msg, bot_msg] for user_msg, bot_msg in recent]
+
+    def append(self, session_id, user_msg, bot_msg):
+        """Record one exchange, creating the session if needed, then enforce every cap"""
+        user_msg = user_msg[:self.max_turn_chars]
+        bot_msg = bot_msg[:self.max_turn_chars]
+        with self._lock:
+            session = self._live(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(self.max_turns)
+                self.created += 1
+            if len(session.turns) == session.turns.maxlen:
+                dropped_user, dropped_bot = session.turns[0]
+                session.chars -= len(dropped_user) + len(dropped_bot)
+                self.total_chars -= len(dropped_user) + len(dropped_bot)
+            session.turns.append((user_msg, bot_msg))
+            session.chars += len(user_msg) + len(bot_msg)
+            self.total_chars += len(user_msg) + len(bot_msg)
+            session.total_turns += 1
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+
+            while self._sessions and (len(self._sessions) > self.max_sessions
+                                      or self.total_chars > self.max_total_chars):
+                self._remove(next(iter(self._sessions)))
+                self.evictions += 1
+
+    def drop(self, session_id):
+        """Forget a session, e.g. when the user clears the chat"""
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+    def expire(self):
+        """Remove every idle session; lookups also expire lazily, this just frees memory sooner"""
+        now = time.monotonic()
+        with self._lock:
+            # Least recently used first, so stop at the first one still live
+            while self._sessions:
+                session_id, session = next(iter(self._sessions.items()))
+                if now - session.last_used <= self.ttl_seconds:
+                    break
+                self._remove(session_id)
+                self.expirations += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "stored_chars": self.total_chars,
+                "max_total_chars": self.max_total_chars,
+                "max_turns": self.max_turns,
+                "created": self.created,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
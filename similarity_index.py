@@ -0,0 +1,237 @@
+"""
+Near-duplicate question lookup over character n-grams.
+
+Every question is broken into character trigrams of its normalized text
+(the same normalization the response cache uses). An inverted index maps
+each trigram to the questions containing it. A query:
+
+    1. looks up its rarest trigrams in the inverted index and accumulates an
+       IDF-weighted overlap score per candidate question, stopping before the
+       long posting lists of very common trigrams
+    2. rescores the best few candidates with IDF-weighted cosine similarity
+    3. rejects candidates that ask something else: a content word of the
+       query is missing from them, a number differs, a negation was added or
+       dropped, or the content words come in another order
+    4. returns the best one if it clears the threshold
+
+So "kerala cheif minster aarade" still finds "kerala chief minister aarade"
+even though the misspelling defeats the keyword matcher, while "president
+of india" never borrows the answer for "president of usa", nor "vice
+president of india", "ipl 2024" or "java better than python" the answers
+stored for "president", "ipl 2023" or "python better than java". IDF is computed
+at query time, so weights stay right as the index grows. Entries can expire,
+and a full index forgets its least recently used question instead of
+refusing new ones. Pure Python, no network, no model.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from difflib import SequenceMatcher
+
+from response_cache import normalize_text
+
+NGRAM_SIZE = 3
+
+# Only this many of the rarest query trigrams walk their posting lists
+MAX_QUERY_NGRAMS = 12
+
+# Stop walking posting lists once this many entries were visited; common
+# trigrams ("who", "ist") would otherwise touch most of a large index
+MAX_POSTINGS_VISITED = 4000
+
+# Candidates that get the exact cosine rescoring
+RESCORE_CANDIDATES = 8
+
+# Two words closer than this are the same word with a typo ("cheif" / "chief"); words with
+# digits in them must match exactly, "2023" is no typo of "2024"
+WORD_MATCH_RATIO = 0.75
+
+# Question filler that may be added or dropped without changing the question
+FILLER_WORDS = {
+    'a', 'an', 'the', 'of', 'in', 'is', 'are', 'was', 'who', 'what', 'whats', 'which', 'tell', 'me',
+    'about', 'please', 'da', 'eda', 'aara', 'aarade', 'aaranu', 'enthanu', 'entha', 'aanu', 'ennu'
+}
+
+# Words that flip a question's meaning; "t" is what normalization leaves of "isn't" and "don't"
+NEGATION_WORDS = {'not', 'no', 'never', 'nobody', 'nothing', 'none', 'without', 't', 'illa', 'alla', 'allathe'}
+
+
+def char_ngrams(text, size=NGRAM_SIZE):
+    """Set of character n-grams of normalized text, padded so short words still count"""
+    text = f" {normalize_text(text)} "
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _same_word(word, other):
+    if any(char.isdigit() for char in word + other):
+        return word == other
+    # "black" still counts as present in "blackholes"
+    return (word in other and len(word) > 3) or SequenceMatcher(None, word, other).ratio() >= WORD_MATCH_RATIO
+
+
+def _match_positions(words, others):
+    """Position in others of each content word of words, None where it has no match"""
+    # Joined neighbours let "blackholes" match "black holes"
+    targets = list(enumerate(others)) + [(i, first + second) for i, (first, second) in enumerate(zip(others, others[1:]))]
+    positions = []
+    for word in words:
+        if word in FILLER_WORDS:
+            continue
+        # An exact match wins over a fuzzy one earlier in the sentence
+        exact = next((i for i, other in targets if other == word), None)
+        positions.append(exact if exact is not None else next((i for i, other in targets if _same_word(word, other)), None))
+    return positions
+
+
+def is_different_question(question, candidate):
+    """True when candidate lacks a content word of question, negates differently or orders the words differently"""
+    question_words = normalize_text(question).split()
+    candidate_words = normalize_text(candidate).split()
+    positions = _match_positions(question_words, candidate_words)
+    # "vice president of india" is not answered by "president of india"
+    if None in positions:
+        return True
+    # "is java better than python" vs "is python better than java"
+    if positions != sorted(positions):
+        return True
+    # A negation only the stored question has, "who is not ..." for "who is ..."
+    return any(word in NEGATION_WORDS and word not in question_words for word in candidate_words)
+
+
+class SimilarityIndex:
+    """Inverted index of character n-grams with IDF-weighted cosine rescoring"""
+
+    def __init__(self, threshold=0.6, max_entries=100000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._postings = defaultdict(set)
+        # entry id -> (question, value, ngrams, expires), least recently used first
+        self._entries = OrderedDict()
+        self._known = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, question, value, ttl_seconds=None):
+        """Index question -> value, for ttl_seconds or for good; returns False when it is already indexed.
+
+        A full index drops its least recently used question to make room.
+        """
+        key = normalize_text(question)
+        ngrams = char_ngrams(question)
+        now = time.monotonic()
+        with self._lock:
+            if not key:
+                return False
+            entry_id = self._known.get(key)
+            if entry_id is not None:
+                if not self._is_expired(entry_id, now):
+                    self._entries.move_to_end(entry_id)
+                    return False
+                self._remove(entry_id)
+                self.expired += 1
+            while self._entries and len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evicted += 1
+            entry_id = self._next_id
+            self._next_id += 1
+            self._known[key] = entry_id
+            self._entries[entry_id] = (question, value, ngrams, now + ttl_seconds if ttl_seconds else None)
+            for ngram in ngrams:
+                self._postings[ngram].add(entry_id)
+        return True
+
+    def _is_expired(self, entry_id, now):
+        expires = self._entries[entry_id][3]
+        return expires is not None and now > expires
+
+    def _remove(self, entry_id):
+        """Drop an entry and its postings; caller holds the lock"""
+        question, _, ngrams, _ = self._entries.pop(entry_id)
+        self._known.pop(normalize_text(question), None)
+        for ngram in ngrams:
+            postings = self._postings[ngram]
+            postings.discard(entry_id)
+            if not postings:
+                del self._postings[ngram]
+
+    def _idf(self, ngram):
+        return math.log((len(self._entries) + 1) / (len(self._postings.get(ngram, ())) + 1)) + 1
+
+    def search(self, question, other_questions_only=False):
+        """Best (score, question, value) above the threshold, or None.
+
+        other_questions_only skips the entry stored under question's own
+        normalized text, for callers that already looked that text up.
+        """
+        ngrams = char_ngrams(question)
+        key = normalize_text(question)
+        now = time.monotonic()
+        with self._lock:
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            idf = {ngram: self._idf(ngram) for ngram in ngrams}
+            rarest = sorted(ngrams, key=idf.get, reverse=True)[:MAX_QUERY_NGRAMS]
+
+            overlap = defaultdict(float)
+            visited = 0
+            for ngram in rarest:
+                postings = self._postings.get(ngram, ())
+                # Rarest first, so every later list is at least as long
+                if visited and visited + len(postings) > MAX_POSTINGS_VISITED:
+                    break
+                visited += len(postings)
+                for entry_id in postings:
+                    overlap[entry_id] += idf[ngram]
+
+            candidates = sorted(overlap, key=overlap.get, reverse=True)[:RESCORE_CANDIDATES]
+            query_norm = math.sqrt(sum(weight * weight for weight in idf.values()))
+
+            best_score, best_id = 0.0, None
+            for entry_id in candidates:
+                if self._is_expired(entry_id, now):
+                    self._remove(entry_id)
+                    self.expired += 1
+                    continue
+                entry_question, _, entry_ngrams, _ = self._entries[entry_id]
+                if other_questions_only and self._known.get(key) == entry_id:
+                    continue
+                shared = sum(idf[ngram] ** 2 for ngram in ngrams & entry_ngrams)
+                entry_norm = math.sqrt(sum(self._idf(ngram) ** 2 for ngram in entry_ngrams))
+                score = shared / (query_norm * entry_norm)
+                if score > best_score and score >= self.threshold:
+                    if not is_different_question(question, entry_question):
+                        best_score, best_id = score, entry_id
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            question, value, _, _ = self._entries[best_id]
+            return best_score, question, value
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
@@ -45,7 +45,6 @@ def test_single_question():
         
         result = client.predict(
             message=test_message,
-            history=[],
             api_name="/chat_with_thani"
         )
         
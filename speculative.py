@@ -0,0 +1,135 @@
+"""
+Prompt-lookup speculative decoding.
+
+Thani's replies keep reusing text that is already in the context: slang from
+the system prompt, names from the user message, stock phrases from earlier
+in the same reply. Instead of one forward pass per token, the decoder looks
+up the last few generated tokens elsewhere in the context and drafts the
+tokens that followed them there. The model then scores the pending token
+plus the whole draft in a single forward pass.
+
+Every position is sampled from the model's own distribution with the same
+sampler the scheduler uses (temperature, top_k, top_p, repetition penalty).
+A draft token is accepted only when the sample equals it. The first mismatch
+keeps the sampled token and drops the rest of the draft. Because drafts are
+deterministic, this gives exactly the distribution of plain decoding, and
+greedy runs match model.generate token for token. No second model is needed.
+"""
+import threading
+
+import torch
+from transformers import DynamicCache
+
+from scheduler import sample_next_token
+
+# Longest suffix n-gram looked up in the context; shorter ones are tried next
+MAX_NGRAM_SIZE = 3
+
+
+def draft_tokens(seen, num_tokens, max_ngram_size=MAX_NGRAM_SIZE):
+    """Tokens that followed the most recent earlier occurrence of the context's last n-gram"""
+    for size in range(min(max_ngram_size, len(seen) - 1), 0, -1):
+        pattern = seen[-size:]
+        # Latest match first: recent text predicts the continuation best
+        for start in range(len(seen) - size - 1, -1, -1):
+            if seen[start:start + size] == pattern:
+                return seen[start + size:start + size + num_tokens]
+    return []
+
+
+class PromptLookupDecoder:
+    """Drop-in for model.generate(**inputs, **kwargs) that verifies n-gram drafts in one pass"""
+
+    def __init__(self, model, draft_length=8, max_ngram_size=MAX_NGRAM_SIZE):
+        self.model = model
+        self.draft_length = draft_length
+        self.max_ngram_size = max_ngram_size
+        self._lock = threading.Lock()
+        self.drafted = 0
+        self.accepted = 0
+        self.generated = 0
+        self.forward_passes = 0
+
+    def generate(self, input_ids, attention_mask=None, past_key_values=None, streamer=None,
+                 stopping_criteria=None, **params):
+        """Decode one sequence; returns prompt + generated ids like model.generate"""
+        if input_ids.shape[0] != 1:
+            raise ValueError("Speculative decoding runs one sequence at a time")
+
+        max_new_tokens = params.get("max_new_tokens", 20)
+        eos_token_id = params.get("eos_token_id")
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+        eos_token_id = set(eos_token_id or [])
+
+        seen = input_ids[0].tolist()
+        prompt_length = len(seen)
+        cache = past_key_values if past_key_values is not None else DynamicCache()
+        drafted = accepted = passes = 0
+
+        if streamer is not None:
+            streamer.put(input_ids.cpu())
+
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids[:, cache.get_seq_length():], past_key_values=cache, use_cache=True)
+            cache = outputs.past_key_values
+            passes += 1
+            logits = outputs.logits[0, -1:]
+            draft = []
+            finished = False
+
+            while not finished:
+                # logits[j] scores the position after draft[:j]; sample until the draft is contradicted
+                for position in range(len(logits)):
+                    token = sample_next_token(logits[position], torch.tensor(seen, device=input_ids.device), params)
+                    seen.append(token)
+                    if streamer is not None:
+                        streamer.put(torch.tensor([token]))
+
+                    finished = (
+                        token in eos_token_id
+                        or len(seen) - prompt_length >= max_new_tokens
+                        or (stopping_criteria is not None
+                            and bool(stopping_criteria(torch.tensor([seen]), None).all()))
+                    )
+                    if finished or position == len(draft) or token != draft[position]:
+                        break
+                    accepted += 1
+
+                if finished:
+                    break
+
+                # Drop cache entries for rejected draft tokens; the last sampled token is fed next
+                cache.crop(len(seen) - 1)
+                remaining = max_new_tokens - (len(seen) - prompt_length)
+                draft = draft_tokens(seen, min(self.draft_length, remaining - 1), self.max_ngram_size)
+                drafted += len(draft)
+
+                outputs = self.model(
+                    input_ids=torch.tensor([seen[-1:] + draft], device=input_ids.device),
+                    past_key_values=cache,
+                    use_cache=True
+                )
+                cache = outputs.past_key_values
+                passes += 1
+                logits = outputs.logits[0]
+
+        if streamer is not None:
+            streamer.end()
+
+        with self._lock:
+            self.drafted += drafted
+            self.accepted += accepted
+            self.generated += len(seen) - prompt_length
+            self.forward_passes += passes
+        return torch.tensor([seen], dtype=input_ids.dtype, device=input_ids.device)
+
+    def stats(self):
+        """Draft acceptance counters for the stats endpoint"""
+        with self._lock:
+            return {
+                "drafted": self.drafted,
+                "accepted": self.accepted,
+                "acceptance_rate": self.accepted / self.drafted if self.drafted else 0.0,
+                "tokens_per_forward": self.generated / self.forward_passes if self.forward_passes else 0.0,
+            }
@@ -0,0 +1,221 @@
+"""
+Early-stop criteria shaped around Thani's answers.
+
+The base Llama-3.2-1B rarely emits its EOS token. After a reply it tends to
+write <|eot_id|> and then a made-up user turn, and all of that gets decoded
+and thrown away. ThaniStoppingCriteria looks only at the newest token on
+every step, so it stays cheap, and stops on:
+
+    role_header  - <|eot_id|>, <|start_header_id|> or <|end_of_text|> appear
+    sentences    - the reply has ended max_sentences sentences
+    repetition   - the last repeat_ngram tokens already occurred in the reply
+    deadline     - the request ran past its wall-clock budget
+
+The reason is kept on the criteria object, and StopStats aggregates reasons
+and the tokens an early stop saved compared to running to max_new_tokens.
+
+A deadline stop is a partial answer. The caller cuts it back to its last
+sentence with trim_to_sentence(), and serves it instead of throwing it
+away. GenerationBudget measures decode speed and stretches budgets that are
+too short for even one sentence, so a partial answer always has one. It
+also gives a grace period for finishing the first sentence when the
+deadline comes before it ends.
+"""
+import re
+import threading
+import time
+
+import torch
+from transformers import StoppingCriteria
+
+ROLE_HEADER_TOKENS = ("<|eot_id|>", "<|start_header_id|>", "<|end_of_text|>")
+
+SENTENCE_TERMINATORS = ".!?"
+
+STOP_REASONS = ("role_header", "sentences", "repetition", "deadline", "eos", "max_tokens")
+
+# A terminator that is not the dot inside a number like 3.14
+SENTENCE_END = re.compile(r"[.!?](?!\d)")
+
+
+def role_header_sequences(tokenizer):
+    """Token id sequences of the chat template markers that begin a new turn"""
+    sequences = []
+    for marker in ROLE_HEADER_TOKENS:
+        token_ids = tokenizer.encode(marker, add_special_tokens=False)
+        if token_ids:
+            sequences.append(tuple(token_ids))
+    return sequences
+
+
+class ThaniStoppingCriteria(StoppingCriteria):
+    """Per-request stopping criteria; create a fresh one for every generation"""
+
+    def __init__(self, tokenizer, prompt_length, max_sentences=4, repeat_ngram=6, deadline_seconds=None,
+                 grace_seconds=None, stop_sequences=None):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.max_sentences = max_sentences
+        self.repeat_ngram = repeat_ngram
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        # Past the deadline, a reply with no finished sentence may run this much longer to end one
+        self.grace_deadline = self.deadline + grace_seconds if self.deadline and grace_seconds else self.deadline
+        self.stop_sequences = stop_sequences if stop_sequences is not None else role_header_sequences(tokenizer)
+        self.stop_reason = None
+        self.generated = 0
+        self.sentences = 0
+        self._previous_text = ""
+        self._ngrams = set()
+        self._token_text = {}
+
+    def _text(self, token_id):
+        text = self._token_text.get(token_id)
+        if text is None:
+            text = self._token_text[token_id] = self.tokenizer.decode([token_id])
+        return text
+
+    def _check(self, token_ids):
+        token_id = token_ids[-1]
+        for sequence in self.stop_sequences:
+            if tuple(token_ids[-len(sequence):]) == sequence:
+                return "role_header"
+
+        # Counted even without a sentence limit, since the deadline waits for the first one
+        text = self._text(token_id)
+        # "3.14" and "9.8" tokenize the dot on its own right after a digit
+        if any(char in SENTENCE_TERMINATORS for char in text) and not (
+                text.strip() == "." and self._previous_text[-1:].isdigit()):
+            self.sentences += 1
+        self._previous_text = text
+        if self.max_sentences and self.sentences >= self.max_sentences:
+            return "sentences"
+
+        if self.repeat_ngram and len(token_ids) >= self.repeat_ngram:
+            ngram = tuple(token_ids[-self.repeat_ngram:])
+            if ngram in self._ngrams:
+                return "repetition"
+            self._ngrams.add(ngram)
+
+        if self.deadline is not None:
+            now = time.monotonic()
+            if now >= self.deadline and (self.sentences or now >= self.grace_deadline):
+                return "deadline"
+        return None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids[0, self.prompt_length:].tolist()
+        # Catch up on every token since the last call (speculative decoding can add several)
+        while self.stop_reason is None and self.generated < len(generated):
+            self.generated += 1
+            self.stop_reason = self._check(generated[:self.generated])
+        return torch.full((input_ids.shape[0],), self.stop_reason is not None, dtype=torch.bool, device=input_ids.device)
+
+
+class StopStats:
+    """Why generations ended, and how many tokens early stops saved"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reasons = {reason: 0 for reason in STOP_REASONS}
+        self.generated_tokens = 0
+        self.saved_tokens = 0
+
+    def record(self, criteria, generated, max_new_tokens):
+        """Count one finished generation; returns its stop reason"""
+        reason = criteria.stop_reason
+        if reason is None:
+            reason = "max_tokens" if generated >= max_new_tokens else "eos"
+        self.record_reason(reason, generated, max_new_tokens)
+        return reason
+
+    def record_reason(self, reason, generated, max_new_tokens):
+        """Count a generation whose stop reason is already known, e.g. one from a worker process"""
+        with self._lock:
+            self.reasons[reason] += 1
+            self.generated_tokens += generated
+            if reason not in ("eos", "max_tokens"):
+                self.saved_tokens += max(max_new_tokens - generated, 0)
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            return {
+                "reasons": dict(self.reasons),
+                "generated_tokens": self.generated_tokens,
+                "saved_tokens": self.saved_tokens,
+            }
+
+
+def trim_to_sentence(text):
+    """text up to its last sentence terminator, for serving a reply cut off mid-sentence; unchanged without one"""
+    end = None
+    for end in SENTENCE_END.finditer(text):
+        pass
+    return text[:end.end()] if end is not None else text
+
+
+class GenerationBudget:
+    """Decode speed measured from finished generations, used to size budgets, plus partial answer counters"""
+
+    def __init__(self, sentence_tokens=24, smoothing=0.2, margin=1.25):
+        self.sentence_tokens = sentence_tokens
+        self.smoothing = smoothing
+        self.margin = margin
+        self._lock = threading.Lock()
+        self.tokens_per_second = None
+        self.prefill_seconds = None
+        self.planned = 0
+        self.extended = 0
+        self.answers = 0
+        self.partial_answers = 0
+        self.partial_chars = 0
+
+    def _smooth(self, current, sample):
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    def observe(self, generated, sentences, prefill_seconds, decode_seconds):
+        """Learn from one finished generation"""
+        with self._lock:
+            if prefill_seconds is not None:
+                self.prefill_seconds = self._smooth(self.prefill_seconds, prefill_seconds)
+            # The first token comes out of the prefill, so decode time covers the rest
+            if decode_seconds and generated > 1:
+                self.tokens_per_second = self._smooth(self.tokens_per_second, (generated - 1) / decode_seconds)
+            if sentences:
+                self.sentence_tokens = self._smooth(self.sentence_tokens, generated / sentences)
+
+    def plan(self, budget_seconds):
+        """(deadline, grace) seconds for a request with this budget: long enough for one sentence"""
+        with self._lock:
+            self.planned += 1
+            if self.tokens_per_second is None:
+                return budget_seconds, None
+            sentence_seconds = self.sentence_tokens / self.tokens_per_second * self.margin
+            needed = (self.prefill_seconds or 0.0) * self.margin + sentence_seconds
+            if needed > budget_seconds:
+                self.extended += 1
+                budget_seconds = needed
+            return budget_seconds, sentence_seconds
+
+    def record_answer(self, text, partial):
+        """Count one served LLM answer, and its length when a deadline cut it short"""
+        with self._lock:
+            self.answers += 1
+            if partial:
+                self.partial_answers += 1
+                self.partial_chars += len(text)
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            return {
+                "tokens_per_second": self.tokens_per_second,
+                "prefill_seconds": self.prefill_seconds,
+                "sentence_tokens": self.sentence_tokens,
+                "planned": self.planned,
+                "extended": self.extended,
+                "answers": self.answers,
+                "partial_answers": self.partial_answers,
+                "partial_ratio": self.partial_answers / self.answers if self.answers else 0.0,
+                "avg_partial_chars": self.partial_chars / self.partial_answers if self.partial_answers else None,
+            }
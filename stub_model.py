@@ -0,0 +1,124 @@
+"""
+Deterministic stand-in for the Llama tokenizer and model.
+
+Lets benchmarks drive app.py end to end without downloading weights or
+touching the network. The tokenizer maps UTF-8 bytes to token ids, and the
+model "generates" one of a fixed set of slang replies picked by a CRC of the
+prompt, so the same prompt always gets the same reply on every machine.
+Generation sleeps a fixed prefill cost plus a per-token decode cost, which
+keeps LLM-path latencies in a realistic range while staying reproducible.
+Batches of rows take one step for all of them, at batch_overhead of a step
+extra per additional row, the way a memory-bound decode step shares the
+weight reads.
+"""
+import time
+import zlib
+
+import torch
+
+STUB_REPLIES = [
+    "Eda myre, athu simple aanu! Google polum ariyam, ninakku ariyille?",
+    "Da kunne, ithokke school il padikkunna karyam alle? Onnu shradhikku!",
+    "Umbikko myre, ee chodhyam kettu njan maduthu! Answer simple aanu da!",
+    "Eda thayoli, njan parayam - athinu oru logic undu, manassilakkan nokku!",
+    "Kallan myre! Ithu ariyathe nee ithra naal engane jeevichu?",
+]
+
+
+class StubTokenizer:
+    """Byte-level tokenizer with the slice of the HF tokenizer API app.py uses"""
+
+    eos_token = "<eos>"
+    eos_token_id = 256
+    pad_token = eos_token
+    pad_token_id = eos_token_id
+
+    def __call__(self, text, return_tensors="pt", add_special_tokens=False):
+        input_ids = torch.tensor([list(text.encode("utf-8"))])
+        return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+    def encode(self, text, add_special_tokens=False):
+        return list(text.encode("utf-8"))
+
+    def decode(self, token_ids, skip_special_tokens=False, **kwargs):
+        if isinstance(token_ids, torch.Tensor):
+            token_ids = token_ids.tolist()
+        return bytes(token for token in token_ids if token < self.eos_token_id).decode("utf-8", errors="ignore")
+
+
+class StubModel:
+    """Fake causal LM: deterministic reply per prompt, simulated prefill and decode time"""
+
+    def __init__(self, prefill_ms=20.0, token_ms=1.0, replies=STUB_REPLIES, batch_overhead=0.1):
+        self.prefill_ms = prefill_ms
+        self.token_ms = token_ms
+        self.replies = replies
+        self.batch_overhead = batch_overhead
+        self.calls = 0
+
+    def reply_for(self, input_ids, attention_mask=None):
+        """The canned reply a prompt maps to; padding is skipped, so a padded row maps like the bare prompt"""
+        token_ids = input_ids[0] if attention_mask is None else input_ids[0][attention_mask[0].bool()]
+        return self.replies[zlib.crc32(bytes(token_ids.tolist())) % len(self.replies)]
+
+    def generate(self, input_ids, attention_mask=None, max_new_tokens=150, streamer=None, stopping_criteria=None,
+                 **kwargs):
+        self.calls += 1
+        if input_ids.shape[0] > 1:
+            return self._generate_batch(input_ids, attention_mask, max_new_tokens, stopping_criteria,
+                                        kwargs.get("pad_token_id", StubTokenizer.eos_token_id), streamer)
+        reply_ids = list(self.reply_for(input_ids).encode("utf-8"))[:max_new_tokens]
+
+        time.sleep(self.prefill_ms / 1000)
+        if streamer is not None:
+            streamer.put(input_ids[0])
+
+        generated = []
+        for token in reply_ids:
+            time.sleep(self.token_ms / 1000)
+            generated.append(token)
+            if streamer is not None:
+                streamer.put(torch.tensor([token]))
+            if stopping_criteria is not None:
+                output_ids = torch.cat([input_ids, torch.tensor([generated], dtype=input_ids.dtype)], dim=1)
+                if stopping_criteria(output_ids, None).all():
+                    break
+
+        if streamer is not None:
+            streamer.end()
+        return torch.cat([input_ids, torch.tensor([generated], dtype=input_ids.dtype)], dim=1)
+
+    def _generate_batch(self, input_ids, attention_mask, max_new_tokens, stopping_criteria, pad_token_id, streamer=None):
+        """Every row's reply in lockstep, padded after it ends, like generate() on a padded batch"""
+        rows = input_ids.shape[0]
+        step = 1 + self.batch_overhead * (rows - 1)
+        replies = [
+            list(self.reply_for(input_ids[row:row + 1],
+                                None if attention_mask is None else attention_mask[row:row + 1])
+                 .encode("utf-8"))[:max_new_tokens] + [StubTokenizer.eos_token_id]
+            for row in range(rows)
+        ]
+        width = min(max(len(reply) for reply in replies), max_new_tokens)
+
+        time.sleep(self.prefill_ms * step / 1000)
+        if streamer is not None:
+            streamer.put(input_ids)
+        done = [False] * rows
+        output_ids = input_ids
+        for position in range(width):
+            time.sleep(self.token_ms * step / 1000)
+            column = []
+            for row, reply in enumerate(replies):
+                column.append(pad_token_id if done[row] or position >= len(reply) else reply[position])
+            output_ids = torch.cat([output_ids, torch.tensor(column, dtype=input_ids.dtype).unsqueeze(1)], dim=1)
+            if streamer is not None:
+                streamer.put(torch.tensor(column))
+            done = [finished or token == StubTokenizer.eos_token_id for finished, token in zip(done, column)]
+            if stopping_criteria is not None:
+                stopped = stopping_criteria(output_ids, None)
+                done = [finished or bool(stop) for finished, stop in zip(done, stopped)]
+            if all(done):
+                break
+        if streamer is not None:
+            streamer.end()
+        return output_ids
@@ -0,0 +1,59 @@
+"""
+Arithmetic Engine Tests
+Pins what the math fast path answers, what it leaves to the other intents
+and the limits that refuse hostile input.
+
+    python -m pytest test_arithmetic.py
+"""
+
+import pytest
+
+from arithmetic import ExpressionTooLarge, evaluate, format_number
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("12 + 7", "19"),
+    ("12 * 7", "84"),
+    ("what is 3.5 + 2?", "5.5"),
+    ("(4+5)*2", "18"),
+    ("what is 2^10", "1024"),
+    ("100 divided by 8", "12.5"),
+    ("20% of 50", "10"),
+    ("10 // 3", "3"),
+    ("100 - 50%", "50"),
+    ("1,000 - 250", "750"),
+    ("5 um 3 um koottiyal", "8"),
+    ("45/50", "0.9"),
+    ("what is 45/50", "0.9"),
+    ("12-7", "5"),
+    ("what is 12-7", "5"),
+])
+def test_answers_arithmetic(question, expected):
+    _, result = evaluate(question)
+    assert format_number(result) == expected
+
+
+@pytest.mark.parametrize("question", [
+    "I scored 45/50 in maths",
+    "born on 12/5/2024",
+    "explain the 1939-1945 war",
+    "India beat Australia 2-1 in the final, who was man of the match?",
+    "give me 5-10 tips to study better",
+    "When did World War 1 happen, 1914-1918?",
+    "covid19 vaccine",
+    "1e5",
+])
+def test_leaves_prose_alone(question):
+    assert evaluate(question) is None
+
+
+@pytest.mark.parametrize("question", ["9^9^9", "9^9^9^9", "2 ** 100000", "99999999999999999999 * 9"])
+def test_refuses_huge_results(question):
+    with pytest.raises(ExpressionTooLarge):
+        evaluate(question)
+
+
+@pytest.mark.parametrize("question", ["10/0", "10 % 0", "0^-1"])
+def test_division_by_zero(question):
+    with pytest.raises(ZeroDivisionError):
+        evaluate(question)
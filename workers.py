@@ -0,0 +1,190 @@
+"""
+Forked inference workers sharing one copy of the model weights.
+
+One process with one model can only use its torch thread pool, and the GIL
+puts Gradio, pattern matching and the Python side of the decode loop in the
+same line. In worker mode the parent loads the weights once and then forks
+N processes. Fork shares every page copy-on-write, and inference never
+writes to the parameters, so the weights stay shared. Each worker only pays
+for its own activations and KV caches.
+
+Requests go to the workers over one multiprocessing queue, so whichever
+worker is free takes the next one. Text pieces come back on a shared result
+queue. A dispatcher thread in the parent routes each piece to the waiting
+request. Each worker sets its own torch intra-op thread count before its
+first forward pass.
+
+The handler is a generator function run inside the worker. It yields
+picklable pieces and may return a picklable summary, which the parent gets
+back as the return value of stream().
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+# How often an idle worker checks that its parent is still alive
+PARENT_CHECK_SECONDS = 1.0
+
+
+def _worker_main(index, handler, initializer, threads, requests, results, parent_pid):
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        if initializer is not None:
+            initializer()
+        results.put((None, "ready", index))
+    except Exception as e:
+        results.put((None, "failed", f"worker {index}: {e}"))
+        return
+
+    while True:
+        try:
+            item = requests.get(timeout=PARENT_CHECK_SECONDS)
+        except queue.Empty:
+            # Orphaned after the parent was killed: nobody will read our results
+            if os.getppid() != parent_pid:
+                return
+            continue
+        if item is None:
+            return
+
+        request_id, args = item
+        try:
+            pieces = handler(*args)
+            while True:
+                try:
+                    piece = next(pieces)
+                except StopIteration as stop:
+                    results.put((request_id, "done", stop.value))
+                    break
+                results.put((request_id, "piece", piece))
+        except Exception as e:
+            results.put((request_id, "error", f"worker {index}: {e}"))
+
+
+class WorkerPool:
+    """N forked processes running handler(*args) generators, fed from one shared queue"""
+
+    def __init__(self, handler, num_workers=2, threads_per_worker=1, initializer=None, timeout=60):
+        self.handler = handler
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self.initializer = initializer
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("fork")
+        self._requests = self._context.Queue()
+        self._results = self._context.Queue()
+        self._processes = []
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._ready = threading.Condition()
+        self.ready_workers = 0
+        self.failed_workers = 0
+        self.errors = []
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        """Fork the workers, then start the dispatcher; call before this process starts other threads"""
+        for index in range(self.num_workers):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(index, self.handler, self.initializer, self.threads_per_worker,
+                      self._requests, self._results, os.getpid()),
+                name=f"thani-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        threading.Thread(target=self._dispatch, name="thani-worker-results", daemon=True).start()
+
+    def _dispatch(self):
+        while True:
+            request_id, kind, payload = self._results.get()
+            if request_id is None:
+                with self._ready:
+                    if kind == "ready":
+                        self.ready_workers += 1
+                    else:
+                        self.failed_workers += 1
+                        self.errors.append(payload)
+                    self._ready.notify_all()
+                continue
+            with self._lock:
+                pending = self._pending.get(request_id)
+            if pending is not None:
+                pending.put((kind, payload))
+
+    def wait_ready(self, timeout=None):
+        """Block until every worker has initialized or failed; True when at least one is ready"""
+        with self._ready:
+            self._ready.wait_for(lambda: self.ready_workers + self.failed_workers >= self.num_workers, timeout)
+            return self.ready_workers > 0
+
+    def stream(self, *args):
+        """Yield the pieces a worker produces for handler(*args); returns the handler's summary"""
+        request_id = next(self._ids)
+        pending = queue.Queue()
+        with self._lock:
+            self._pending[request_id] = pending
+        try:
+            self._requests.put((request_id, args))
+            while True:
+                try:
+                    kind, payload = pending.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No reply from the workers within {self.timeout}s") from None
+                if kind == "piece":
+                    yield payload
+                elif kind == "done":
+                    self._count(completed=True)
+                    return payload
+                else:
+                    raise RuntimeError(payload)
+        except BaseException:
+            self._count(completed=False)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[request_id]
+
+    def _count(self, completed):
+        with self._lock:
+            if completed:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def close(self, timeout=5):
+        """Ask every worker to exit, terminating the ones that do not"""
+        for _ in self._processes:
+            self._requests.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.terminate()
+
+    def pids(self):
+        return [process.pid for process in self._processes]
+
+    def stats(self):
+        """Counters for the stats endpoint"""
+        with self._lock:
+            in_flight = len(self._pending)
+            completed, failed = self.completed, self.failed
+        return {
+            "workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "alive": sum(process.is_alive() for process in self._processes),
+            "ready": self.ready_workers,
+            "failed_workers": self.failed_workers,
+            "errors": self.errors[-5:],
+            "in_flight": in_flight,
+            "completed": completed,
+            "failed": failed,
+        }